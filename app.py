@@ -3,6 +3,18 @@ from flask import Flask
 from config import config_by_name
 from models import db, User, Greenhouse, Employee, Reading, Issue, Notification # Import db and all models
 from routes.utils import register_context_processors # Import context processor registration function
+from routes.write_behind import init_write_behind
+from routes.cache import init_cache
+from routes.snapshots import ensure_snapshots
+from routes.rollups import ensure_rollups
+from routes.issue_stats import ensure_issue_stats
+from routes.report_stats import ensure_report_stats
+from routes.unread_counts import ensure_unread_counts
+from routes.schema import ensure_columns, ensure_indexes
+from routes.search import ensure_search_index
+from routes.status_machine import init_status_machine
+from routes.assignment import init_auto_assigner
+from routes.commands import register_commands
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import random
@@ -116,9 +128,15 @@ def create_app(config_name='default'):
     # Initialize extensions
     db.init_app(app)
     
+    # Configure the shared response cache
+    init_cache(app)
+
     # Register context processors
     register_context_processors(app)
 
+    # Register maintenance CLI commands
+    register_commands(app)
+
     # Register Blueprints
     from routes.auth import auth_bp
     app.register_blueprint(auth_bp)
@@ -149,7 +167,24 @@ def create_app(config_name='default'):
 
     with app.app_context():
         db.create_all() # Create database tables if they don't exist
+        ensure_columns() # Add columns and indexes introduced after the tables were created
+        ensure_indexes()
         _seed_initial_data(app) # Seed data if DB is empty
+        ensure_snapshots() # Build latest-reading snapshots for databases created before they existed
+        ensure_rollups() # Likewise for the minute/hour/day reading rollups
+        ensure_issue_stats() # And for the daily issue counters
+        ensure_report_stats() # And for the resolution-time rollups of the reports page
+        ensure_unread_counts() # And for the per-user unread-notification counters
+        ensure_search_index() # And for the full-text index over issues and notifications
+
+    # Status hysteresis/debounce state machine, rehydrated from the stored readings
+    init_status_machine(app)
+
+    # Auto-assignment queue of employees, built from the current issue workload
+    init_auto_assigner(app)
+
+    # Start the write-behind reading buffer if enabled
+    init_write_behind(app)
 
     return app
 
@@ -9,6 +9,49 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your_secret_key_here' # Replace with a strong secret key in production
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+    READING_BATCH_MAX_SIZE = 5000 # Maximum readings accepted by /api/readings/batch
+    READING_STREAM_CHUNK_SIZE = 1000 # Rows per bulk insert/commit for /api/readings/stream
+    READING_HISTORY_MAX_POINTS = 10000 # Upper bound for max_points on /api/greenhouses/<id>/readings and buckets on .../trends
+    READING_HISTORY_RAW_MAX_HOURS = 24 # Longer history ranges are always read from the rollups, never raw readings
+    # Write-behind buffering for /api/readings/add (disabled by default)
+    READING_WRITE_BEHIND = os.environ.get('READING_WRITE_BEHIND', '').lower() in ['1', 'true', 'yes']
+    READING_WRITE_BEHIND_DURABILITY = os.environ.get('READING_WRITE_BEHIND_DURABILITY') or 'ack' # 'ack' or 'commit'
+    READING_WRITE_BEHIND_ACK_TIMEOUT = 5 # Seconds to wait for the commit under 'commit' durability
+    READING_BUFFER_MAX_SIZE = 10000
+    READING_BUFFER_BATCH_SIZE = 500
+    READING_BUFFER_FLUSH_INTERVAL = 1.0 # Seconds
+    # Shared response cache for dashboard/statistics endpoints: 'sqlite' (shared by workers, the gateway and CLI on one host),
+    # 'memory' (per process) or 'none'
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE') or 'sqlite'
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH') # Defaults to instance/response_cache.db
+    RESPONSE_CACHE_MAX_ENTRIES = 1024
+    RESPONSE_CACHE_TTL_SECONDS = 30 # Bounds staleness from commits the cache cannot see (other hosts, or other processes with 'memory')
+    # Notification SSE stream; each open stream holds a worker thread, so run gunicorn with threaded or async workers
+    NOTIFICATION_STREAM_POLL_SECONDS = 30 # How often each process checks for notifications committed by other processes
+    NOTIFICATION_STREAM_MAX_SECONDS = 300 # Streams are closed periodically and resumed by the browser via Last-Event-ID
+    STATUS_HYSTERESIS_TEMPERATURE = 1.0 # °C a reading must clear a threshold by before status becomes less severe
+    STATUS_HYSTERESIS_HUMIDITY = 2.0 # Humidity percentage points, likewise
+    STATUS_CONFIRM_SAMPLES = 1 # Consecutive evaluations required before a status change (escalation to critical is immediate)
+    STATUS_MIN_DWELL_SECONDS = 0 # Reading-time span the new status must persist for before it is applied
+    THRESHOLD_RULES_TTL = 30 # Seconds compiled threshold rules are reused before reloading, bounding staleness from other processes
+    BACKTEST_API_MAX_READINGS = 2000000 # Readings /api/thresholds/backtest replays in-request (about 3 s per million on SQLite); use the CLI beyond
+    BACKTEST_MAX_DAYS = 365
+    NOTIFICATION_COALESCE_SECONDS = 900 # Merge repeated alerts for a greenhouse into one unread notification; 0 disables
+    NOTIFICATION_DIGEST_MINUTES = 60 # Default period summarized by `flask send-notification-digests`
+    BULK_ACTION_MAX_ITEMS = 500 # Items accepted by /api/issues/bulk-assign and /api/issues/bulk-resolve
+    SEARCH_MAX_OFFSET = 200 # Deepest /api/search page; every page re-ranks the full match set, so refine the query instead
+    SEARCH_MIN_PREFIX_LENGTH = 3 # Shorter /api/search words match whole words only; a one-letter prefix matches nearly every row
+    # Automatic assignment of new critical/high issues (disabled by default)
+    AUTO_ASSIGN_ENABLED = os.environ.get('AUTO_ASSIGN_ENABLED', '').lower() in ['1', 'true', 'yes']
+    AUTO_ASSIGN_MAX_LOAD = 1 # Assigned issues an employee may hold before being skipped; 1 assigns available employees only
+    AUTO_ASSIGN_AFFINITY_SLACK = 0 # Extra load tolerated to prefer an employee who has worked in the issue's sector
+    AUTO_ASSIGN_REBUILD_SECONDS = 300 # Reload loads from the database to pick up changes made by other processes
+    LAZY_LOAD_GUARD = None # Raise on relationship lazy loads during requests; None enables it in debug and testing only
+    UNREAD_COUNT_CACHE_SECONDS = 5 # How long a process may serve a cached unread count written by another process
+    # Sensor gateway (gateway.py) listen addresses
+    GATEWAY_HOST = os.environ.get('GATEWAY_HOST') or '0.0.0.0'
+    GATEWAY_TCP_PORT = int(os.environ.get('GATEWAY_TCP_PORT') or 7070)
+    GATEWAY_UDP_PORT = int(os.environ.get('GATEWAY_UDP_PORT') or 7071)
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -0,0 +1,170 @@
+"""Standalone asyncio sensor gateway.
+
+Accepts a compact line protocol over TCP and UDP so greenhouse controllers can keep a
+connection open instead of doing an HTTP+JSON round trip per sample:
+
+    <greenhouse_id> <temperature> <humidity> <light_level> <air_quality> <soil_moisture> [timestamp]
+
+Multi-word values use underscores (e.g. ``Very_Low``). The optional timestamp is
+either epoch seconds or ISO 8601. Parsed readings are handed to the same write-behind
+buffer and store_rows path used by /api/readings/add.
+
+Run with ``python gateway.py [--host HOST] [--tcp-port PORT] [--udp-port PORT]``.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from routes.ingest import parse_reading
+from routes.write_behind import ReadingBuffer, get_reading_buffer
+
+MAX_LINE_LENGTH = 1024
+SUBMIT_RETRIES = 20 # Backpressure: times to retry a reading while the buffer is full
+SUBMIT_RETRY_DELAY = 0.05 # Seconds
+
+
+def parse_line(line):
+    """Parses one protocol line into a reading row. Raises ValueError if malformed."""
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    fields = line.split()
+    if len(fields) not in [6, 7]:
+        raise ValueError('Expected 6 or 7 fields')
+    data = {
+        'greenhouse_id': fields[0],
+        'temperature': fields[1],
+        'humidity': fields[2],
+        'light_level': fields[3],
+        'air_quality': fields[4].replace('_', ' '),
+        'soil_moisture': fields[5].replace('_', ' ')
+    }
+    if len(fields) == 7:
+        timestamp = fields[6]
+        try:
+            data['timestamp'] = datetime.fromtimestamp(float(timestamp), tz=timezone.utc).isoformat()
+        except (ValueError, OverflowError, OSError):
+            # Not epoch seconds (or out of range, e.g. 'inf'); parse_reading tries ISO 8601
+            data['timestamp'] = timestamp
+    row = parse_reading(data)
+    row.setdefault('timestamp', datetime.utcnow())
+    return row
+
+
+class SensorGateway:
+    """Parses protocol lines from TCP and UDP clients and queues them for persistence."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.connections = 0
+        self.counters = {'accepted': 0, 'invalid': 0, 'rejected': 0}
+
+    def _parse(self, line):
+        line = line.strip()
+        if not line:
+            return None, None
+        try:
+            return parse_line(line), None
+        except (ValueError, OverflowError, OSError) as e: # A bad line gets an ERR reply; it never ends the connection
+            self.counters['invalid'] += 1
+            return None, str(e)
+
+    async def submit_line(self, line):
+        """Parses and queues one line, waiting while the buffer is full.
+
+        Returns None on success or an error message.
+        """
+        row, error = self._parse(line)
+        if row is None:
+            return error
+        for _ in range(SUBMIT_RETRIES):
+            if self.buffer.submit(row):
+                self.counters['accepted'] += 1
+                return None
+            await asyncio.sleep(SUBMIT_RETRY_DELAY)
+        self.counters['rejected'] += 1
+        return 'Buffer full'
+
+    def submit_line_nowait(self, line):
+        """Parses and queues one line without waiting; used for fire-and-forget UDP."""
+        row, error = self._parse(line)
+        if row is None:
+            return error
+        if self.buffer.submit(row):
+            self.counters['accepted'] += 1
+            return None
+        self.counters['rejected'] += 1
+        return 'Buffer full'
+
+    async def handle_tcp(self, reader, writer):
+        # Long-lived connection: one reading per line, errors are echoed back as "ERR <message>"
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b'ERR Line too long\n')
+                    break
+                if not line:
+                    break
+                error = await self.submit_line(line)
+                if error:
+                    writer.write(f'ERR {error}\n'.encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def datagram_protocol(self):
+        gateway = self
+
+        class _UdpProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                # A datagram may carry several newline-separated readings; UDP gets no replies
+                for line in data.splitlines():
+                    gateway.submit_line_nowait(line)
+
+        return _UdpProtocol()
+
+    async def serve(self, host, tcp_port, udp_port):
+        loop = asyncio.get_running_loop()
+        tcp_server = await asyncio.start_server(self.handle_tcp, host, tcp_port, limit=MAX_LINE_LENGTH)
+        transport, _ = await loop.create_datagram_endpoint(self.datagram_protocol, local_addr=(host, udp_port))
+        print(f'Sensor gateway listening on {host} (tcp={tcp_port}, udp={udp_port})')
+        try:
+            async with tcp_server:
+                await tcp_server.serve_forever()
+        finally:
+            transport.close()
+
+
+def main():
+    from app import app # Imported lazily so the protocol helpers can be used without an app
+
+    parser = argparse.ArgumentParser(description='GreenTech sensor gateway')
+    parser.add_argument('--host', default=app.config.get('GATEWAY_HOST', '0.0.0.0'))
+    parser.add_argument('--tcp-port', type=int, default=app.config.get('GATEWAY_TCP_PORT', 7070))
+    parser.add_argument('--udp-port', type=int, default=app.config.get('GATEWAY_UDP_PORT', 7071))
+    args = parser.parse_args()
+
+    buffer = get_reading_buffer(app)
+    if buffer is None:
+        buffer = ReadingBuffer(
+            app,
+            max_size=app.config.get('READING_BUFFER_MAX_SIZE', 10000),
+            batch_size=app.config.get('READING_BUFFER_BATCH_SIZE', 500),
+            flush_interval=app.config.get('READING_BUFFER_FLUSH_INTERVAL', 1.0)
+        ).start()
+
+    gateway = SensorGateway(buffer)
+    try:
+        asyncio.run(gateway.serve(args.host, args.tcp_port, args.udp_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        buffer.stop() # Drain queued readings before exiting
+
+
+if __name__ == '__main__':
+    main()
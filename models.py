@@ -17,9 +17,30 @@ class Greenhouse(db.Model):
     name = db.Column(db.String(100), nullable=False)
     location = db.Column(db.String(200))
     status = db.Column(db.String(20), default='normal')  # normal, warning, critical
-    readings = db.relationship('Reading', backref='greenhouse', lazy=True)
+    crop = db.Column(db.String(50))  # Selects the crop's threshold profile when none is assigned directly
+    threshold_profile_id = db.Column(db.Integer, db.ForeignKey('threshold_profile.id'), nullable=True)
+    readings = db.relationship('Reading', backref='greenhouse', lazy='write_only')  # Query readings explicitly; never load the full history
     issues = db.relationship('Issue', backref='greenhouse', lazy=True)
 
+class ThresholdProfile(db.Model):
+    # Named set of status thresholds, compiled and cached by routes/thresholds.py
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    crop = db.Column(db.String(50), unique=True)  # Applies to greenhouses growing this crop
+    is_default = db.Column(db.Boolean, default=False)  # Applies to greenhouses without a profile or crop match
+    temperature_critical_low = db.Column(db.Float, default=10)
+    temperature_warning_low = db.Column(db.Float, default=15)
+    temperature_warning_high = db.Column(db.Float, default=30)
+    temperature_critical_high = db.Column(db.Float, default=35)
+    humidity_critical_low = db.Column(db.Float, default=30)
+    humidity_warning_low = db.Column(db.Float, default=40)
+    humidity_warning_high = db.Column(db.Float, default=85)
+    humidity_critical_high = db.Column(db.Float, default=90)
+    air_quality_critical = db.Column(db.String(100), default='Poor')  # Comma-separated values
+    air_quality_warning = db.Column(db.String(100), default='Fair')
+    soil_moisture_critical = db.Column(db.String(100), default='')
+    soil_moisture_warning = db.Column(db.String(100), default='Low,Very Low')
+
 class Reading(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     greenhouse_id = db.Column(db.Integer, db.ForeignKey('greenhouse.id'), nullable=False)
@@ -30,6 +51,37 @@ class Reading(db.Model):
     light_level = db.Column(db.Float)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # History and latest-reading lookups filter by greenhouse and order by time
+    __table_args__ = (
+        db.Index('ix_reading_greenhouse_timestamp', 'greenhouse_id', 'timestamp', 'id'),
+    )
+
+class GreenhouseSnapshot(db.Model):
+    # Materialized "current conditions": the newest reading of each greenhouse, kept up to date by every ingest path
+    greenhouse_id = db.Column(db.Integer, db.ForeignKey('greenhouse.id'), primary_key=True)
+    temperature = db.Column(db.Float)
+    humidity = db.Column(db.Float)
+    air_quality = db.Column(db.String(20))
+    soil_moisture = db.Column(db.String(20))
+    light_level = db.Column(db.Float)
+    timestamp = db.Column(db.DateTime)
+
+class ReadingRollup(db.Model):
+    # Incrementally maintained min/max/sum/count aggregates per greenhouse at minute, hour and day resolution
+    greenhouse_id = db.Column(db.Integer, db.ForeignKey('greenhouse.id'), primary_key=True)
+    resolution = db.Column(db.String(10), primary_key=True)  # minute, hour, day
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float, default=0)
+    humidity_min = db.Column(db.Float)
+    humidity_max = db.Column(db.Float)
+    humidity_sum = db.Column(db.Float, default=0)
+    light_level_min = db.Column(db.Float)
+    light_level_max = db.Column(db.Float)
+    light_level_sum = db.Column(db.Float, default=0)
+
 class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -50,6 +102,34 @@ class Issue(db.Model):
     resolved_at = db.Column(db.DateTime)
     notes = db.Column(db.Text)
 
+    __table_args__ = (
+        db.Index('ix_issue_greenhouse_status', 'greenhouse_id', 'status'),  # Active issues of a greenhouse
+        db.Index('ix_issue_employee_status_priority', 'employee_id', 'status', 'priority'),  # Workload per employee (covering)
+        db.Index('ix_issue_status_resolved', 'status', 'resolved_at'),  # Resolved-today and resolution reports
+        db.Index('ix_issue_created', 'created_at'),  # Recent issues and created-date ranges
+        # Keyset pages of /api/issues filtered by greenhouse, employee, status or priority
+        db.Index('ix_issue_greenhouse_created', 'greenhouse_id', 'created_at', 'id'),
+        db.Index('ix_issue_employee_created', 'employee_id', 'created_at', 'id'),
+        db.Index('ix_issue_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_issue_priority_created', 'priority', 'created_at', 'id'),
+    )
+
+class DailyIssueStats(db.Model):
+    # Per-day issue counters maintained on every flush (see routes/issue_stats.py)
+    day = db.Column(db.Date, primary_key=True)
+    critical = db.Column(db.Integer, nullable=False, default=0)  # Issues created with critical priority
+    warning = db.Column(db.Integer, nullable=False, default=0)  # Issues created with high/medium priority
+    resolved = db.Column(db.Integer, nullable=False, default=0)  # Issues resolved that day
+
+class IssueResolutionStats(db.Model):
+    # Resolved issues per resolution day, greenhouse, type and resolution-time bucket (see routes/report_stats.py)
+    day = db.Column(db.Date, primary_key=True)
+    greenhouse_id = db.Column(db.Integer, primary_key=True)
+    issue_type = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # Log-scale resolution time bucket
+    resolved = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # Should link to User model
@@ -59,3 +139,21 @@ class Notification(db.Model):
     notification_type = db.Column(db.String(20), default='info')  # info, warning, critical, success
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     related_greenhouse = db.Column(db.Integer, db.ForeignKey('greenhouse.id'), nullable=True)
+    # Repeated alerts are coalesced into one notification (see routes/notifications.py)
+    occurrence_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    first_occurred_at = db.Column(db.DateTime)
+    last_occurred_at = db.Column(db.DateTime)
+
+    # Composite indexes backing the keyset-paginated history (newest first per user)
+    __table_args__ = (
+        db.Index('ix_notification_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at', 'id'),
+        db.Index('ix_notification_user_type_created', 'user_id', 'notification_type', 'created_at', 'id'),
+        # Coalesced repeats pushed to open notification streams
+        db.Index('ix_notification_user_occurred', 'user_id', 'last_occurred_at'),
+    )
+
+class UnreadNotificationCount(db.Model):
+    # Unread notifications per user, maintained on every flush (see routes/unread_counts.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
@@ -1,6 +1,26 @@
-from flask import Blueprint, jsonify, request, session, current_app
+from flask import Blueprint, jsonify, request, session, current_app, Response, stream_with_context
 from models import db, Employee, Greenhouse, Reading, Issue, Notification, User # Import necessary models
 from datetime import datetime, timedelta
+from routes.ingest import parse_reading, store_rows, ingest_batch, ingest_stream, max_batch_size, stream_chunk_size
+from routes.write_behind import get_reading_buffer
+from routes.status_machine import get_status_machine
+from routes.backtest import candidate_rules, run_backtest
+from routes.assignment import get_auto_assigner
+from routes.reports import report_range, report_snapshot
+from routes.search import KINDS, search, search_available
+from routes.issue_search import issue_query, serialize_issue
+from routes.bulk_issues import bulk_assign, bulk_resolve, max_bulk_items
+from routes.workload import employee_workload, serialize_employee, search_employees
+from routes.snapshots import greenhouses_with_snapshots
+from routes.rollups import RESOLUTIONS, bucket_count, query_rollups, serialize_rollup
+from routes.downsampling import reading_history, default_history_range
+from routes.issue_stats import TREND_WINDOWS, issue_trend
+from routes.cache import cached, get_response_cache
+from routes.notification_stream import serialize_notification, notification_events, parse_stream_cursor, touch_notification_users
+from routes.utils import count_unread_notifications, parse_utc_datetime
+from routes.unread_counts import adjust_unread_counts
+from routes.pagination import keyset_page, parse_page_size
+from routes.notifications import notify, notify_many, employee_user_id
 
 api_bp = Blueprint('api', __name__, url_prefix='/api') # Add url_prefix for all routes in this blueprint
 
@@ -12,19 +32,39 @@ def api_get_employees():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
         
+    return jsonify(cached('api.employees', ['Employee', 'Issue'], _build_employees))
+
+def _build_employees():
     employees = Employee.query.all()
+    workload = employee_workload() # One grouped query instead of a COUNT per employee
     result = []
     for employee in employees:
-        result.append({
-            'id': employee.id,
-            'name': employee.name,
-            'email': employee.email,
-            'phone': employee.phone,
-            'status': employee.status,
-            # Add issue counts if needed by tests/frontend API consumers
-            'assigned_issues': Issue.query.filter_by(employee_id=employee.id, status='assigned').count()
-        })
-    return jsonify(result)
+        data = serialize_employee(employee, workload)
+        data['assigned_issues'] = data['active_issues'] # Kept for existing API consumers
+        result.append(data)
+    return result
+
+@api_bp.route('/employees/search', methods=['GET'])
+def api_search_employees():
+    # Roster search: ?q= name/email, ?status=available|busy, ?limit= and ?after= (last id of the previous page)
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        after_id = request.args.get('after')
+        after_id = int(after_id) if after_id else None
+    except ValueError as e:
+        if 'limit' not in str(e):
+            return jsonify({'success': False, 'message': 'after must be an integer'}), 400
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    employees, has_more = search_employees(request.args.get('q', '').strip(), request.args.get('status'), after_id, limit)
+    workload = employee_workload([employee.id for employee in employees])
+    return jsonify({
+        'employees': [serialize_employee(employee, workload) for employee in employees],
+        'next_after': employees[-1].id if has_more else None
+    })
 
 @api_bp.route('/greenhouses', methods=['GET'])
 def api_get_greenhouses():
@@ -32,10 +72,17 @@ def api_get_greenhouses():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
 
-    greenhouses = Greenhouse.query.all()
+    return jsonify(cached('api.greenhouses', ['Greenhouse', 'GreenhouseSnapshot', 'Issue'], _build_greenhouses))
+
+def _build_greenhouses():
+    # Issue counts per greenhouse and status in one grouped query
+    issue_counts = dict(((gh_id, status), count) for gh_id, status, count in db.session.query(
+        Issue.greenhouse_id, Issue.status, db.func.count(Issue.id)).\
+        filter(Issue.status.in_(['open', 'assigned'])).\
+        group_by(Issue.greenhouse_id, Issue.status))
+
     result = []
-    for gh in greenhouses:
-        latest_reading = Reading.query.filter_by(greenhouse_id=gh.id).order_by(Reading.timestamp.desc()).first()
+    for gh, latest_reading in greenhouses_with_snapshots():
         result.append({
             'id': gh.id,
             'name': gh.name,
@@ -49,11 +96,66 @@ def api_get_greenhouses():
                 'light_level': latest_reading.light_level if latest_reading else None,
                 'timestamp': latest_reading.timestamp.isoformat() if latest_reading else None
             } if latest_reading else None,
-             'open_issues': Issue.query.filter_by(greenhouse_id=gh.id, status='open').count(),
-             'assigned_issues': Issue.query.filter_by(greenhouse_id=gh.id, status='assigned').count()
+             'open_issues': issue_counts.get((gh.id, 'open'), 0),
+             'assigned_issues': issue_counts.get((gh.id, 'assigned'), 0)
         })
-    return jsonify(result)
+    return result
+
+
+@api_bp.route('/greenhouses/<int:id>/readings', methods=['GET'])
+def api_get_greenhouse_readings(id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    Greenhouse.query.get_or_404(id)
+    try:
+        end = parse_utc_datetime(request.args['to']) if 'to' in request.args else datetime.utcnow()
+        start = parse_utc_datetime(request.args['from']) if 'from' in request.args else default_history_range(end)[0]
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid from/to timestamp'}), 400
+    max_points = request.args.get('max_points', 1000, type=int)
+    algorithm = request.args.get('algorithm', 'lttb')
+    if start >= end or not max_points or not 3 <= max_points <= current_app.config.get('READING_HISTORY_MAX_POINTS', 10000):
+        return jsonify({'success': False, 'message': 'Invalid range or max_points'}), 400
+    if algorithm not in ['lttb', 'minmax']:
+        return jsonify({'success': False, 'message': 'Invalid algorithm'}), 400
+
+    # Columnar response: epoch-ms timestamps plus one array per metric
+    history = reading_history(id, start, end, max_points, algorithm,
+                              timedelta(hours=current_app.config.get('READING_HISTORY_RAW_MAX_HOURS', 24)))
+    history.update({'greenhouse_id': id, 'from': start.isoformat(), 'to': end.isoformat()})
+    return jsonify(history)
+
+@api_bp.route('/greenhouses/<int:id>/trends', methods=['GET'])
+def api_get_greenhouse_trends(id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    Greenhouse.query.get_or_404(id)
+    try:
+        end = parse_utc_datetime(request.args['to']) if 'to' in request.args else datetime.utcnow()
+        start = parse_utc_datetime(request.args['from']) if 'from' in request.args else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid from/to timestamp'}), 400
+    points = request.args.get('points', 100, type=int)
+    resolution = request.args.get('resolution')
+    if resolution is not None and resolution not in [name for name, _ in RESOLUTIONS]:
+        return jsonify({'success': False, 'message': 'Invalid resolution'}), 400
+    max_points = current_app.config.get('READING_HISTORY_MAX_POINTS', 10000)
+    if start >= end or not points or not 1 <= points <= max_points:
+        return jsonify({'success': False, 'message': 'Invalid range or point count'}), 400
+    if resolution is not None and bucket_count(start, end, resolution) > max_points:
+        return jsonify({'success': False, 'message': f'Range has more than {max_points} {resolution} buckets; use a coarser resolution'}), 400
 
+    # Automatic resolutions are coarsened until the range fits in max_points buckets
+    resolution, rollups = query_rollups(id, start, end, points, resolution, max_buckets=max_points)
+    return jsonify({
+        'greenhouse_id': id,
+        'resolution': resolution,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'buckets': [serialize_rollup(rollup) for rollup in rollups]
+    })
 
 @api_bp.route('/assign-employee', methods=['POST'])
 def assign_employee():
@@ -103,27 +205,22 @@ def assign_employee():
     # Update employee status
     employee.status = 'busy'
     
-    # Create notification for the assigning user
-    notification = Notification(
-        user_id=session['user_id'],
-        title=f'Assignment - {greenhouse.name}',
-        message=f'{employee.name} has been assigned to resolve issues at {greenhouse.name}',
-        notification_type='info',
-        related_greenhouse=greenhouse_id
-    )
-    db.session.add(notification)
-    
-    # Optionally, notify the assigned employee if they are also a user
-    assigned_user = User.query.filter_by(email=employee.email).first()
-    if assigned_user:
-         employee_notification = Notification(
-            user_id=assigned_user.id,
-            title=f'New Assignment - {greenhouse.name}',
-            message=f'You have been assigned to resolve issues at {greenhouse.name}. Priority: {priority}',
-            notification_type='info',
-            related_greenhouse=greenhouse_id
-        )
-         db.session.add(employee_notification)
+    # Notify the assigning user and, if they are also a user, the assigned employee
+    events = [{
+        'user_ids': [session['user_id']],
+        'title': f'Assignment - {greenhouse.name}',
+        'message': f'{employee.name} has been assigned to resolve issues at {greenhouse.name}',
+        'related_greenhouse': greenhouse_id
+    }]
+    assigned_user_id = employee_user_id(employee.id)
+    if assigned_user_id:
+        events.append({
+            'user_ids': [assigned_user_id],
+            'title': f'New Assignment - {greenhouse.name}',
+            'message': f'You have been assigned to resolve issues at {greenhouse.name}. Priority: {priority}',
+            'related_greenhouse': greenhouse_id
+        })
+    notify_many(events)
 
     db.session.commit()
     
@@ -159,37 +256,33 @@ def resolve_issue():
              return jsonify({'success': False, 'message': 'No active issues found for this greenhouse'}), 404
 
     resolved_count = 0
+    employee_ids = set()
     for issue in issues:
         resolved_count += 1
         issue.status = 'resolved'
         issue.resolved_at = datetime.utcnow()
-        
-        # Update employee status if no other active issues
         if issue.employee_id:
-            employee = Employee.query.get(issue.employee_id)
-            if employee: # Check if employee exists
-                other_active_issues = Issue.query.filter(
-                    Issue.employee_id == employee.id, 
-                    Issue.status == 'assigned',
-                    Issue.id != issue.id # Exclude the current issue being resolved
-                ).count()
-                
-                if other_active_issues == 0:
-                    employee.status = 'available'
+            employee_ids.add(issue.employee_id)
+
+    # Employees left without assigned issues become available (one grouped query, not a COUNT per issue)
+    if employee_ids:
+        workload = employee_workload(employee_ids)
+        for employee in Employee.query.filter(Employee.id.in_(employee_ids)):
+            if not workload.get(employee.id, {}).get('active_issues'):
+                employee.status = 'available'
     
     # Update greenhouse status only if issues were resolved
     if resolved_count > 0:
         greenhouse.status = 'normal'
     
         # Create notification
-        notification = Notification(
-            user_id=session['user_id'],
-            title=f'Issue Resolved - {greenhouse.name}',
-            message=f'{resolved_count} issue(s) at {greenhouse.name} have been marked as resolved',
+        notify(
+            [session['user_id']],
+            f'Issue Resolved - {greenhouse.name}',
+            f'{resolved_count} issue(s) at {greenhouse.name} have been marked as resolved',
             notification_type='success',
             related_greenhouse=greenhouse_id
         )
-        db.session.add(notification)
     
     db.session.commit()
     
@@ -198,6 +291,101 @@ def resolve_issue():
         'message': f'{resolved_count} issue(s) resolved for {greenhouse.name}'
     })
 
+@api_bp.route('/issues', methods=['GET'])
+def api_list_issues():
+    # Filtered issue history, newest first; pass next_cursor back as ?cursor= for the next page
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        issues, next_cursor = keyset_page(issue_query(request.args), Issue.created_at, Issue.id,
+                                          request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return jsonify({
+        'issues': [serialize_issue(issue) for issue in issues],
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/search', methods=['GET'])
+def api_search():
+    # Ranked full-text search: ?q= words, ?type=issue|notification, ?limit= and ?offset=
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    if not search_available():
+        return jsonify({'success': False, 'message': 'Full-text search requires SQLite FTS5'}), 501
+
+    kind = request.args.get('type')
+    if kind and kind not in KINDS:
+        return jsonify({'success': False, 'message': f"type must be one of: {', '.join(KINDS)}"}), 400
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        offset = request.args.get('offset', 0, type=int)
+        results, has_more = search(request.args.get('q', ''), session['user_id'], [kind] if kind else None, limit, max(offset, 0))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return jsonify({
+        'results': results,
+        'next_offset': max(offset, 0) + limit if has_more else None
+    })
+
+@api_bp.route('/issues/bulk-assign', methods=['POST'])
+def bulk_assign_employees():
+    # Bulk variant of /assign-employee: {"assignments": [{greenhouse_id, employee_id, priority, notes}, ...]}
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('assignments') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'Expected a non-empty list of assignments'}), 400
+    if len(items) > max_bulk_items():
+        return jsonify({'success': False, 'message': f'Request exceeds maximum size of {max_bulk_items()} items'}), 413
+
+    results = bulk_assign(items, session['user_id'])
+    db.session.commit()
+
+    assigned = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': assigned > 0,
+        'assigned': assigned,
+        'failed': len(results) - assigned,
+        'results': results
+    })
+
+@api_bp.route('/issues/bulk-resolve', methods=['POST'])
+def bulk_resolve_issues():
+    # Bulk variant of /resolve-issue: {"greenhouse_ids": [...], "issue_ids": [...]}
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object with greenhouse_ids and/or issue_ids'}), 400
+    try:
+        greenhouse_ids = [int(gh_id) for gh_id in data.get('greenhouse_ids') or []]
+        issue_ids = [int(issue_id) for issue_id in data.get('issue_ids') or []]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'greenhouse_ids and issue_ids must be lists of integers'}), 400
+    if not greenhouse_ids and not issue_ids:
+        return jsonify({'success': False, 'message': 'Expected greenhouse_ids and/or issue_ids'}), 400
+    if len(greenhouse_ids) + len(issue_ids) > max_bulk_items():
+        return jsonify({'success': False, 'message': f'Request exceeds maximum size of {max_bulk_items()} items'}), 413
+
+    greenhouse_results, issue_results = bulk_resolve(greenhouse_ids, issue_ids, session['user_id'])
+    db.session.commit()
+
+    succeeded = sum(1 for result in greenhouse_results + issue_results if result['success'])
+    return jsonify({
+        'success': succeeded > 0,
+        'resolved': sum(result.get('resolved', 0) for result in greenhouse_results + issue_results),
+        'greenhouses': greenhouse_results,
+        'issues': issue_results
+    })
+
 @api_bp.route('/readings/add', methods=['POST'])
 def add_reading():
     # This endpoint might be used by sensors or manually
@@ -211,107 +399,144 @@ def add_reading():
     
     # Basic validation for readings
     try:
-        temp = float(data.get('temperature'))
-        humidity = float(data.get('humidity'))
-        light_level = float(data.get('light_level'))
-        air_quality = str(data.get('air_quality'))
-        soil_moisture = str(data.get('soil_moisture'))
-    except (ValueError, TypeError):
-         return jsonify({'success': False, 'message': 'Invalid reading data format'}), 400
-
-    reading = Reading(
-        greenhouse_id=greenhouse_id,
-        temperature=temp,
-        humidity=humidity,
-        air_quality=air_quality,
-        soil_moisture=soil_moisture,
-        light_level=light_level
-    )
-    
-    db.session.add(reading)
-    
-    # Check if values are within acceptable ranges and update greenhouse status
-    old_status = greenhouse.status
-    new_status = 'normal'
-    issue_priority = None
-    issue_description = None
-    notification_type = 'info'
-    notification_title = None
-    notification_message = None
-
-    # Define thresholds (could be moved to config or DB)
-    CRITICAL_TEMP_HIGH = 35
-    CRITICAL_TEMP_LOW = 10
-    WARNING_TEMP_HIGH = 30
-    WARNING_TEMP_LOW = 15
-    CRITICAL_HUMIDITY_HIGH = 90
-    CRITICAL_HUMIDITY_LOW = 30
-    WARNING_HUMIDITY_HIGH = 85
-    WARNING_HUMIDITY_LOW = 40
-
-    # Determine status based on readings
-    if (temp > CRITICAL_TEMP_HIGH or temp < CRITICAL_TEMP_LOW or 
-        humidity > CRITICAL_HUMIDITY_HIGH or humidity < CRITICAL_HUMIDITY_LOW or 
-        air_quality == 'Poor'):
-        new_status = 'critical'
-        issue_priority = 'critical' # Priority should be critical for critical status
-        issue_description = f"Critical readings: Temp={temp}°C, Humidity={humidity}%, Air Quality={air_quality}"
-        notification_type = 'critical'
-        notification_title = f'Critical Alert - {greenhouse.name}'
-        notification_message = issue_description
-        
-    elif (temp > WARNING_TEMP_HIGH or temp < WARNING_TEMP_LOW or 
-          humidity > WARNING_HUMIDITY_HIGH or humidity < WARNING_HUMIDITY_LOW or 
-          soil_moisture == 'Low' or soil_moisture == 'Very Low' or # Include Very Low as warning too
-          air_quality == 'Fair'): # Add Fair air quality as warning
-        new_status = 'warning'
-        issue_priority = 'high' # Keep high priority for warnings
-        issue_description = f"Warning readings: Temp={temp}°C, Humidity={humidity}%, Soil={soil_moisture}, Air={air_quality}"
-        notification_type = 'warning'
-        notification_title = f'Warning - {greenhouse.name}'
-        notification_message = issue_description
-
-    # Update greenhouse status if changed
-    if new_status != old_status:
-        greenhouse.status = new_status
-        
-        # Create issue only if moving into warning/critical state
-        if new_status in ['warning', 'critical']:
-            existing_issue = Issue.query.filter_by(greenhouse_id=greenhouse_id).filter(Issue.status != 'resolved').first()
-            if not existing_issue:
-                # Determine priority again right before creating, just to be safe
-                current_issue_priority = 'critical' if new_status == 'critical' else 'high'
-                issue = Issue(
-                    greenhouse_id=greenhouse_id,
-                    issue_type='environmental',
-                    priority=current_issue_priority, # Use explicitly determined priority
-                    description=issue_description,
-                    status='open' # New issues start as open
-                )
-                db.session.add(issue)
-        
-        # Create notification for status change (for logged-in users)
-        if 'user_id' in session and notification_title:
-             # Notify all admin/manager users? Or just the current user if they added manually?
-             # For now, notify the user who triggered the action (if manual) or potentially admins
-             admin_users = User.query.filter(User.role.in_(['admin', 'manager'])).all()
-             user_ids_to_notify = {user.id for user in admin_users}
-             if session['user_id'] not in user_ids_to_notify: # Add current user if not admin/manager
-                 user_ids_to_notify.add(session['user_id'])
-
-             for user_id in user_ids_to_notify:
-                 notification = Notification(
-                    user_id=user_id,
-                    title=notification_title,
-                    message=notification_message,
-                    notification_type=notification_type,
-                    related_greenhouse=greenhouse_id
-                 )
-                 db.session.add(notification)
+        row = parse_reading(data)
+    except ValueError as e:
+         return jsonify({'success': False, 'message': str(e)}), 400
+
+    # Write-behind mode: queue the reading and let the background flusher persist it
+    row.setdefault('timestamp', datetime.utcnow())
+    buffer = get_reading_buffer(current_app)
+    if buffer is not None:
+        queued = buffer.submit(row, session.get('user_id'))
+        if not queued:
+            return jsonify({'success': False, 'message': 'Reading buffer is full, retry later'}), 503
+        if queued is True:
+            return jsonify({'success': True, 'message': 'Reading queued', 'queued': True}), 202
+        # 'commit' durability: answer with the outcome of the flush, so clients know whether to retry
+        if queued.wait(current_app.config.get('READING_WRITE_BEHIND_ACK_TIMEOUT', 5)):
+            return jsonify({'success': True, 'message': 'Reading added successfully', 'queued': False}), 201
+        if not queued.event.is_set():
+            return jsonify({'success': False, 'message': 'Reading was queued but not yet committed'}), 503
+        if queued.result is not None: # Flushed, but the reading itself was rejected
+            return jsonify({'success': False, 'message': queued.result['message']}), 404
+        return jsonify({'success': False, 'message': 'Reading could not be stored, retry'}), 500 # Its batch was rolled back
+
+    # Store the reading and check if values are within acceptable ranges to update greenhouse status
+    _, statuses = store_rows([row], session.get('user_id'))
 
     db.session.commit()
     
-    return jsonify({'success': True, 'message': 'Reading added successfully', 'new_status': new_status})
+    return jsonify({'success': True, 'message': 'Reading added successfully', 'new_status': statuses[greenhouse.id]})
+
+@api_bp.route('/readings/batch', methods=['POST'])
+def add_readings_batch():
+    # Bulk variant of /readings/add for sensor gateways reporting many greenhouses at once
+    data = request.json
+    items = data.get('readings') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'Expected a non-empty list of readings'}), 400
+    if len(items) > max_batch_size():
+        return jsonify({'success': False, 'message': f'Batch exceeds maximum size of {max_batch_size()} readings'}), 413
+
+    results, statuses = ingest_batch(items, session.get('user_id'))
+    db.session.commit()
+
+    inserted = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': inserted > 0,
+        'inserted': inserted,
+        'failed': len(results) - inserted,
+        'statuses': {str(gh_id): status for gh_id, status in statuses.items()},
+        'results': results
+    })
+
+@api_bp.route('/readings/stream', methods=['POST'])
+def add_readings_stream():
+    # Streaming NDJSON ingest (one reading per line) for backfilling buffered gateway data
+    chunk_size = request.args.get('chunk_size', stream_chunk_size(), type=int)
+    if chunk_size is None or chunk_size < 1:
+        return jsonify({'success': False, 'message': 'chunk_size must be a positive integer'}), 400
+    chunk_size = min(chunk_size, max_batch_size()) # Each chunk is one bulk insert, bounded like /readings/batch
+    # Backfills of old samples should not override the current greenhouse status, so evaluation is opt-in
+    evaluate = request.args.get('evaluate', 'false').lower() in ['1', 'true', 'yes']
+
+    summary = ingest_stream(request.stream, chunk_size, session.get('user_id'), evaluate)
+    summary['success'] = summary['inserted'] > 0 or summary['lines'] == 0
+    return jsonify(summary)
+
+@api_bp.route('/readings/buffer', methods=['GET'])
+def reading_buffer_stats():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    buffer = get_reading_buffer(current_app)
+    if buffer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(buffer.stats(), enabled=True))
+
+@api_bp.route('/thresholds/backtest', methods=['POST'])
+def backtest_thresholds():
+    # Replays historical readings through a candidate profile and compares it with the current thresholds
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    if session.get('user_role') not in ['admin', 'manager']: # Replays can scan months of readings
+        return jsonify({'success': False, 'message': 'Forbidden'}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    try:
+        days = int(data.get('days', 90))
+        if not 1 <= days <= current_app.config.get('BACKTEST_MAX_DAYS', 365):
+            raise ValueError('days is out of range')
+        greenhouse_ids = data.get('greenhouse_ids')
+        if greenhouse_ids is not None:
+            if not isinstance(greenhouse_ids, list) or not all(
+                    isinstance(gh_id, int) and not isinstance(gh_id, bool) for gh_id in greenhouse_ids):
+                raise ValueError('greenhouse_ids must be a list of integers')
+        candidate = candidate_rules(data.get('profile_id'), data.get('thresholds'))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    try:
+        # Replayed in this process; larger replays belong to the backtest-thresholds CLI command
+        report = run_backtest(candidate, days=days, greenhouse_ids=greenhouse_ids,
+                              max_readings=current_app.config.get('BACKTEST_API_MAX_READINGS'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(report)
+
+@api_bp.route('/status-machine', methods=['GET'])
+def status_machine_stats():
+    # Evaluations, applied transitions and transitions suppressed by hysteresis/debounce
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    machine = get_status_machine(current_app)
+    if machine is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(machine.stats(), enabled=True))
+
+@api_bp.route('/auto-assign', methods=['GET'])
+def auto_assign_stats():
+    # Issues assigned automatically, issues left open for lack of capacity and employee availability
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    assigner = get_auto_assigner(current_app)
+    if assigner is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(assigner.stats(), enabled=True))
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(cache.report(), enabled=True))
 
 @api_bp.route('/notifications', methods=['GET'])
 def get_notifications():
@@ -320,20 +545,61 @@ def get_notifications():
     
     notifications = Notification.query.filter_by(user_id=session['user_id']).order_by(Notification.created_at.desc()).limit(10).all()
     
-    result = []
-    for notification in notifications:
-        result.append({
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'is_read': notification.is_read,
-            'notification_type': notification.notification_type,
-            'created_at': notification.created_at.isoformat(), # Use ISO format for JS parsing
-            'related_greenhouse': notification.related_greenhouse
-        })
+    result = [serialize_notification(notification) for notification in notifications]
     
     return jsonify(result)
 
+@api_bp.route('/notifications/history', methods=['GET'])
+def get_notification_history():
+    # Cursor-paginated history, newest first; pass next_cursor back as ?cursor= for the next page
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    query = Notification.query.filter(Notification.user_id == session['user_id'])
+
+    notification_type = request.args.get('type')
+    if notification_type:
+        query = query.filter(Notification.notification_type == notification_type)
+    greenhouse_id = request.args.get('greenhouse_id', type=int)
+    if greenhouse_id is not None:
+        query = query.filter(Notification.related_greenhouse == greenhouse_id)
+    read = request.args.get('read')
+    if read is not None:
+        if read not in ['true', 'false']:
+            return jsonify({'success': False, 'message': 'read must be true or false'}), 400
+        query = query.filter(Notification.is_read == (read == 'true'))
+
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        notifications, next_cursor = keyset_page(query, Notification.created_at, Notification.id,
+                                                 request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return jsonify({
+        'notifications': [serialize_notification(notification) for notification in notifications],
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/notifications/stream', methods=['GET'])
+def notification_stream():
+    # Server-Sent Events: pushes new notifications and unread-count changes as they are committed
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    last_event_id, updated_since = parse_stream_cursor(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+
+    events = notification_events(
+        session['user_id'],
+        last_event_id,
+        count_unread_notifications,
+        poll_interval=current_app.config.get('NOTIFICATION_STREAM_POLL_SECONDS', 15),
+        max_duration=current_app.config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300),
+        updated_since=updated_since
+    )
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @api_bp.route('/notifications/mark-read', methods=['POST'])
 def mark_notifications_read():
     if 'user_id' not in session:
@@ -354,9 +620,24 @@ def mark_notifications_read():
     else:
         # Mark all notifications as read
         updated_count = Notification.query.filter_by(user_id=session['user_id'], is_read=False).update({'is_read': True})
+        touch_notification_users(db.session, [session['user_id']]) # Bulk update bypasses the flush hooks
+        adjust_unread_counts(db.session, {session['user_id']: -updated_count})
         db.session.commit()
         return jsonify({'success': True, 'message': f'{updated_count} notifications marked as read'})
 
+@api_bp.route('/reports/resolution', methods=['GET'])
+def api_resolution_report():
+    # Resolution-time summary for issues resolved between ?from= and ?to= (inclusive YYYY-MM-DD dates)
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    try:
+        start, end = report_range(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    report = report_snapshot(start, end)
+    return jsonify(dict(report['resolution'], **{'from': start.isoformat(), 'to': (end - timedelta(days=1)).isoformat()}))
+
 @api_bp.route('/statistics', methods=['GET'])
 def get_statistics():
     # No auth check needed if this is for public display or internal use?
@@ -364,17 +645,25 @@ def get_statistics():
     # if 'user_id' not in session:
     #     return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    # Total greenhouses
-    total_greenhouses = Greenhouse.query.count()
+    days = request.args.get('days', 30, type=int)
+    if days not in TREND_WINDOWS:
+        return jsonify({'success': False, 'message': f'days must be one of {TREND_WINDOWS}'}), 400
     
-    # Critical and warning issues (based on greenhouse status)
-    critical_issues_count = Greenhouse.query.filter_by(status='critical').count()
-    warning_issues_count = Greenhouse.query.filter_by(status='warning').count()
-    
-    # Resolved issues today
-    today = datetime.utcnow().date()
+    # Statistics are identical for every caller, so they are served from the shared response cache
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return jsonify(cached('api.statistics', ['Greenhouse', 'Issue'], lambda: _build_statistics(days, today_start), days, today_start.date()))
+
+def _build_statistics(days, today_start):
+    # Total greenhouses plus critical and warning issues (based on greenhouse status) in one grouped query
+    status_counts = dict(db.session.query(Greenhouse.status, db.func.count(Greenhouse.id)).group_by(Greenhouse.status).all())
+    total_greenhouses = sum(status_counts.values())
+    critical_issues_count = status_counts.get('critical', 0)
+    warning_issues_count = status_counts.get('warning', 0)
+    
+    # Resolved issues today (half-open range so an index on resolved_at can be used)
     resolved_today = Issue.query.filter(
-        db.func.date(Issue.resolved_at) == today,
+        Issue.resolved_at >= today_start,
+        Issue.resolved_at < today_start + timedelta(days=1),
         Issue.status == 'resolved'
     ).count()
     
@@ -384,39 +673,14 @@ def get_statistics():
         group_by(Issue.issue_type).all()
     issues_by_type = {issue_type: count for issue_type, count in issue_types}
     
-    # Get 30-day trend data (using date objects for filtering)
-    trend_data = []
-    today_date = datetime.utcnow().date()
-    for i in range(30):
-        day = today_date - timedelta(days=29-i)
-        
-        critical_count = Issue.query.filter(
-            db.func.date(Issue.created_at) == day, 
-            Issue.priority.in_(['critical']) # Match critical priority
-        ).count()
-        
-        warning_count = Issue.query.filter(
-            db.func.date(Issue.created_at) == day, 
-            Issue.priority.in_(['high', 'medium']) # Match warning priorities
-        ).count()
-        
-        resolved_count = Issue.query.filter(
-            db.func.date(Issue.resolved_at) == day,
-            Issue.status == 'resolved'
-        ).count()
-        
-        trend_data.append({
-            'day': day.strftime('%d-%b'), # Format day for labels
-            'critical': critical_count,
-            'warning': warning_count,
-            'resolved': resolved_count
-        })
+    # Trend data for the requested window, read from the daily issue counters in one query
+    trend_data = issue_trend(days, today_start.date())
     
-    return jsonify({
+    return {
         'total_greenhouses': total_greenhouses,
         'critical_issues': critical_issues_count,
         'warning_issues': warning_issues_count,
         'resolved_today': resolved_today,
         'issues_by_type': issues_by_type,
         'trend_data': trend_data
-    })
+    }
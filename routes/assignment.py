@@ -0,0 +1,392 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Employee, Greenhouse, Issue # Import necessary models
+from routes.cache import cached
+from routes.history import track_previous_values, previous_value
+from routes.workload import employee_workload
+
+# Automatic assignment of new critical/high issues.
+# The assigner keeps every employee in an in-memory priority queue ranked by current
+# load (assigned issues), then by how long ago they were last assigned. Employees who
+# have handled issues in the issue's sector (Greenhouse.location) are kept in a queue
+# per sector as well and are preferred while their load is within AUTO_ASSIGN_AFFINITY_SLACK
+# of the least loaded employee. Employees at AUTO_ASSIGN_MAX_LOAD are not assigned more.
+#
+# New issues are assigned in a session before_flush hook, so the assignment is written in
+# the same transaction as the issue. Load changes made by any other Issue write (manual
+# assignment, resolution) are collected after each flush and applied when the transaction
+# commits. State is built from the database at startup; employees added or removed later
+# join or leave the queues on commit. Employees marked busy without assigned issues are
+# not picked.
+#
+# Other processes (workers, the gateway, CLI commands) change loads this process never
+# sees, so every pick is confirmed against the database with one grouped query before it
+# is written, and the state is rebuilt every AUTO_ASSIGN_REBUILD_SECONDS to pick up
+# employees freed elsewhere.
+
+AUTO_ASSIGN_PRIORITIES = ['critical', 'high'] # Most urgent first
+_EPOCH = datetime(1970, 1, 1)
+_CONFIRM_ROUNDS = 3 # Re-picks for issues whose first pick the database rejected
+
+
+def _eligible(status, load):
+    # 'busy' without assigned issues means marked busy by hand
+    return status == 'available' or (status == 'busy' and load > 0)
+
+
+def greenhouse_sectors():
+    """Returns {str(greenhouse id): location}, reloaded only after greenhouses change."""
+    return cached('assignment.sectors', ['Greenhouse'], lambda: {
+        str(gh_id): location for gh_id, location in db.session.query(Greenhouse.id, Greenhouse.location)
+    })
+
+
+class AutoAssigner:
+    """Priority queue of employees ranked by (load, last assignment time)."""
+
+    def __init__(self, max_load=1, affinity_slack=0, rebuild_interval=None):
+        self.max_load = max(max_load, 1)
+        self.affinity_slack = affinity_slack
+        self.rebuild_interval = rebuild_interval
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+        self._load = {}
+        self._status = {}
+        self._last = {}
+        self._affinity = {} # employee id -> {sector: issues handled there}
+        self._heap = []
+        self._sector_heaps = {}
+        self._version = {} # Heap entries of an older version are stale and skipped
+        self.counters = {'assigned': 0, 'left_open': 0, 'rebuilds': 0, 'rejected': 0}
+
+    def _push(self, employee_id):
+        version = self._version.get(employee_id, 0) + 1
+        self._version[employee_id] = version
+        entry = (self._load[employee_id], self._last[employee_id], employee_id, version)
+        heapq.heappush(self._heap, entry)
+        for sector in self._affinity[employee_id]:
+            heapq.heappush(self._sector_heaps.setdefault(sector, []), entry)
+        if len(self._heap) > 4 * len(self._load) + 64:
+            self._compact()
+
+    def _compact(self):
+        self._heap = []
+        self._sector_heaps = {}
+        for employee_id in self._load:
+            entry = (self._load[employee_id], self._last[employee_id], employee_id, self._version[employee_id])
+            self._heap.append(entry)
+            for sector in self._affinity[employee_id]:
+                self._sector_heaps.setdefault(sector, []).append(entry)
+        heapq.heapify(self._heap)
+        for heap in self._sector_heaps.values():
+            heapq.heapify(heap)
+
+    def _top(self, heap):
+        # Entries of employees who became ineligible are dropped; they are pushed again on change
+        while heap and (heap[0][3] != self._version.get(heap[0][2]) or
+                        not _eligible(self._status[heap[0][2]], self._load[heap[0][2]])):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def rebuild_due(self):
+        return self.rebuild_interval is not None and (
+            self._rebuilt_at is None or time.monotonic() - self._rebuilt_at >= self.rebuild_interval)
+
+    def rebuild(self):
+        """Reloads employee loads, statuses, recency and sector affinity with grouped queries."""
+        status = dict(db.session.query(Employee.id, Employee.status))
+        load = dict.fromkeys(status, 0)
+        last = dict.fromkeys(load, 0.0)
+        affinity = {employee_id: {} for employee_id in load}
+        for employee_id, count in db.session.query(Issue.employee_id, db.func.count(Issue.id)).\
+                filter(Issue.employee_id.isnot(None), Issue.status == 'assigned').group_by(Issue.employee_id):
+            if employee_id in load:
+                load[employee_id] = count
+        for employee_id, created_at in db.session.query(Issue.employee_id, db.func.max(Issue.created_at)).\
+                filter(Issue.employee_id.isnot(None)).group_by(Issue.employee_id):
+            if employee_id in load and created_at is not None:
+                last[employee_id] = (created_at - _EPOCH).total_seconds() # created_at is naive UTC
+        for employee_id, location, count in db.session.query(Issue.employee_id, Greenhouse.location, db.func.count(Issue.id)).\
+                join(Greenhouse, Greenhouse.id == Issue.greenhouse_id).\
+                filter(Issue.employee_id.isnot(None), Greenhouse.location.isnot(None)).\
+                group_by(Issue.employee_id, Greenhouse.location):
+            if employee_id in load:
+                affinity[employee_id][location] = count
+
+        with self._lock:
+            self._load, self._status, self._last, self._affinity = load, status, last, affinity
+            self._version = dict.fromkeys(load, 0)
+            self._compact()
+            self._rebuilt_at = time.monotonic()
+            self.counters['rebuilds'] += 1
+        return len(load)
+
+    def assign(self, sector=None):
+        """Picks an employee for an issue in `sector` and reserves the load; None if all are at capacity."""
+        with self._lock:
+            best = self._top(self._heap)
+            if best is None or best[0] >= self.max_load:
+                self.counters['left_open'] += 1
+                return None
+            local = self._top(self._sector_heaps.get(sector, [])) if sector else None
+            if local is not None and local[0] < self.max_load and local[0] <= best[0] + self.affinity_slack:
+                best = local
+            employee_id = best[2]
+            self._load[employee_id] += 1
+            self._last[employee_id] = time.time()
+            if sector:
+                self._affinity[employee_id][sector] = self._affinity[employee_id].get(sector, 0) + 1
+            self._push(employee_id)
+            self.counters['assigned'] += 1
+            return employee_id
+
+    def confirm(self, employee_id, rejected, load, status):
+        """Corrects an employee from the database after `rejected` of their picks were refused.
+
+        `load` is the employee's load in the database plus the picks accepted; `status`
+        None means the employee no longer exists.
+        """
+        with self._lock:
+            if employee_id not in self._load:
+                return
+            if status is None:
+                for state in [self._load, self._status, self._last, self._affinity, self._version]:
+                    state.pop(employee_id, None)
+                return
+            self.counters['rejected'] += rejected
+            self._load[employee_id] = max(self._load[employee_id] - rejected, load)
+            self._status[employee_id] = status
+            self._push(employee_id)
+
+    def apply(self, changes, reserved=(), added=(), removed=(), statuses=None):
+        """Applies committed (employee id, sector, delta) load changes.
+
+        `reserved` lists the (employee id, sector) assignments this transaction already
+        reserved through assign(), which are part of `changes` too. `added` and `removed`
+        are ids of employees created or deleted by the transaction, `statuses` maps
+        employee ids to a status the transaction set.
+        """
+        pending = Counter(reserved)
+        net = Counter()
+        now = time.time()
+        statuses = statuses or {}
+        with self._lock:
+            for employee_id in added:
+                self._load.setdefault(employee_id, 0)
+                self._status.setdefault(employee_id, statuses.get(employee_id, 'available'))
+                self._last.setdefault(employee_id, 0.0)
+                self._affinity.setdefault(employee_id, {})
+                self._push(employee_id)
+            for employee_id in removed:
+                for state in [self._load, self._status, self._last, self._affinity, self._version]:
+                    state.pop(employee_id, None)
+            for employee_id, sector, delta in changes:
+                if employee_id not in self._load:
+                    continue
+                if delta > 0 and pending[(employee_id, sector)]:
+                    pending[(employee_id, sector)] -= 1
+                    continue
+                net[employee_id] += delta
+                if delta > 0:
+                    self._last[employee_id] = now
+                    if sector:
+                        self._affinity[employee_id][sector] = self._affinity[employee_id].get(sector, 0) + 1
+            for employee_id, delta in net.items():
+                if delta:
+                    self._load[employee_id] = max(self._load[employee_id] + delta, 0)
+                    self._push(employee_id)
+            for employee_id, status in statuses.items():
+                if employee_id in self._status and self._status[employee_id] != status:
+                    self._status[employee_id] = status
+                    self._push(employee_id)
+
+    def release(self, reserved):
+        """Returns the load reserved by a transaction that was rolled back."""
+        with self._lock:
+            for employee_id, sector in reserved:
+                if employee_id in self._load:
+                    self._load[employee_id] = max(self._load[employee_id] - 1, 0)
+                    self._push(employee_id)
+
+    def load(self, employee_id):
+        with self._lock:
+            return self._load.get(employee_id)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['employees'] = len(self._load)
+            stats['available'] = sum(1 for employee_id, load in self._load.items()
+                                     if load < self.max_load and _eligible(self._status[employee_id], load))
+        stats.update({'max_load': self.max_load, 'affinity_slack': self.affinity_slack,
+                      'rebuild_interval': self.rebuild_interval})
+        return stats
+
+
+def get_auto_assigner(app=None):
+    if app is None:
+        app = current_app if has_app_context() else None
+    return app.extensions.get('auto_assigner') if app is not None else None
+
+
+def init_auto_assigner(app):
+    """Creates the auto-assigner and builds its state from the database, when enabled."""
+    if not app.config.get('AUTO_ASSIGN_ENABLED'):
+        return None
+    assigner = AutoAssigner(
+        max_load=app.config.get('AUTO_ASSIGN_MAX_LOAD', 1),
+        affinity_slack=app.config.get('AUTO_ASSIGN_AFFINITY_SLACK', 0),
+        rebuild_interval=app.config.get('AUTO_ASSIGN_REBUILD_SECONDS')
+    )
+    with app.app_context():
+        assigner.rebuild()
+    app.extensions['auto_assigner'] = assigner
+    return assigner
+
+
+@event.listens_for(Session, 'before_flush')
+def _assign_new_issues(session, flush_context, instances):
+    assigner = get_auto_assigner()
+    if assigner is None:
+        return
+    issues = [obj for obj in session.new if isinstance(obj, Issue) and obj.employee_id is None
+              and obj.status in [None, 'open'] and obj.priority in AUTO_ASSIGN_PRIORITIES]
+    if not issues:
+        return
+
+    if assigner.rebuild_due():
+        assigner.rebuild() # Picks up loads freed by other processes
+    sectors = greenhouse_sectors()
+    reserved = session.info.setdefault('auto_assigned', [])
+    assigned = {}
+    taken = Counter()
+    pending = sorted(issues, key=lambda issue: AUTO_ASSIGN_PRIORITIES.index(issue.priority))
+    for _ in range(_CONFIRM_ROUNDS):
+        picks = []
+        for issue in pending:
+            greenhouse_id = issue.greenhouse_id if issue.greenhouse_id is not None else getattr(issue.greenhouse, 'id', None)
+            sector = sectors.get(str(greenhouse_id))
+            employee_id = assigner.assign(sector)
+            if employee_id is not None:
+                picks.append((issue, employee_id, sector))
+        if not picks:
+            break
+        accepted, pending = _confirm_picks(session, assigner, picks, assigned, taken)
+        for issue, employee_id, sector in accepted:
+            issue.employee_id = employee_id
+            issue.status = 'assigned'
+            reserved.append((employee_id, sector))
+        if not pending:
+            break
+    # Objects changed in before_flush are written by this same flush
+    for employee in assigned.values():
+        employee.status = 'busy'
+
+
+def _confirm_picks(session, assigner, picks, employees, taken):
+    """Checks picked employees against the database (one grouped query plus their rows).
+
+    Picks beyond an employee's remaining capacity, or of an employee who is unavailable,
+    are refused and the assigner corrected. Returns (accepted picks, issues to pick again).
+    Accepted employees are added to `employees` ({id: Employee}) and counted in `taken`,
+    which carry over between rounds of the same flush.
+    """
+    ids = {employee_id for _, employee_id, _ in picks}
+    workload = employee_workload(ids)
+    rows = {employee.id: employee for employee in session.query(Employee).filter(Employee.id.in_(ids))}
+    refused = Counter()
+    accepted, retry = [], []
+    for issue, employee_id, sector in picks:
+        employee = rows.get(employee_id)
+        load = workload.get(employee_id, {}).get('active_issues', 0) + taken[employee_id]
+        # Employees accepted earlier in this flush are marked busy once picking is done
+        status = None if employee is None else 'busy' if employee_id in employees else employee.status
+        if status is not None and _eligible(status, load) and load < assigner.max_load:
+            taken[employee_id] += 1
+            employees[employee_id] = employee
+            accepted.append((issue, employee_id, sector))
+        else:
+            refused[employee_id] += 1
+            retry.append(issue)
+    for employee_id in refused:
+        employee = rows.get(employee_id)
+        load = workload.get(employee_id, {}).get('active_issues', 0) + taken[employee_id]
+        assigner.confirm(employee_id, refused[employee_id], load, employee.status if employee is not None else None)
+    return accepted, retry
+
+
+# Load the previous value when these attributes are set on an expired Issue
+track_previous_values(Issue.employee_id, Issue.status)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_workload_changes(session, flush_context):
+    if get_auto_assigner() is None:
+        return
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Employee):
+            session.info.setdefault('workload_employees_added', []).append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Employee):
+            session.info.setdefault('workload_employees_removed', []).append(obj.id)
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Employee) and db.inspect(obj).attrs.status.history.has_changes():
+            session.info.setdefault('workload_employee_statuses', {})[obj.id] = obj.status
+
+    def add(employee_id, status, greenhouse_id, sign):
+        if employee_id is not None and status == 'assigned':
+            changes.append((employee_id, greenhouse_id, sign))
+
+    for obj in session.new:
+        if isinstance(obj, Issue):
+            add(obj.employee_id, obj.status, obj.greenhouse_id, 1)
+    for obj in session.dirty:
+        if isinstance(obj, Issue) and session.is_modified(obj):
+            add(previous_value(obj, 'employee_id'), previous_value(obj, 'status'), obj.greenhouse_id, -1)
+            add(obj.employee_id, obj.status, obj.greenhouse_id, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Issue):
+            add(previous_value(obj, 'employee_id'), previous_value(obj, 'status'), obj.greenhouse_id, -1)
+    if changes:
+        adjust_workload(session, changes)
+
+
+def adjust_workload(session, changes):
+    """Records (employee id, greenhouse id, delta) assigned-issue changes made in this transaction.
+
+    Bulk statements bypass the flush hooks and report their changes here.
+    """
+    if get_auto_assigner() is None:
+        return
+    sectors = greenhouse_sectors()
+    session.info.setdefault('workload_changes', []).extend(
+        (employee_id, sectors.get(str(greenhouse_id)), delta) for employee_id, greenhouse_id, delta in changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_workload_changes(session):
+    changes = session.info.pop('workload_changes', None)
+    reserved = session.info.pop('auto_assigned', None)
+    added = session.info.pop('workload_employees_added', None)
+    removed = session.info.pop('workload_employees_removed', None)
+    statuses = session.info.pop('workload_employee_statuses', None)
+    assigner = get_auto_assigner()
+    if assigner is not None and (changes or reserved or added or removed or statuses):
+        assigner.apply(changes or [], reserved or [], added or [], removed or [], statuses)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _release_workload_changes(session):
+    for key in ['workload_changes', 'workload_employees_added', 'workload_employees_removed', 'workload_employee_statuses']:
+        session.info.pop(key, None)
+    reserved = session.info.pop('auto_assigned', None)
+    assigner = get_auto_assigner()
+    if assigner is not None and reserved:
+        assigner.release(reserved)
@@ -0,0 +1,277 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine
+from models import db, Greenhouse, Reading, ThresholdProfile # Import necessary models
+from routes.notifications import role_recipients
+from routes.thresholds import CATEGORICAL_METRICS, DEFAULT_THRESHOLDS, NUMERIC_METRICS, STATUSES, RuleSet, get_rules
+
+# Threshold backtesting: replays historical readings through a candidate threshold
+# profile and the thresholds currently in effect, and reports what each would have
+# produced. Readings are streamed per greenhouse in chunks into columnar arrays and
+# classified for every compared profile at once. The API replays in the request's own
+# process and refuses ranges above BACKTEST_API_MAX_READINGS; larger replays belong to
+# `flask backtest-thresholds`, which can spread greenhouses over a process pool.
+#
+# Replays use the raw per-reading evaluation (no hysteresis or debounce). A would-be
+# issue is an episode that leaves normal status; would-be alerts are transitions into
+# warning or critical, as notified by the ingest path.
+
+_worker_engines = {}
+
+
+def candidate_rules(profile_id=None, overrides=None):
+    """Compiles the candidate profile: a stored profile and/or threshold overrides.
+
+    Raises ValueError for unknown profiles or threshold names.
+    """
+    values = dict(DEFAULT_THRESHOLDS)
+    if profile_id is not None:
+        profile = db.session.get(ThresholdProfile, profile_id)
+        if profile is None:
+            raise ValueError('Threshold profile not found')
+        values.update({name: getattr(profile, name) for name in DEFAULT_THRESHOLDS if getattr(profile, name) is not None})
+    for name, value in (overrides or {}).items():
+        if name not in DEFAULT_THRESHOLDS:
+            raise ValueError(f'Unknown threshold: {name}')
+        values[name] = str(value) if isinstance(DEFAULT_THRESHOLDS[name], str) else float(value)
+    return RuleSet([(None, 'candidate', None, True, values)])
+
+
+class _Replay:
+    """Accumulates transitions, issues and time in status for one rule set."""
+
+    def __init__(self):
+        self.status = None
+        self.transitions = 0
+        self.issues = 0
+        self.alerts = 0
+        self.samples = np.zeros(len(STATUSES), dtype=np.int64)
+        self.seconds = np.zeros(len(STATUSES), dtype=np.float64)
+
+    def feed(self, codes, seconds_after):
+        # seconds_after[i]: time from sample i to the next sample (or the end of the window)
+        previous = np.concatenate(([codes[0] if self.status is None else self.status], codes[:-1]))
+        changed = codes != previous
+        self.transitions += int(np.count_nonzero(changed))
+        self.alerts += int(np.count_nonzero(changed & (codes > 0)))
+        self.issues += int(np.count_nonzero(changed & (codes > 0) & (previous == 0)))
+        self.samples += np.bincount(codes, minlength=len(STATUSES))
+        self.seconds += np.bincount(codes, weights=seconds_after, minlength=len(STATUSES))
+        self.status = int(codes[-1])
+
+    def report(self):
+        return {
+            'transitions': self.transitions,
+            'issues': self.issues,
+            'alerts': self.alerts,
+            'samples_in_status': {status: int(n) for status, n in zip(STATUSES, self.samples)},
+            'seconds_in_status': {status: round(float(s), 1) for status, s in zip(STATUSES, self.seconds)}
+        }
+
+
+def _engine(bind):
+    if isinstance(bind, str):
+        # Worker processes open their own engine once
+        if bind not in _worker_engines:
+            _worker_engines[bind] = create_engine(bind)
+        return _worker_engines[bind]
+    return bind
+
+
+def _epoch_ms(dialect, column):
+    # Converting timestamps to epoch milliseconds in SQL avoids building a datetime per row
+    if dialect == 'sqlite':
+        return (db.func.julianday(column) - 2440587.5) * 86400000.0
+    if dialect == 'postgresql':
+        return db.func.extract('epoch', column) * 1000.0
+    return None
+
+
+def _category_codes(rule_sets):
+    # Per categorical metric, a code for every category any of the profiles rates;
+    # values no profile mentions (and NULL) are code 0, which is always normal
+    codes = {}
+    for metric in CATEGORICAL_METRICS:
+        names = set()
+        for rules, index in rule_sets:
+            critical, warning = rules.categories[index][metric]
+            names |= critical | warning
+        codes[metric] = {name: code for code, name in enumerate(sorted(names), 1)}
+    return codes
+
+
+def _compile(rule_sets, codes):
+    """Stacks the profiles of `rule_sets` so one chunk is classified for all of them at once.
+
+    Returns numeric bounds shaped (rule sets, metrics, 4) and, per categorical metric, a
+    (rule sets, codes) severity table.
+    """
+    bounds = np.stack([rules.bounds[index] for rules, index in rule_sets])
+    tables = {}
+    for metric in CATEGORICAL_METRICS:
+        table = np.zeros((len(rule_sets), len(codes[metric]) + 1), dtype=np.int8)
+        for r, (rules, index) in enumerate(rule_sets):
+            critical, warning = rules.categories[index][metric]
+            for name, code in codes[metric].items():
+                table[r, code] = 2 if name in critical else 1 if name in warning else 0
+        tables[metric] = table
+    return bounds, tables
+
+
+def _classify(compiled, values):
+    # values: (rows, 4) array of temperature, humidity and the two category codes.
+    # Returns (rule sets, rows) status codes, matching RuleSet.classify_batch
+    bounds, tables = compiled
+    status = np.zeros((len(bounds), len(values)), dtype=np.int8)
+    for m in range(len(NUMERIC_METRICS)):
+        column = values[:, m]
+        low, high = bounds[:, m, :2, None], bounds[:, m, 2:, None]
+        critical = (column < low[:, 0]) | (column > high[:, 1])
+        warning = (column < low[:, 1]) | (column > high[:, 0])
+        np.maximum(status, np.where(critical, 2, np.where(warning, 1, 0)).astype(np.int8), out=status)
+    for m, metric in enumerate(CATEGORICAL_METRICS, len(NUMERIC_METRICS)):
+        np.maximum(status, tables[metric][:, values[:, m].astype(np.int64)], out=status)
+    return status
+
+
+def _chunks(connection, query, chunk_size):
+    # Yields the result as lists of plain tuples, which NumPy converts without probing
+    # each row for array interfaces
+    if connection.dialect.name == 'sqlite':
+        # The pysqlite cursor fetches lazily already; reading it directly skips building a Row per reading
+        cursor = connection.execute(query).cursor
+        rows = cursor.fetchmany(chunk_size)
+        while rows:
+            yield rows
+            rows = cursor.fetchmany(chunk_size)
+        return
+    for rows in connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query).partitions():
+        yield [tuple(row) for row in rows]
+
+
+def backtest_greenhouse(bind, greenhouse_id, start, end, rule_sets, chunk_size=50000):
+    """Replays one greenhouse's readings in [start, end) through (rules, profile index) pairs.
+
+    `bind` is an Engine or a database URL (used by worker processes).
+    Returns (greenhouse_id, reading count, [report per rule set]).
+    """
+    table = Reading.__table__
+    engine = _engine(bind)
+    epoch_ms = _epoch_ms(engine.dialect.name, table.c.timestamp)
+    codes = _category_codes(rule_sets)
+    compiled = _compile(rule_sets, codes)
+    # Categories are coded in SQL so every fetched column is numeric and each chunk
+    # becomes one float array without a per-row Python pass
+    categories = [db.case(codes[metric], value=table.c[metric], else_=0) if codes[metric] else db.literal(0)
+                  for metric in CATEGORICAL_METRICS]
+    query = db.select(epoch_ms if epoch_ms is not None else table.c.timestamp,
+                      *[table.c[name] for name in NUMERIC_METRICS], *categories).where(
+        table.c.greenhouse_id == greenhouse_id, table.c.timestamp >= start, table.c.timestamp < end
+    ).order_by(table.c.timestamp, table.c.id)
+    replays = [_Replay() for _ in rule_sets]
+    count = 0
+    pending = None # Last chunk, held back until the next timestamp is known
+    end_ms = np.datetime64(end, 'ms')
+
+    def flush(chunk, next_timestamp):
+        timestamps, statuses = chunk
+        following = np.append(timestamps[1:], next_timestamp)
+        seconds_after = (following - timestamps).astype(np.float64) / 1000.0
+        for replay, codes in zip(replays, statuses):
+            replay.feed(codes, seconds_after)
+
+    with engine.connect() as connection:
+        for rows in _chunks(connection, query, chunk_size):
+            if epoch_ms is not None:
+                values = np.array(rows, dtype=np.float64) # NULL readings become NaN
+                timestamps = values[:, 0].round().astype('datetime64[ms]')
+            else:
+                timestamps = np.array([row[0] for row in rows], dtype='datetime64[ms]')
+                values = np.array([(0.0,) + row[1:] for row in rows], dtype=np.float64)
+            count += len(rows)
+            if pending is not None:
+                flush(pending, timestamps[0])
+            pending = (timestamps, _classify(compiled, values[:, 1:]))
+    if pending is not None:
+        flush(pending, end_ms)
+    return greenhouse_id, count, [replay.report() for replay in replays]
+
+
+def _worker(args):
+    return backtest_greenhouse(*args)
+
+
+def _totals(reports):
+    totals = {'transitions': 0, 'issues': 0, 'alerts': 0,
+              'samples_in_status': {status: 0 for status in STATUSES},
+              'seconds_in_status': {status: 0.0 for status in STATUSES}}
+    for report in reports:
+        for key in ['transitions', 'issues', 'alerts']:
+            totals[key] += report[key]
+        for status in STATUSES:
+            totals['samples_in_status'][status] += report['samples_in_status'][status]
+            totals['seconds_in_status'][status] = round(totals['seconds_in_status'][status] + report['seconds_in_status'][status], 1)
+    return totals
+
+
+def run_backtest(candidate, days=90, greenhouse_ids=None, workers=1, chunk_size=50000, end=None, max_readings=None):
+    """Backtests a candidate RuleSet against the current thresholds over the last `days` days.
+
+    With workers > 1 greenhouses are replayed in a process pool; each worker opens its
+    own database connection. Raises ValueError when more than `max_readings` readings
+    would be replayed.
+    """
+    end = end or datetime.utcnow()
+    start = end - timedelta(days=days)
+    started = time.perf_counter()
+    current = get_rules()
+    query = Greenhouse.query.order_by(Greenhouse.id)
+    if greenhouse_ids:
+        query = query.filter(Greenhouse.id.in_(greenhouse_ids))
+    greenhouses = query.all()
+    if max_readings is not None:
+        # Counted on the (greenhouse_id, timestamp) index before any reading is fetched
+        readings = db.session.query(db.func.count(Reading.id)).filter(
+            Reading.greenhouse_id.in_([gh.id for gh in greenhouses]), Reading.timestamp >= start, Reading.timestamp < end).scalar()
+        if readings > max_readings:
+            raise ValueError(f'{readings} readings exceed the limit of {max_readings}; '
+                             'narrow the range or greenhouses, or run `flask backtest-thresholds`')
+
+    jobs = []
+    for gh in greenhouses:
+        rule_sets = [(candidate, candidate.profile_index(None)), (current, current.profile_index(gh))]
+        jobs.append((gh.id, start, end, rule_sets, chunk_size))
+    if workers > 1 and len(jobs) > 1:
+        url = db.engine.url.render_as_string(hide_password=False)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_worker, [(url,) + job for job in jobs]))
+    else:
+        results = [backtest_greenhouse(db.engine, *job) for job in jobs]
+
+    names = {gh.id: gh.name for gh in greenhouses}
+    recipients = len(role_recipients()) # Alerts are sent to every admin and manager
+    per_greenhouse = []
+    for greenhouse_id, count, (candidate_report, current_report) in results:
+        per_greenhouse.append({
+            'greenhouse_id': greenhouse_id,
+            'name': names[greenhouse_id],
+            'readings': count,
+            'candidate': candidate_report,
+            'current': current_report
+        })
+    summary = {}
+    for key in ['candidate', 'current']:
+        summary[key] = _totals([entry[key] for entry in per_greenhouse])
+        summary[key]['notifications'] = summary[key]['alerts'] * recipients
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'readings': sum(entry['readings'] for entry in per_greenhouse),
+        'workers': workers,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'candidate': summary['candidate'],
+        'current': summary['current'],
+        'greenhouses': per_greenhouse
+    }
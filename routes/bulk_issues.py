@@ -0,0 +1,196 @@
+from datetime import datetime
+from flask import current_app
+from models import db, Employee, Greenhouse, Issue # Import necessary models
+from routes.notifications import notify_many, employee_user_id
+from routes.workload import PRIORITIES, employee_workload
+
+# Bulk variants of /api/assign-employee and /api/resolve-issue.
+# Every affected greenhouse, issue and employee is loaded with one IN query, employee
+# availability is recomputed with one grouped count, notifications are written with one
+# bulk insert and the caller commits everything at once. Each input item gets its own
+# result entry; invalid items are reported and skipped.
+
+ACTIVE_STATUSES = ['open', 'assigned']
+
+
+def max_bulk_items():
+    return current_app.config.get('BULK_ACTION_MAX_ITEMS', 500)
+
+
+def _by_id(model, ids):
+    return {obj.id: obj for obj in model.query.filter(model.id.in_(ids))} if ids else {}
+
+
+def _active_issues(greenhouse_ids):
+    # Oldest active issue per greenhouse, as the single-greenhouse endpoints use
+    issues = {}
+    if greenhouse_ids:
+        for issue in Issue.query.filter(Issue.greenhouse_id.in_(greenhouse_ids), Issue.status.in_(ACTIVE_STATUSES)).order_by(Issue.id):
+            issues.setdefault(issue.greenhouse_id, []).append(issue)
+    return issues
+
+
+def _free_idle_employees(employee_ids):
+    """Marks the employees left without assigned issues available (one grouped count)."""
+    if not employee_ids:
+        return
+    workload = employee_workload(employee_ids)
+    for employee in Employee.query.filter(Employee.id.in_(employee_ids)):
+        if not workload.get(employee.id, {}).get('active_issues'):
+            employee.status = 'available'
+
+
+def bulk_assign(items, user_id):
+    """Assigns employees to greenhouses; items have greenhouse_id, employee_id, priority and notes.
+
+    Returns one result per item. The caller commits the session.
+    """
+    results = [None] * len(items)
+    valid = []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not all([item.get('greenhouse_id'), item.get('employee_id'), item.get('priority')]):
+            results[index] = {'index': index, 'success': False, 'message': 'Missing required fields'}
+        elif item['priority'] not in PRIORITIES:
+            results[index] = {'index': index, 'success': False, 'message': f"Invalid priority: {item['priority']}"}
+        else:
+            try:
+                item = dict(item, greenhouse_id=int(item['greenhouse_id']), employee_id=int(item['employee_id']))
+            except (TypeError, ValueError):
+                results[index] = {'index': index, 'success': False, 'message': 'greenhouse_id and employee_id must be integers'}
+                continue
+            if item['greenhouse_id'] in seen:
+                results[index] = {'index': index, 'success': False, 'message': 'Duplicate greenhouse in request'}
+                continue
+            seen.add(item['greenhouse_id'])
+            valid.append((index, item))
+
+    greenhouses = _by_id(Greenhouse, {item['greenhouse_id'] for _, item in valid})
+    employees = _by_id(Employee, {item['employee_id'] for _, item in valid})
+    active = _active_issues(list(greenhouses))
+
+    replaced = set()
+    events = []
+    for index, item in valid:
+        greenhouse = greenhouses.get(item['greenhouse_id'])
+        employee = employees.get(item['employee_id'])
+        if not greenhouse or not employee:
+            results[index] = {'index': index, 'success': False, 'message': 'Employee or greenhouse not found'}
+            continue
+
+        issues = active.get(greenhouse.id)
+        if not issues:
+            issue = Issue(
+                greenhouse_id=greenhouse.id,
+                employee_id=employee.id,
+                issue_type='environmental',
+                description=f'Issue reported in {greenhouse.name}',
+                priority=item['priority'],
+                status='assigned',
+                notes=item.get('notes')
+            )
+            db.session.add(issue)
+        else:
+            issue = issues[0]
+            if issue.employee_id not in [None, employee.id]:
+                replaced.add(issue.employee_id)
+            issue.employee_id = employee.id
+            issue.priority = item['priority']
+            issue.status = 'assigned'
+            issue.notes = item.get('notes')
+        employee.status = 'busy'
+
+        events.append({
+            'user_ids': [user_id],
+            'title': f'Assignment - {greenhouse.name}',
+            'message': f'{employee.name} has been assigned to resolve issues at {greenhouse.name}',
+            'related_greenhouse': greenhouse.id
+        })
+        assigned_user_id = employee_user_id(employee.id)
+        if assigned_user_id:
+            events.append({
+                'user_ids': [assigned_user_id],
+                'title': f'New Assignment - {greenhouse.name}',
+                'message': f"You have been assigned to resolve issues at {greenhouse.name}. Priority: {item['priority']}",
+                'related_greenhouse': greenhouse.id
+            })
+        results[index] = {'index': index, 'success': True, 'greenhouse_id': greenhouse.id, 'employee_id': employee.id,
+                          'message': f'Employee {employee.name} assigned to {greenhouse.name}'}
+
+    # Employees taken off an issue may now be idle
+    _free_idle_employees(replaced - {item['employee_id'] for _, item in valid})
+    notify_many(events)
+    return results
+
+
+def bulk_resolve(greenhouse_ids, issue_ids, user_id):
+    """Resolves every active issue of the greenhouses and the individual issues given.
+
+    Returns (greenhouse results, issue results). The caller commits the session.
+    """
+    greenhouse_ids = list(dict.fromkeys(greenhouse_ids))
+    issue_ids = list(dict.fromkeys(issue_ids))
+    selected = _by_id(Issue, issue_ids)
+    greenhouses = _by_id(Greenhouse, set(greenhouse_ids) | {issue.greenhouse_id for issue in selected.values()})
+    active = _active_issues([gh_id for gh_id in greenhouse_ids if gh_id in greenhouses])
+
+    now = datetime.utcnow()
+    resolved = {} # greenhouse id -> resolved issue count
+    resolved_ids = set()
+    employee_ids = set()
+
+    def resolve(issue):
+        resolved_ids.add(issue.id)
+        issue.status = 'resolved'
+        issue.resolved_at = now
+        resolved[issue.greenhouse_id] = resolved.get(issue.greenhouse_id, 0) + 1
+        if issue.employee_id:
+            employee_ids.add(issue.employee_id)
+
+    greenhouse_results = []
+    for gh_id in greenhouse_ids:
+        greenhouse = greenhouses.get(gh_id)
+        if greenhouse is None:
+            greenhouse_results.append({'greenhouse_id': gh_id, 'success': False, 'message': 'Greenhouse not found'})
+        elif active.get(gh_id):
+            for issue in active[gh_id]:
+                resolve(issue)
+            greenhouse_results.append({'greenhouse_id': gh_id, 'success': True, 'resolved': len(active[gh_id]),
+                                       'message': f'{len(active[gh_id])} issue(s) resolved for {greenhouse.name}'})
+        elif greenhouse.status != 'normal':
+            greenhouse.status = 'normal'
+            greenhouse_results.append({'greenhouse_id': gh_id, 'success': True, 'resolved': 0,
+                                       'message': f'No active issues found. {greenhouse.name} status set to normal.'})
+        else:
+            greenhouse_results.append({'greenhouse_id': gh_id, 'success': False, 'message': 'No active issues found for this greenhouse'})
+
+    issue_results = []
+    for issue_id in issue_ids:
+        issue = selected.get(issue_id)
+        if issue is None:
+            issue_results.append({'issue_id': issue_id, 'success': False, 'message': 'Issue not found'})
+        elif issue.id in resolved_ids:
+            # Resolved above with its greenhouse and counted there
+            issue_results.append({'issue_id': issue_id, 'success': True, 'resolved': 0, 'message': 'Issue resolved with its greenhouse'})
+        elif issue.status not in ACTIVE_STATUSES:
+            issue_results.append({'issue_id': issue_id, 'success': False, 'message': 'Issue is already resolved'})
+        else:
+            resolve(issue)
+            issue_results.append({'issue_id': issue_id, 'success': True, 'resolved': 1, 'message': 'Issue resolved'})
+
+    if resolved:
+        # Greenhouses return to normal once none of their issues remain active (one grouped count)
+        still_active = {gh_id for (gh_id,) in db.session.query(Issue.greenhouse_id).filter(
+            Issue.greenhouse_id.in_(list(resolved)), Issue.status.in_(ACTIVE_STATUSES)).distinct()}
+        for gh_id in resolved:
+            if gh_id not in still_active:
+                greenhouses[gh_id].status = 'normal'
+        _free_idle_employees(employee_ids)
+        notify_many([{
+            'user_ids': [user_id],
+            'title': f'Issue Resolved - {greenhouses[gh_id].name}',
+            'message': f'{count} issue(s) at {greenhouses[gh_id].name} have been marked as resolved',
+            'notification_type': 'success',
+            'related_greenhouse': gh_id
+        } for gh_id, count in resolved.items()])
+    return greenhouse_results, issue_results
@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Shared response cache for read-heavy endpoints.
+# Every model has a data "generation" counter that is bumped after a commit touching
+# that model. Cache keys include the generations of the models an entry depends on,
+# so entries are invalidated precisely and never need to be deleted explicitly.
+# Generations are only bumped by commits made through this process's sessions (or, with
+# the sqlite backend, by any process on the host), so entries also expire after
+# RESPONSE_CACHE_TTL_SECONDS to pick up commits made elsewhere.
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache; generations are only visible to the current process."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, max_age=None):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            value, created = self._entries[key]
+            if max_age is not None and time.time() - created > max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, names):
+        with self._lock:
+            return [self._generations.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def size(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a local SQLite file so all gunicorn workers on a host share
+    entries and generation counters."""
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_generation (name TEXT PRIMARY KEY, generation INTEGER NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF') # Cache contents are disposable
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, max_age=None):
+        oldest = time.time() - max_age if max_age is not None else 0
+        row = self._connect().execute('SELECT value FROM cache_entry WHERE key = ? AND created >= ?', (key, oldest)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO cache_entry (key, value, created) VALUES (?, ?, ?)', (key, json.dumps(value), time.time()))
+        # Keep the table bounded by dropping the oldest entries
+        conn.execute('DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def generations(self, names):
+        placeholders = ','.join('?' * len(names))
+        rows = dict(self._connect().execute(
+            f'SELECT name, generation FROM cache_generation WHERE name IN ({placeholders})', list(names)).fetchall())
+        return [rows.get(name, 0) for name in names]
+
+    def bump(self, names):
+        conn = self._connect()
+        for name in names:
+            conn.execute('INSERT INTO cache_generation (name, generation) VALUES (?, 1) '
+                         'ON CONFLICT(name) DO UPDATE SET generation = generation + 1', (name,))
+
+    def size(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+
+
+class ResponseCache:
+    """Generation-keyed cache with hit/miss and miss-cost counters per endpoint."""
+
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl # Seconds an entry is served for at most; None keeps it until invalidated
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def get_or_compute(self, name, depends_on, builder, *key_parts):
+        """Returns the cached value for `name` or computes it with `builder()`.
+
+        `depends_on` lists the model names whose commits invalidate the entry and
+        `key_parts` any request parameters that change the result.
+        """
+        generations = self.backend.generations(depends_on)
+        key = '|'.join([name] + [f'{model}:{gen}' for model, gen in zip(depends_on, generations)] + [str(part) for part in key_parts])
+        value = self.backend.get(key, self.ttl)
+        if value is not None:
+            self._record(name, hit=True)
+            return value
+        started = time.perf_counter()
+        value = builder()
+        self._record(name, hit=False, cost=time.perf_counter() - started)
+        self.backend.set(key, value)
+        return value
+
+    def _record(self, name, hit, cost=0.0):
+        with self._lock:
+            entry = self.stats.setdefault(name, {'hits': 0, 'misses': 0, 'miss_seconds': 0.0})
+            if hit:
+                entry['hits'] += 1
+            else:
+                entry['misses'] += 1
+                entry['miss_seconds'] += cost
+
+    def report(self):
+        with self._lock:
+            endpoints = {}
+            for name, entry in self.stats.items():
+                lookups = entry['hits'] + entry['misses']
+                endpoints[name] = dict(entry,
+                                       hit_rate=round(entry['hits'] / lookups, 3) if lookups else None,
+                                       avg_miss_ms=round(entry['miss_seconds'] * 1000 / entry['misses'], 2) if entry['misses'] else None)
+        return {'backend': type(self.backend).__name__, 'entries': self.backend.size(), 'endpoints': endpoints}
+
+
+def init_cache(app):
+    """Configures the response cache from RESPONSE_CACHE ('memory', 'sqlite' or 'none')."""
+    kind = app.config.get('RESPONSE_CACHE', 'sqlite')
+    max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+    if kind == 'none':
+        app.extensions.pop('response_cache', None)
+        return None
+    if kind == 'sqlite':
+        path = app.config.get('RESPONSE_CACHE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        backend = SQLiteCacheBackend(path, max_entries)
+    else:
+        backend = MemoryCacheBackend(max_entries)
+    cache = ResponseCache(backend, app.config.get('RESPONSE_CACHE_TTL_SECONDS'))
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_response_cache():
+    return current_app.extensions.get('response_cache') if has_app_context() else None
+
+
+def cached(name, depends_on, builder, *key_parts):
+    """Convenience wrapper that falls back to `builder()` when caching is disabled."""
+    cache = get_response_cache()
+    if cache is None:
+        return builder()
+    return cache.get_or_compute(name, depends_on, builder, *key_parts)
+
+
+# --- Commit-driven invalidation ---
+
+def _touched(session):
+    return session.info.setdefault('cache_touched_models', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_models(session, flush_context):
+    touched = _touched(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        touched.add(type(obj).__name__)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_models(orm_execute_state):
+    # Bulk insert/update/delete statements (e.g. the reading bulk insert) bypass the unit of work
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _touched(orm_execute_state.session).add(mapper.class_.__name__)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_generations(session):
+    touched = session.info.pop('cache_touched_models', None)
+    cache = get_response_cache()
+    if touched and cache is not None:
+        cache.backend.bump(sorted(touched))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched(session):
+    session.info.pop('cache_touched_models', None)
@@ -0,0 +1,89 @@
+import json
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from routes.snapshots import rebuild_snapshots
+from routes.rollups import rebuild_rollups
+from routes.issue_stats import rebuild_issue_stats
+from routes.report_stats import rebuild_report_stats
+from routes.unread_counts import reconcile_unread_counts
+from routes.notifications import send_digests
+from routes.backtest import candidate_rules, run_backtest
+from routes.schema import ensure_columns, ensure_indexes
+from routes.search import rebuild_search_index, search_available
+
+# Maintenance CLI commands, run with `flask --app app <command>`
+
+def register_commands(app):
+    @app.cli.command('migrate-schema')
+    def migrate_schema_command():
+        """Add model columns and indexes missing from an existing database."""
+        columns = ensure_columns()
+        indexes = ensure_indexes()
+        click.echo(f"Added columns: {', '.join(columns) or 'none'}")
+        click.echo(f"Created indexes: {', '.join(indexes) or 'none'}")
+
+    @app.cli.command('rebuild-snapshots')
+    def rebuild_snapshots_command():
+        """Recompute the latest-reading snapshot of every greenhouse."""
+        count = rebuild_snapshots()
+        click.echo(f'Rebuilt {count} greenhouse snapshots.')
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--greenhouse-id', type=int, default=None, help='Only rebuild this greenhouse.')
+    def rebuild_rollups_command(greenhouse_id):
+        """Recompute the minute/hour/day reading rollups from raw readings."""
+        count = rebuild_rollups(greenhouse_id)
+        click.echo(f'Rebuilt {count} rollup rows.')
+
+    @app.cli.command('rebuild-issue-stats')
+    def rebuild_issue_stats_command():
+        """Recompute the daily issue counters behind the statistics trend."""
+        count = rebuild_issue_stats()
+        click.echo(f'Rebuilt issue counters for {count} days.')
+
+    @app.cli.command('rebuild-report-stats')
+    def rebuild_report_stats_command():
+        """Recompute the resolution-time rollups behind the reports page."""
+        count = rebuild_report_stats()
+        click.echo(f'Rebuilt {count} resolution rollup cells.')
+
+    @app.cli.command('reconcile-unread-counts')
+    def reconcile_unread_counts_command():
+        """Recompute every user's unread-notification counter from the notifications."""
+        drifted = reconcile_unread_counts()
+        click.echo(f'Reconciled unread counters; {drifted} users were out of date.')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Recreate the full-text index over issues and notifications."""
+        if not search_available():
+            click.echo('Full-text search requires SQLite FTS5; nothing to rebuild.')
+            return
+        counts = rebuild_search_index()
+        click.echo(f"Indexed {' and '.join(f'{count} {table}' for table, count in counts.items())} rows.")
+
+    @app.cli.command('send-notification-digests')
+    @click.option('--minutes', type=int, default=None, help='Period to summarize (default NOTIFICATION_DIGEST_MINUTES).')
+    @click.option('--fold', is_flag=True, help='Mark the summarized alerts as read.')
+    def send_notification_digests_command(minutes, fold):
+        """Send each user a digest of their unread alerts; schedule it periodically (e.g. cron)."""
+        minutes = minutes or current_app.config.get('NOTIFICATION_DIGEST_MINUTES', 60)
+        count = send_digests(datetime.utcnow() - timedelta(minutes=minutes), fold=fold)
+        click.echo(f'Sent {count} notification digests.')
+
+    @app.cli.command('backtest-thresholds')
+    @click.option('--days', type=int, default=90, help='History to replay.')
+    @click.option('--profile-id', type=int, default=None, help='Stored threshold profile to test.')
+    @click.option('--set', 'overrides', multiple=True, help='Threshold override, e.g. temperature_warning_high=28.')
+    @click.option('--greenhouse-id', 'greenhouse_ids', type=int, multiple=True, help='Only replay these greenhouses.')
+    @click.option('--workers', type=int, default=1, help='Processes to spread greenhouses over.')
+    def backtest_thresholds_command(days, profile_id, overrides, greenhouse_ids, workers):
+        """Report the transitions, issues and alerts a candidate threshold profile would have produced."""
+        try:
+            candidate = candidate_rules(profile_id, dict(override.split('=', 1) for override in overrides))
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        report = run_backtest(candidate, days=days, greenhouse_ids=list(greenhouse_ids), workers=workers)
+        report.pop('greenhouses')
+        click.echo(json.dumps(report, indent=2))
@@ -0,0 +1,186 @@
+import numpy as np
+from datetime import timedelta
+from models import db, Reading, ReadingRollup # Import necessary models
+from routes.rollups import RESOLUTIONS, bucket_start, choose_resolution
+
+# Reading history for charts: columnar series with shape-preserving downsampling
+
+SERIES_METRICS = ['temperature', 'humidity', 'light_level']
+_EPOCH = np.datetime64('1970-01-01T00:00:00', 'ms')
+_MAX_BUCKETS_PER_POINT = 10 # A resolution yielding more buckets than this per requested point is skipped for a coarser one
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the curve shape.
+
+    `x` and `y` are float arrays of equal length; NaN values in `y` are never preferred.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    filled = np.where(np.isnan(y), np.nanmean(y) if not np.all(np.isnan(y)) else 0.0, y)
+    # Averages of every bucket, computed in one pass with cumulative sums
+    csum_x = np.concatenate(([0.0], np.cumsum(x)))
+    csum_y = np.concatenate(([0.0], np.cumsum(filled)))
+    counts = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = (csum_x[edges[1:]] - csum_x[edges[:-1]]) / counts
+    avg_y = (csum_y[edges[1:]] - csum_y[edges[:-1]]) / counts
+    avg_x = np.append(avg_x, x[-1])
+    avg_y = np.append(avg_y, filled[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    missing = np.isnan(y)
+    missing = missing if missing.any() else None
+    starts = edges[:-1].tolist()
+    ends = np.maximum(edges[1:], edges[:-1] + 1).tolist()
+    a = 0
+    for i in range(threshold - 2):
+        start, end = starts[i], ends[i]
+        ax, ay = x[a], filled[a]
+        # Area of the triangle (selected point a, candidate, next bucket average)
+        areas = np.abs((ax - avg_x[i + 1]) * (filled[start:end] - ay) - (ax - x[start:end]) * (avg_y[i + 1] - ay))
+        if missing is not None:
+            areas[missing[start:end]] = -1
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y_series, threshold):
+    """Min/max bucketing: per bucket keeps the extreme points of every metric."""
+    n = len(y_series[0])
+    per_bucket = 2 * len(y_series)
+    buckets = max(threshold // per_bucket, 1)
+    if n <= threshold:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    indices = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        for y in y_series:
+            window = y[start:end]
+            if np.all(np.isnan(window)):
+                continue
+            indices += [start + int(np.nanargmin(window)), start + int(np.nanargmax(window))]
+    return np.unique(indices)
+
+
+def downsample(timestamps_ms, series, max_points, algorithm='lttb'):
+    """Reduces columnar series to at most `max_points` points sharing one timestamp array."""
+    n = len(timestamps_ms)
+    if n <= max_points:
+        return timestamps_ms, series
+    if algorithm == 'minmax':
+        indices = minmax_indices(list(series.values()), max_points)
+    else:
+        # Run LTTB per metric and merge the selections so every curve keeps its shape. The
+        # metrics share many points, so the budget is raised when the union falls short
+        per_metric = max(max_points // len(series), 3)
+        x = timestamps_ms.astype(np.float64)
+        indices = np.unique(np.concatenate([lttb_indices(x, y, per_metric) for y in series.values()]))
+        if len(indices) < max_points - len(series) and per_metric < n:
+            # One more pass sized by the observed overlap; any excess is thinned below
+            per_metric = min(int(per_metric * max_points / len(indices)) + 1, n)
+            indices = np.unique(np.concatenate([lttb_indices(x, y, per_metric) for y in series.values()]))
+    if len(indices) > max_points:
+        # Thin evenly across the whole range; keeps the first and last point
+        indices = indices[np.linspace(0, len(indices) - 1, max_points).round().astype(np.int64)]
+    return timestamps_ms[indices], {metric: values[indices] for metric, values in series.items()}
+
+
+def _epoch_ms(column):
+    # Timestamps are fetched as text (see _as_text) and parsed by numpy in one call,
+    # which is far cheaper than building a datetime object per row
+    return (np.array(column, dtype='datetime64[ms]') - _EPOCH).astype(np.int64)
+
+
+def _as_text(column):
+    return db.cast(column, db.String)
+
+
+def _raw_series(greenhouse_id, start, end):
+    table = Reading.__table__
+    rows = db.session.execute(
+        db.select(_as_text(table.c.timestamp), *[table.c[metric] for metric in SERIES_METRICS]).
+        where(Reading.greenhouse_id == greenhouse_id, Reading.timestamp >= start, Reading.timestamp < end).
+        order_by(Reading.timestamp)
+    ).all()
+    if not rows:
+        return np.array([], dtype=np.int64), {metric: np.array([], dtype=np.float64) for metric in SERIES_METRICS}
+    columns = list(zip(*rows))
+    timestamps = _epoch_ms(columns[0])
+    series = {metric: np.array(column, dtype=np.float64) for metric, column in zip(SERIES_METRICS, columns[1:])}
+    return timestamps, series
+
+
+def _rollup_series(greenhouse_id, start, end, resolution):
+    # Only the bucket columns, selected from the table so no ORM rows are built
+    table = ReadingRollup.__table__
+    rows = db.session.execute(
+        db.select(_as_text(table.c.bucket_start), table.c['count'], *[table.c[f'{metric}_sum'] for metric in SERIES_METRICS]).
+        where(table.c.greenhouse_id == greenhouse_id, table.c.resolution == resolution,
+              table.c.bucket_start >= bucket_start(start, resolution), table.c.bucket_start < end).
+        order_by(table.c.bucket_start)
+    ).all()
+    if not rows:
+        return np.array([], dtype=np.int64), {metric: np.array([], dtype=np.float64) for metric in SERIES_METRICS}
+    columns = list(zip(*rows))
+    timestamps = _epoch_ms(columns[0])
+    counts = np.array(columns[1], dtype=np.float64)
+    series = {}
+    for metric, sums in zip(SERIES_METRICS, columns[2:]):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            series[metric] = np.where(counts > 0, np.array(sums, dtype=np.float64) / counts, np.nan)
+    return timestamps, series
+
+
+def history_resolution(start, end, max_points, raw_max_span=timedelta(hours=24)):
+    """Picks the source of a history chart: 'raw' or a rollup resolution.
+
+    Raw readings are only read for ranges up to `raw_max_span`. Otherwise the coarsest
+    resolution with at least `max_points` buckets is used, moving coarser while it
+    would load more than _MAX_BUCKETS_PER_POINT buckets per requested point.
+    """
+    resolution = choose_resolution(start, end, max_points)
+    if resolution == RESOLUTIONS[0][0] and end - start <= raw_max_span:
+        return 'raw'
+    names = [name for name, _ in RESOLUTIONS]
+    widths = dict(RESOLUTIONS)
+    index = names.index(resolution)
+    while index < len(names) - 1 and (end - start) / widths[names[index]] > _MAX_BUCKETS_PER_POINT * max_points:
+        index += 1
+    return names[index]
+
+
+def reading_history(greenhouse_id, start, end, max_points, algorithm='lttb', raw_max_span=timedelta(hours=24)):
+    """Returns a columnar, downsampled reading history for [start, end).
+
+    Only short ranges are read from raw readings; longer ones from rollups (see
+    history_resolution), so the amount of data loaded stays bounded regardless of how
+    many raw readings the range contains.
+    """
+    source = history_resolution(start, end, max_points, raw_max_span)
+    if source == 'raw':
+        timestamps, series = _raw_series(greenhouse_id, start, end)
+    else:
+        timestamps, series = _rollup_series(greenhouse_id, start, end, source)
+    total = len(timestamps)
+    timestamps, series = downsample(timestamps, series, max_points, algorithm)
+    result = {
+        'source': source,
+        'total_points': total,
+        'timestamps': timestamps.tolist()
+    }
+    for metric, values in series.items():
+        result[metric] = [None if value != value else value for value in np.round(values, 2).tolist()] # NaN -> null
+    return result
+
+
+def default_history_range(end):
+    return end - timedelta(days=30), end
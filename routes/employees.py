@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, redirect, url_for, session, flash
 from models import db, Employee, Issue # Import necessary models
+from routes.workload import employee_workload, serialize_employee
 
 employees_bp = Blueprint('employees', __name__, template_folder='../templates')
 
@@ -10,20 +11,8 @@ def list_employees(): # Renamed function
         return redirect(url_for('auth.login'))
     
     employees = Employee.query.all()
-    employee_data = []
-    
-    for emp in employees:
-        active_issues = Issue.query.filter_by(employee_id=emp.id, status='assigned').count()
-        resolved_issues = Issue.query.filter_by(employee_id=emp.id, status='resolved').count()
-        
-        employee_data.append({
-            'id': emp.id,
-            'name': emp.name,
-            'email': emp.email,
-            'phone': emp.phone,
-            'status': emp.status,
-            'active_issues': active_issues,
-            'resolved_issues': resolved_issues
-        })
+    # Issue counts for every employee in one grouped query
+    workload = employee_workload()
+    employee_data = [serialize_employee(emp, workload) for emp in employees]
     
     return render_template('employees.html', employees=employee_data)
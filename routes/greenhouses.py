@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, session, flash, current_app
-import json
 from models import db, Greenhouse, Reading, Issue, Employee # Import necessary models
+from routes.snapshots import greenhouses_with_snapshots, get_snapshot
+from routes.thresholds import classify_many, classify_reading
+from routes.loading import load_profile
 
 greenhouses_bp = Blueprint('greenhouses', __name__, template_folder='../templates')
 
@@ -10,32 +12,23 @@ def list_greenhouses(): # Renamed function to avoid conflict
         flash('Please log in to access this page.', 'warning')
         return redirect(url_for('auth.login'))
     
-    greenhouses = Greenhouse.query.all()
+    # Issue counts per greenhouse and status in one grouped query
+    issue_counts = dict(((gh_id, status), count) for gh_id, status, count in db.session.query(
+        Issue.greenhouse_id, Issue.status, db.func.count(Issue.id)).\
+        filter(Issue.status.in_(['open', 'assigned'])).\
+        group_by(Issue.greenhouse_id, Issue.status))
+
     greenhouse_data = []
     
-    for gh in greenhouses:
-        latest_reading = Reading.query.filter_by(greenhouse_id=gh.id).order_by(Reading.timestamp.desc()).first()
-        open_issues = Issue.query.filter_by(greenhouse_id=gh.id, status='open').count()
-        assigned_issues = Issue.query.filter_by(greenhouse_id=gh.id, status='assigned').count()
+    rows = greenhouses_with_snapshots()
+    # Classify every greenhouse's latest reading in one batch
+    evaluations = classify_many(rows)
+    for (gh, latest_reading), evaluation in zip(rows, evaluations):
+        open_issues = issue_counts.get((gh.id, 'open'), 0)
+        assigned_issues = issue_counts.get((gh.id, 'assigned'), 0)
         
-        temp_status = 'normal'
-        humidity_status = 'normal'
-        if latest_reading:
-            # Use thresholds (consider moving to config or constants)
-            CRITICAL_TEMP_HIGH = 35
-            CRITICAL_TEMP_LOW = 10
-            WARNING_TEMP_HIGH = 30
-            WARNING_TEMP_LOW = 15
-            CRITICAL_HUMIDITY_HIGH = 90
-            CRITICAL_HUMIDITY_LOW = 30
-            WARNING_HUMIDITY_HIGH = 85
-            WARNING_HUMIDITY_LOW = 40
-
-            if latest_reading.temperature > CRITICAL_TEMP_HIGH or latest_reading.temperature < CRITICAL_TEMP_LOW: temp_status = 'critical'
-            elif latest_reading.temperature > WARNING_TEMP_HIGH or latest_reading.temperature < WARNING_TEMP_LOW: temp_status = 'warning'
-            
-            if latest_reading.humidity > CRITICAL_HUMIDITY_HIGH or latest_reading.humidity < CRITICAL_HUMIDITY_LOW: humidity_status = 'critical'
-            elif latest_reading.humidity > WARNING_HUMIDITY_HIGH or latest_reading.humidity < WARNING_HUMIDITY_LOW: humidity_status = 'warning'
+        temp_status = evaluation['temperature']
+        humidity_status = evaluation['humidity']
             
         greenhouse_data.append({
             'id': gh.id,
@@ -61,46 +54,19 @@ def greenhouse_detail(id):
         return redirect(url_for('auth.login'))
     
     greenhouse = Greenhouse.query.get_or_404(id)
-    latest_reading = Reading.query.filter_by(greenhouse_id=id).order_by(Reading.timestamp.desc()).first()
+    latest_reading = get_snapshot(id)
     
     # Determine reading statuses
-    temp_status = 'normal'
-    humidity_status = 'normal'
-    air_quality_status = 'normal'
-    soil_moisture_status = 'normal'
-    if latest_reading:
-        # Use thresholds (consider moving to config or constants)
-        CRITICAL_TEMP_HIGH = 35
-        CRITICAL_TEMP_LOW = 10
-        WARNING_TEMP_HIGH = 30
-        WARNING_TEMP_LOW = 15
-        CRITICAL_HUMIDITY_HIGH = 90
-        CRITICAL_HUMIDITY_LOW = 30
-        WARNING_HUMIDITY_HIGH = 85
-        WARNING_HUMIDITY_LOW = 40
-
-        if latest_reading.temperature > CRITICAL_TEMP_HIGH or latest_reading.temperature < CRITICAL_TEMP_LOW: temp_status = 'critical'
-        elif latest_reading.temperature > WARNING_TEMP_HIGH or latest_reading.temperature < WARNING_TEMP_LOW: temp_status = 'warning'
-        
-        if latest_reading.humidity > CRITICAL_HUMIDITY_HIGH or latest_reading.humidity < CRITICAL_HUMIDITY_LOW: humidity_status = 'critical'
-        elif latest_reading.humidity > WARNING_HUMIDITY_HIGH or latest_reading.humidity < WARNING_HUMIDITY_LOW: humidity_status = 'warning'
-        
-        if latest_reading.air_quality == 'Poor': air_quality_status = 'critical'
-        elif latest_reading.air_quality == 'Fair': air_quality_status = 'warning'
-        
-        if latest_reading.soil_moisture == 'Very Low': soil_moisture_status = 'critical'
-        elif latest_reading.soil_moisture == 'Low': soil_moisture_status = 'warning'
+    evaluation = classify_reading(latest_reading, greenhouse)
+    temp_status = evaluation['temperature']
+    humidity_status = evaluation['humidity']
+    air_quality_status = evaluation['air_quality']
+    soil_moisture_status = evaluation['soil_moisture']
 
-    # Get historical readings for charts (last 30 readings)
-    historical_readings = Reading.query.filter_by(greenhouse_id=id).order_by(Reading.timestamp.desc()).limit(30).all()
-    historical_readings.reverse()  # Oldest first for charts
-    
-    reading_dates = [reading.timestamp.strftime('%H:%M %d-%b') for reading in historical_readings] # Format for readability
-    temperatures = [reading.temperature for reading in historical_readings]
-    humidities = [reading.humidity for reading in historical_readings]
+    # Historical chart data is loaded by the page from /api/greenhouses/<id>/readings
     
     # Get open issues
-    open_issues = Issue.query.filter_by(greenhouse_id=id).filter(Issue.status != 'resolved').all()
+    open_issues = Issue.query.options(*load_profile('greenhouse_issues')).filter_by(greenhouse_id=id).filter(Issue.status != 'resolved').all()
     
     # Get available employees for assignment
     available_employees = Employee.query.filter_by(status='available').all()
@@ -112,8 +78,5 @@ def greenhouse_detail(id):
                           humidity_status=humidity_status,
                           air_quality_status=air_quality_status,
                           soil_moisture_status=soil_moisture_status,
-                          reading_dates=json.dumps(reading_dates),
-                          temperatures=json.dumps(temperatures),
-                          humidities=json.dumps(humidities),
                           open_issues=open_issues,
                           available_employees=available_employees)
@@ -0,0 +1,37 @@
+from sqlalchemy import event
+from models import db
+
+# Attribute history shared by the after_flush hooks that keep derived tables in step
+# with Issue and Notification changes (issue_stats, report_stats, unread_counts and
+# the auto-assigner). Setting an attribute of an expired instance normally records no
+# previous value; tracked attributes load it first, so a hook can subtract what the
+# row contributed before the flush.
+
+_tracked = set()
+
+
+def track_previous_values(*attributes):
+    """Loads the previous value whenever one of these attributes is set.
+
+    Each attribute gets a single listener however many modules track it.
+    """
+    for attribute in attributes:
+        key = (attribute.class_, attribute.key)
+        if key in _tracked:
+            continue
+        event.listen(attribute, 'set', lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+        _tracked.add(key)
+
+
+def history_value(obj, name, index):
+    # index 0 -> value before the flush, 1 -> value after the flush
+    history = db.inspect(obj).attrs[name].history
+    if not history.has_changes():
+        return getattr(obj, name)
+    if index == 0:
+        return history.deleted[0] if history.deleted else None
+    return history.added[0] if history.added else None
+
+
+def previous_value(obj, name):
+    return history_value(obj, name, 0)
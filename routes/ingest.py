@@ -0,0 +1,237 @@
+import json
+import math
+from datetime import datetime
+from flask import current_app, has_app_context
+from models import db, Greenhouse, Reading, Issue # Import necessary models
+from routes.snapshots import update_snapshots
+from routes.notifications import role_recipients, notify_many
+from routes.rollups import update_rollups
+from routes.thresholds import classify_many
+from routes.utils import parse_utc_datetime
+
+# Shared reading ingestion helpers used by the single, batch and streaming reading endpoints
+
+
+def parse_reading(data):
+    """Validates a raw reading payload and returns a dict of column values.
+
+    Raises ValueError if the payload is malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Reading must be a JSON object')
+    try:
+        greenhouse_id = int(data.get('greenhouse_id'))
+        row = {
+            'greenhouse_id': greenhouse_id,
+            'temperature': float(data.get('temperature')),
+            'humidity': float(data.get('humidity')),
+            'light_level': float(data.get('light_level')),
+            'air_quality': str(data.get('air_quality')),
+            'soil_moisture': str(data.get('soil_moisture'))
+        }
+    except (ValueError, TypeError):
+        raise ValueError('Invalid reading data format')
+    if not all(math.isfinite(row[name]) for name in ['temperature', 'humidity', 'light_level']):
+        raise ValueError('Readings must be finite numbers') # float() accepts 'nan' and 'inf'
+
+    timestamp = data.get('timestamp')
+    if timestamp is not None:
+        try:
+            row['timestamp'] = parse_utc_datetime(timestamp)
+        except ValueError:
+            raise ValueError('Invalid timestamp format')
+    return row
+
+
+def _describe(status, row):
+    if status == 'critical':
+        return f"Critical readings: Temp={row['temperature']}°C, Humidity={row['humidity']}%, Air Quality={row['air_quality']}"
+    return f"Warning readings: Temp={row['temperature']}°C, Humidity={row['humidity']}%, Soil={row['soil_moisture']}, Air={row['air_quality']}"
+
+
+def apply_status_changes(latest_rows, greenhouses, notify_user_id=None):
+    """Evaluates the newest reading of each greenhouse and applies status transitions.
+
+    `latest_rows` maps greenhouse id to its newest reading row, `greenhouses` maps
+    greenhouse id to the loaded Greenhouse. Issues and notifications are added to the
+    current session; the caller is responsible for committing. Returns a dict of
+    greenhouse id to the evaluated status.
+    """
+    statuses = {}
+    changed = {}
+    # Classify every affected greenhouse's newest reading in one vectorized call
+    gh_ids = list(latest_rows)
+    evaluated = classify_many([(greenhouses[gh_id], latest_rows[gh_id]) for gh_id in gh_ids])
+    # Hysteresis/debounce state machine (routes/status_machine.py), when the app configured one
+    machine = current_app.extensions.get('status_machine') if has_app_context() else None
+    for gh_id, evaluation in zip(gh_ids, evaluated):
+        greenhouse = greenhouses[gh_id]
+        row = latest_rows[gh_id]
+        if machine is not None:
+            new_status = machine.step(greenhouse, greenhouse.status, row, evaluation['status'])
+        else:
+            new_status = evaluation['status']
+        statuses[gh_id] = new_status
+        if new_status != greenhouse.status:
+            greenhouse.status = new_status
+            if new_status in ['warning', 'critical']:
+                changed[gh_id] = (new_status, _describe(new_status, row))
+
+    if not changed:
+        return statuses
+
+    # Create issues only for greenhouses moving into warning/critical without an active issue
+    active_issue_ids = {gh_id for (gh_id,) in db.session.query(Issue.greenhouse_id).filter(
+        Issue.greenhouse_id.in_(list(changed)),
+        Issue.status != 'resolved'
+    ).distinct()}
+    for gh_id, (new_status, description) in changed.items():
+        if gh_id not in active_issue_ids:
+            db.session.add(Issue(
+                greenhouse_id=gh_id,
+                issue_type='environmental',
+                priority='critical' if new_status == 'critical' else 'high',
+                description=description,
+                status='open' # New issues start as open
+            ))
+
+    # Create notifications for status changes (for logged-in users)
+    if notify_user_id is not None:
+        user_ids_to_notify = role_recipients() | {notify_user_id} # Add current user if not admin/manager
+        notify_many([{
+            'user_ids': user_ids_to_notify,
+            'title': f'Critical Alert - {greenhouses[gh_id].name}' if new_status == 'critical' else f'Warning - {greenhouses[gh_id].name}',
+            'message': description,
+            'notification_type': new_status,
+            'related_greenhouse': gh_id,
+            'coalesce': True # Flapping sensors bump one notification instead of adding rows
+        } for gh_id, (new_status, description) in changed.items()])
+    return statuses
+
+
+def store_rows(rows, notify_user_id=None, evaluate=True):
+    """Bulk inserts already validated reading rows and evaluates affected greenhouses.
+
+    Each affected greenhouse is evaluated once using its newest sample. Pass
+    evaluate=False to store the readings without touching greenhouse status.
+    Returns (results, statuses) where results has one entry per row. The caller
+    commits the session.
+    """
+    # Validate all referenced greenhouses with one query
+    gh_ids = {row['greenhouse_id'] for row in rows}
+    greenhouses = {gh.id: gh for gh in Greenhouse.query.filter(Greenhouse.id.in_(gh_ids))} if gh_ids else {}
+
+    results = []
+    valid_rows = []
+    latest_rows = {}
+    now = datetime.utcnow()
+    for row in rows:
+        if row['greenhouse_id'] not in greenhouses:
+            results.append({'success': False, 'message': 'Greenhouse not found'})
+            continue
+        row.setdefault('timestamp', now)
+        results.append({'success': True, 'greenhouse_id': row['greenhouse_id']})
+        valid_rows.append(row)
+        latest = latest_rows.get(row['greenhouse_id'])
+        if latest is None or row['timestamp'] >= latest['timestamp']:
+            latest_rows[row['greenhouse_id']] = row
+
+    if valid_rows:
+        db.session.execute(db.insert(Reading), valid_rows)
+        update_snapshots(latest_rows)
+        update_rollups(valid_rows)
+
+    if not evaluate:
+        return results, {}
+
+    statuses = apply_status_changes(latest_rows, greenhouses, notify_user_id)
+    for result in results:
+        if result['success']:
+            result['status'] = statuses[result['greenhouse_id']]
+    return results, statuses
+
+
+def ingest_batch(items, notify_user_id=None, evaluate=True):
+    """Validates, bulk inserts and evaluates a list of raw reading payloads.
+
+    Invalid items are reported and skipped; valid ones are passed to store_rows.
+    Returns (results, statuses) where results has one entry per input item. The caller
+    commits the session.
+    """
+    results = []
+    rows = []
+    indexes = []
+    for index, item in enumerate(items):
+        try:
+            rows.append(parse_reading(item))
+        except ValueError as e:
+            results.append({'index': index, 'success': False, 'message': str(e)})
+            continue
+        results.append(None)
+        indexes.append(index)
+
+    stored, statuses = store_rows(rows, notify_user_id, evaluate)
+    for index, result in zip(indexes, stored):
+        result['index'] = index
+        results[index] = result
+    return results, statuses
+
+
+def ingest_stream(lines, chunk_size, notify_user_id=None, evaluate=True, max_errors=1000):
+    """Ingests newline-delimited JSON readings from an iterable of lines.
+
+    Lines are parsed one at a time and grouped into chunks of `chunk_size`, each of
+    which is bulk inserted and committed before the next chunk is read, so memory
+    use does not depend on the size of the upload. Only the first `max_errors`
+    per-line errors are kept. Returns a summary dict.
+    """
+    summary = {'lines': 0, 'inserted': 0, 'failed': 0, 'chunks': 0, 'errors': [], 'statuses': {}}
+    chunk = []
+    line_numbers = []
+
+    def record_error(line_number, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'line': line_number, 'message': message})
+
+    def flush():
+        results, statuses = ingest_batch(chunk, notify_user_id, evaluate)
+        db.session.commit()
+        summary['chunks'] += 1
+        for result in results:
+            if result['success']:
+                summary['inserted'] += 1
+            else:
+                record_error(line_numbers[result['index']], result['message'])
+        summary['statuses'].update({str(gh_id): status for gh_id, status in statuses.items()})
+        chunk.clear()
+        line_numbers.clear()
+
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        summary['lines'] += 1
+        try:
+            chunk.append(json.loads(line))
+        except ValueError:
+            record_error(line_number, 'Invalid JSON')
+            continue
+        line_numbers.append(line_number)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+    return summary
+
+
+def max_batch_size():
+    return current_app.config.get('READING_BATCH_MAX_SIZE', 5000)
+
+
+def stream_chunk_size():
+    return current_app.config.get('READING_STREAM_CHUNK_SIZE', 1000)
@@ -3,6 +3,8 @@ from werkzeug.security import generate_password_hash
 from models import db, User, Greenhouse, Employee, Reading, Issue, Notification # Import necessary models
 from datetime import datetime, timedelta
 import random
+from routes.snapshots import rebuild_snapshots
+from routes.rollups import rebuild_rollups
 import os
 
 init_db_bp = Blueprint('init_db', __name__)
@@ -171,6 +173,8 @@ def init_db_command(): # Renamed function
         db.session.add_all(notifications)
         
         db.session.commit()
+        rebuild_snapshots()
+        rebuild_rollups()
         
         flash('Database initialized with sample data!', 'success')
         return redirect(url_for('auth.login')) # Redirect to login after init
@@ -0,0 +1,64 @@
+from models import Issue # Import necessary models
+from routes.loading import load_profile
+from routes.utils import parse_utc_datetime
+
+# Filtering for /api/issues. Pages are keyset-paginated on (created_at, id), newest
+# first, so each filter has a composite index leading with its column and ending in
+# (created_at, id) (see the Issue model); deep pages of a multi-year history cost the
+# same as the first one. The greenhouse and assigned employee are joined in the page
+# query instead of being lazy-loaded per row.
+
+_LIST_FILTERS = {'status': Issue.status, 'priority': Issue.priority, 'type': Issue.issue_type}
+_ID_FILTERS = {'greenhouse_id': Issue.greenhouse_id, 'employee_id': Issue.employee_id}
+_RANGE_FILTERS = {'created': Issue.created_at, 'resolved': Issue.resolved_at}
+
+
+def _parse_time(name, value):
+    try:
+        return parse_utc_datetime(value)
+    except ValueError as e:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime') from e
+
+
+def issue_query(args):
+    """Builds the filtered Issue query from request arguments. Raises ValueError for bad values.
+
+    status, priority and type accept comma-separated lists; greenhouse_id and employee_id
+    an integer; created_from/created_to and resolved_from/resolved_to a half-open ISO range.
+    """
+    query = Issue.query.options(*load_profile('issue_list'))
+    for name, column in _LIST_FILTERS.items():
+        values = [value.strip() for value in (args.get(name) or '').split(',') if value.strip()]
+        if values:
+            query = query.filter(column == values[0] if len(values) == 1 else column.in_(values))
+    for name, column in _ID_FILTERS.items():
+        value = args.get(name)
+        if value:
+            try:
+                query = query.filter(column == int(value))
+            except ValueError as e:
+                raise ValueError(f'{name} must be an integer') from e
+    for name, column in _RANGE_FILTERS.items():
+        start, end = args.get(f'{name}_from'), args.get(f'{name}_to')
+        if start:
+            query = query.filter(column >= _parse_time(f'{name}_from', start))
+        if end:
+            query = query.filter(column < _parse_time(f'{name}_to', end))
+    return query
+
+
+def serialize_issue(issue):
+    return {
+        'id': issue.id,
+        'greenhouse_id': issue.greenhouse_id,
+        'greenhouse_name': issue.greenhouse.name if issue.greenhouse else None,
+        'employee_id': issue.employee_id,
+        'employee_name': issue.assigned_employee.name if issue.assigned_employee else None,
+        'issue_type': issue.issue_type,
+        'description': issue.description,
+        'priority': issue.priority,
+        'status': issue.status,
+        'notes': issue.notes,
+        'created_at': issue.created_at.isoformat() if issue.created_at else None,
+        'resolved_at': issue.resolved_at.isoformat() if issue.resolved_at else None
+    }
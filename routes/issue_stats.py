@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models import db, Issue, DailyIssueStats # Import necessary models
+from routes.history import track_previous_values, history_value
+
+# Incrementally maintained daily issue counters backing the /api/statistics trend.
+# Counters are adjusted in the same transaction as the Issue changes through a
+# session after_flush hook, so every code path that creates or resolves issues is covered.
+
+TREND_WINDOWS = [7, 30, 90, 365]
+
+
+def _priority_bucket(priority):
+    if priority == 'critical':
+        return 'critical'
+    if priority in ['high', 'medium']:
+        return 'warning'
+    return None
+
+
+def _contribution(created_at, priority, status, resolved_at):
+    """Counter cells (day, column) an issue in the given state contributes to."""
+    cells = []
+    bucket = _priority_bucket(priority)
+    if bucket and created_at is not None:
+        cells.append((created_at.date(), bucket))
+    if status == 'resolved' and resolved_at is not None:
+        cells.append((resolved_at.date(), 'resolved'))
+    return cells
+
+
+def _state(issue, index):
+    return tuple(history_value(issue, name, index) for name in ['created_at', 'priority', 'status', 'resolved_at'])
+
+
+def _bump(connection, deltas):
+    days = {}
+    for (day, column), delta in deltas.items():
+        if delta != 0:
+            days.setdefault(day, {'day': day, 'critical': 0, 'warning': 0, 'resolved': 0})[column] += delta
+    if not days:
+        return
+    table = DailyIssueStats.__table__
+    upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(connection.dialect.name)
+    if upsert is not None:
+        # Atomic, so the first two issue writes of a day cannot collide on the day key
+        statement = upsert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.day],
+            set_={column: table.c[column] + statement.excluded[column] for column in ['critical', 'warning', 'resolved']}
+        ), [days[day] for day in sorted(days)])
+        return
+    for (day, column), delta in deltas.items():
+        if delta == 0:
+            continue
+        updated = connection.execute(
+            db.update(DailyIssueStats).
+            where(DailyIssueStats.day == day).
+            values({column: getattr(DailyIssueStats, column) + delta})
+        ).rowcount
+        if not updated:
+            connection.execute(db.insert(DailyIssueStats).values(
+                dict({'day': day, 'critical': 0, 'warning': 0, 'resolved': 0}, **{column: delta})))
+
+
+# Load the previous value when these attributes are set on an expired Issue, so the
+# counters it contributed to can be decremented
+track_previous_values(Issue.created_at, Issue.priority, Issue.status, Issue.resolved_at)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_issue_changes(session, flush_context):
+    deltas = {}
+
+    def add(cells, sign):
+        for cell in cells:
+            deltas[cell] = deltas.get(cell, 0) + sign
+
+    for obj in session.new:
+        if isinstance(obj, Issue):
+            add(_contribution(obj.created_at, obj.priority, obj.status, obj.resolved_at), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Issue) and session.is_modified(obj):
+            add(_contribution(*_state(obj, 0)), -1)
+            add(_contribution(*_state(obj, 1)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Issue):
+            add(_contribution(*_state(obj, 0)), -1)
+
+    if deltas:
+        _bump(session.connection(), deltas)
+
+
+def rebuild_issue_stats():
+    """Recomputes all daily counters from the Issue table with grouped queries."""
+    counters = {}
+
+    def cell(day):
+        if isinstance(day, str):
+            day = datetime.strptime(day[:10], '%Y-%m-%d').date()
+        return counters.setdefault(day, {'critical': 0, 'warning': 0, 'resolved': 0})
+
+    created_day = db.func.date(Issue.created_at)
+    for day, priority, count in db.session.query(created_day, Issue.priority, db.func.count(Issue.id)).\
+            filter(Issue.created_at.isnot(None)).group_by(created_day, Issue.priority):
+        bucket = _priority_bucket(priority)
+        if bucket:
+            cell(day)[bucket] += count
+    resolved_day = db.func.date(Issue.resolved_at)
+    for day, count in db.session.query(resolved_day, db.func.count(Issue.id)).\
+            filter(Issue.status == 'resolved', Issue.resolved_at.isnot(None)).group_by(resolved_day):
+        cell(day)['resolved'] += count
+
+    db.session.execute(db.delete(DailyIssueStats))
+    if counters:
+        db.session.execute(db.insert(DailyIssueStats), [dict(values, day=day) for day, values in counters.items()])
+    db.session.commit()
+    return len(counters)
+
+
+def ensure_issue_stats():
+    """Builds the daily counters once for databases created before they existed."""
+    if DailyIssueStats.query.first() is None and Issue.query.first() is not None:
+        rebuild_issue_stats()
+
+
+def issue_trend(days, today=None):
+    """Returns per-day critical/warning/resolved counts for the last `days` days in one query."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    rows = {row.day: row for row in DailyIssueStats.query.filter(
+        DailyIssueStats.day >= start,
+        DailyIssueStats.day < today + timedelta(days=1) # Half-open range [start, tomorrow)
+    )}
+    trend = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        row = rows.get(day)
+        trend.append({
+            'day': day.strftime('%d-%b'), # Format day for labels
+            'critical': row.critical if row else 0,
+            'warning': row.warning if row else 0,
+            'resolved': row.resolved if row else 0
+        })
+    return trend
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import Employee, Issue # Import necessary models
+
+# Named relationship loading profiles for the views, plus a guard against lazy loads.
+# Views load what their templates reach through with one of the profiles below instead
+# of relying on lazy loads (a SELECT per row). Greenhouse.readings is write-only, so a
+# greenhouse's reading history can only be read with an explicit, bounded query.
+#
+# With LAZY_LOAD_GUARD enabled (by default in debug and testing) a lazy load that emits
+# SQL while handling a request raises LazyLoadError; wrap intentional ones in
+# allow_lazy_loads().
+
+LOAD_PROFILES = {
+    # Issue tables showing the greenhouse and the assigned employee (reports, /api/issues)
+    'issue_list': lambda: (joinedload(Issue.greenhouse), joinedload(Issue.assigned_employee)),
+    # Issues of one greenhouse (greenhouse detail page)
+    'greenhouse_issues': lambda: (joinedload(Issue.assigned_employee),),
+    # Employees together with all their issues
+    'employee_issues': lambda: (selectinload(Employee.issues),)
+}
+
+
+class LazyLoadError(RuntimeError):
+    """Raised when a relationship is lazy-loaded during a request while the guard is enabled."""
+
+
+def load_profile(name):
+    """Returns the loader options of a named profile, for Query.options()."""
+    return LOAD_PROFILES[name]()
+
+
+def lazy_load_guard_enabled():
+    enabled = current_app.config.get('LAZY_LOAD_GUARD')
+    if enabled is None:
+        return current_app.debug or current_app.testing
+    return enabled
+
+
+@contextmanager
+def allow_lazy_loads():
+    """Permits lazy loads inside the block while the guard is enabled."""
+    previous = g.get('allow_lazy_loads', False)
+    g.allow_lazy_loads = True
+    try:
+        yield
+    finally:
+        g.allow_lazy_loads = previous
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _guard_lazy_loads(orm_execute_state):
+    # Eager loaders (selectin) are relationship loads too, but have no lazy_loaded_from
+    if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+        return
+    if not has_request_context() or g.get('allow_lazy_loads') or not lazy_load_guard_enabled():
+        return
+    state = orm_execute_state.lazy_loaded_from
+    raise LazyLoadError(
+        f'Lazy load from {state.class_.__name__} (id={state.identity[0] if state.identity else None}) '
+        f'during a request; add it to the query with a profile from routes/loading.py'
+    )
@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, session, flash, current_app
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from models import db, User, Greenhouse, Reading, Employee, Issue # Import necessary models
+from routes.snapshots import greenhouses_with_snapshots
+from routes.cache import cached
+from routes.thresholds import classify_many
 
 main_bp = Blueprint('main', __name__, template_folder='../templates')
 
@@ -12,59 +15,33 @@ def index():
     # Render login page at root if not logged in (handled by auth blueprint now)
     return redirect(url_for('auth.login')) # Redirect to login page
 
-@main_bp.route('/dashboard')
-def dashboard():
-    if 'user_id' not in session:
-        flash('Please log in to access the dashboard.', 'warning')
-        return redirect(url_for('auth.login'))
-    
+def _build_dashboard_data():
     # Get greenhouse stats for dashboard
     total_greenhouses = Greenhouse.query.count()
     critical_issues_count = Greenhouse.query.filter_by(status='critical').count()
     warning_issues_count = Greenhouse.query.filter_by(status='warning').count()
     
-    # Get resolved issues today
-    today = datetime.utcnow().date()
+    # Get resolved issues today (half-open range so the resolved_at index can be used)
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     resolved_today = Issue.query.filter(
-        db.func.date(Issue.resolved_at) == today,
-        Issue.status == 'resolved'
+        Issue.status == 'resolved',
+        Issue.resolved_at >= today_start,
+        Issue.resolved_at < today_start + timedelta(days=1)
     ).count()
     
-    # Get all greenhouses with their latest readings
-    greenhouses = Greenhouse.query.all()
+    # Get all greenhouses with their latest readings (materialized snapshot, one query)
     greenhouse_data = []
     
-    for gh in greenhouses:
-        latest_reading = Reading.query.filter_by(greenhouse_id=gh.id).order_by(Reading.timestamp.desc()).first()
+    rows = greenhouses_with_snapshots()
+    # Classify every greenhouse's latest reading in one batch
+    evaluations = classify_many(rows)
+    for (gh, latest_reading), evaluation in zip(rows, evaluations):
         
         # Determine reading status for display
-        temp_status = 'normal'
-        humidity_status = 'normal'
-        air_quality_status = 'normal'
-        soil_moisture_status = 'normal'
-        
-        if latest_reading:
-            # Use thresholds (consider moving to config or constants)
-            CRITICAL_TEMP_HIGH = 35
-            CRITICAL_TEMP_LOW = 10
-            WARNING_TEMP_HIGH = 30
-            WARNING_TEMP_LOW = 15
-            CRITICAL_HUMIDITY_HIGH = 90
-            CRITICAL_HUMIDITY_LOW = 30
-            WARNING_HUMIDITY_HIGH = 85
-            WARNING_HUMIDITY_LOW = 40
-
-            if latest_reading.temperature > CRITICAL_TEMP_HIGH or latest_reading.temperature < CRITICAL_TEMP_LOW: temp_status = 'critical'
-            elif latest_reading.temperature > WARNING_TEMP_HIGH or latest_reading.temperature < WARNING_TEMP_LOW: temp_status = 'warning'
-            
-            if latest_reading.humidity > CRITICAL_HUMIDITY_HIGH or latest_reading.humidity < CRITICAL_HUMIDITY_LOW: humidity_status = 'critical'
-            elif latest_reading.humidity > WARNING_HUMIDITY_HIGH or latest_reading.humidity < WARNING_HUMIDITY_LOW: humidity_status = 'warning'
-            
-            if latest_reading.air_quality == 'Poor': air_quality_status = 'critical'
-            elif latest_reading.air_quality == 'Fair': air_quality_status = 'warning'
-            
-            if latest_reading.soil_moisture == 'Very Low': soil_moisture_status = 'critical'
-            elif latest_reading.soil_moisture == 'Low': soil_moisture_status = 'warning'
+        temp_status = evaluation['temperature']
+        humidity_status = evaluation['humidity']
+        air_quality_status = evaluation['air_quality']
+        soil_moisture_status = evaluation['soil_moisture']
             
         greenhouse_data.append({
             'id': gh.id,
@@ -81,15 +58,27 @@ def dashboard():
         })
     
     # Get available employees for modal
-    available_employees = Employee.query.filter_by(status='available').all()
+    available_employees = [{'id': emp.id, 'name': emp.name, 'status': emp.status}
+                           for emp in Employee.query.filter_by(status='available').all()]
+
+    return dict(total_greenhouses=total_greenhouses,
+                critical_issues=critical_issues_count,
+                warning_issues=warning_issues_count,
+                resolved_today=resolved_today,
+                greenhouses=greenhouse_data,
+                available_employees=available_employees)
+
+@main_bp.route('/dashboard')
+def dashboard():
+    if 'user_id' not in session:
+        flash('Please log in to access the dashboard.', 'warning')
+        return redirect(url_for('auth.login'))
+    
+    # Dashboard data is identical for every user, so it is served from the shared response cache
+    today = datetime.utcnow().date()
+    data = cached('dashboard', ['Greenhouse', 'GreenhouseSnapshot', 'Issue', 'Employee', 'ThresholdProfile'], _build_dashboard_data, today)
     
-    return render_template('dashboard.html', 
-                          total_greenhouses=total_greenhouses,
-                          critical_issues=critical_issues_count,
-                          warning_issues=warning_issues_count,
-                          resolved_today=resolved_today,
-                          greenhouses=greenhouse_data,
-                          available_employees=available_employees)
+    return render_template('dashboard.html', **data)
 
 @main_bp.route('/settings')
 def settings():
@@ -0,0 +1,248 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Notification, UnreadNotificationCount # Import necessary models
+
+# Server-Sent Events delivery of notifications.
+# Commits that create or update notifications wake the streams of the affected users
+# in this process immediately. Idle streams do not touch the database: one watcher
+# thread per process polls every NOTIFICATION_STREAM_POLL_SECONDS for changes committed
+# by other processes (workers, the gateway, CLI commands) and wakes the affected streams.
+# Coalesced repeats (routes/notifications.py) update a notification that may already
+# have been delivered; they are pushed as 'notification-updated' events. The event id
+# ('<last notification id>:<update watermark>') lets a reconnecting browser resume both.
+
+_EPOCH = datetime(1970, 1, 1)
+_KEEPALIVE_SECONDS = 15 # Comment frames keep proxies from closing idle streams
+
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'notification_type': notification.notification_type,
+        'created_at': notification.created_at.isoformat(), # Use ISO format for JS parsing
+        'related_greenhouse': notification.related_greenhouse,
+        'occurrence_count': notification.occurrence_count or 1,
+        'first_occurred_at': (notification.first_occurred_at or notification.created_at).isoformat(),
+        'last_occurred_at': (notification.last_occurred_at or notification.created_at).isoformat()
+    }
+
+
+class NotificationBroker:
+    """Wakes subscribed streams of a user when their notifications change."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def watch(self, app, poll_interval):
+        """Starts the watcher thread for changes made by other processes, unless it is running.
+
+        The watcher exits once no stream is subscribed.
+        """
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(app, poll_interval),
+                                             name='notification-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch(self, app, poll_interval):
+        state = {}
+        with app.app_context():
+            while True:
+                time.sleep(poll_interval)
+                with self._lock:
+                    user_ids = set(self._subscribers)
+                    if not user_ids:
+                        self._watcher = None
+                        return
+                try:
+                    changed = _external_changes(user_ids, state, poll_interval)
+                except Exception:
+                    app.logger.exception('Notification watcher poll failed')
+                    changed = set()
+                finally:
+                    db.session.remove()
+                self.publish(changed)
+
+    def subscribe(self, user_id):
+        wakeup = threading.Event()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(wakeup)
+        return wakeup
+
+    def unsubscribe(self, user_id, wakeup):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(wakeup)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids):
+        with self._lock:
+            wakeups = [w for user_id in user_ids for w in self._subscribers.get(user_id, ())]
+        for wakeup in wakeups:
+            wakeup.set()
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = NotificationBroker()
+
+
+def _external_changes(user_ids, state, poll_interval):
+    """Returns the subscribed users whose notifications or unread count changed since the last poll.
+
+    Three indexed queries per poll, whatever the number of open streams. Changes made in
+    this process are reported again; the streams ignore what they have already sent.
+    """
+    now = datetime.utcnow()
+    last_id = state.get('last_id')
+    if last_id is None:
+        last_id = db.session.query(db.func.max(Notification.id)).scalar() or 0
+    # The look-back covers rows stamped before, but committed after, the previous poll
+    since = state.get('polled_at', now) - timedelta(seconds=poll_interval)
+    changed = set()
+    for user_id, newest_id in db.session.query(Notification.user_id, db.func.max(Notification.id)).filter(
+            Notification.id > last_id).group_by(Notification.user_id):
+        last_id = max(last_id, newest_id)
+        changed.add(user_id)
+    changed.update(user_id for (user_id,) in db.session.query(Notification.user_id).filter(
+        Notification.user_id.in_(user_ids), Notification.last_occurred_at > since).distinct())
+    unread = state.setdefault('unread', {})
+    for user_id, count in db.session.query(UnreadNotificationCount.user_id, UnreadNotificationCount.unread).filter(
+            UnreadNotificationCount.user_id.in_(user_ids)):
+        if user_id in unread and unread[user_id] != count:
+            changed.add(user_id)
+        unread[user_id] = count
+    for user_id in set(unread) - user_ids:
+        del unread[user_id]
+    state.update(last_id=last_id, polled_at=now)
+    return changed & user_ids
+
+
+def touch_notification_users(session, user_ids):
+    """Marks users whose notifications changed through bulk statements in this transaction."""
+    session.info.setdefault('notification_users', set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notification_users(session, flush_context):
+    user_ids = {obj.user_id for obj in list(session.new) + list(session.dirty)
+                if isinstance(obj, Notification) and obj.user_id is not None}
+    if user_ids:
+        touch_notification_users(session, user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_notification_users(session):
+    user_ids = session.info.pop('notification_users', None)
+    if user_ids:
+        broker.publish(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_notification_users(session):
+    session.info.pop('notification_users', None)
+
+
+def _format_event(event_name, data, event_id=None):
+    lines = [f'event: {event_name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _cursor(last_event_id, updated_since):
+    return f'{last_event_id}:{(updated_since - _EPOCH) // timedelta(microseconds=1)}'
+
+
+def parse_stream_cursor(value):
+    """Parses a Last-Event-ID into (last notification id, update watermark).
+
+    Bare notification ids are accepted too; missing or invalid parts are None.
+    """
+    last_event_id, _, updated_since = (value or '').partition(':')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None, None
+    try:
+        updated_since = _EPOCH + timedelta(microseconds=int(updated_since)) if updated_since else None
+    except (ValueError, OverflowError):
+        updated_since = None
+    return last_event_id, updated_since
+
+
+def notification_events(user_id, last_event_id, unread_count, poll_interval=30, max_duration=300, batch_size=50,
+                        updated_since=None):
+    """Yields SSE frames for a user's new and coalesced notifications and unread-count changes.
+
+    Notifications newer than `last_event_id` and coalesced since `updated_since` are
+    replayed first so a reconnecting browser resumes where it left off. The database is
+    only queried again when the stream is woken; `poll_interval` paces the process's
+    watcher for other processes. The stream ends after `max_duration` seconds;
+    EventSource reconnects automatically with Last-Event-ID.
+    """
+    wakeup = broker.subscribe(user_id)
+    broker.watch(current_app._get_current_object(), poll_interval)
+    deadline = time.monotonic() + max_duration
+    try:
+        if last_event_id is None:
+            # Fresh connection: only push notifications created from now on
+            last_event_id = db.session.query(db.func.max(Notification.id)).filter(Notification.user_id == user_id).scalar() or 0
+        if updated_since is None:
+            updated_since = datetime.utcnow()
+        last_unread = None
+        yield 'retry: 5000\n\n'
+        while True:
+            wakeup.clear()
+            # Repeats folded into notifications the browser already has (ix_notification_user_occurred)
+            updated = Notification.query.filter(
+                Notification.user_id == user_id,
+                Notification.id <= last_event_id,
+                Notification.occurrence_count > 1,
+                Notification.last_occurred_at > updated_since
+            ).order_by(Notification.last_occurred_at, Notification.id).all()
+            for notification in updated:
+                updated_since = notification.last_occurred_at
+                yield _format_event('notification-updated', serialize_notification(notification), _cursor(last_event_id, updated_since))
+            while True:
+                notifications = Notification.query.filter(
+                    Notification.user_id == user_id,
+                    Notification.id > last_event_id
+                ).order_by(Notification.id).limit(batch_size).all()
+                for notification in notifications:
+                    last_event_id = notification.id
+                    yield _format_event('notification', serialize_notification(notification), _cursor(last_event_id, updated_since))
+                if len(notifications) < batch_size:
+                    break
+            unread = unread_count(user_id)
+            if unread != last_unread:
+                last_unread = unread
+                yield _format_event('unread', {'count': unread})
+            db.session.close() # Do not hold a connection while idle
+
+            # Sleep until a commit (here or, via the watcher, elsewhere) touches this user
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if wakeup.wait(min(_KEEPALIVE_SECONDS, remaining)):
+                    break
+                yield ': keep-alive\n\n'
+    finally:
+        broker.unsubscribe(user_id, wakeup)
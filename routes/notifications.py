@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from models import db, Employee, Notification, User # Import necessary models
+from routes.cache import cached
+from routes.notification_stream import touch_notification_users
+from routes.unread_counts import adjust_unread_counts
+
+# Notification dispatcher.
+# Recipient lookups (users by role, the user account of an employee) go through the
+# shared response cache keyed on the User/Employee generations, so they are reloaded
+# only after those tables change. Fan-out rows are written with one bulk insert.
+#
+# Alerts can be coalesced: a repeated alert for the same greenhouse and type within
+# NOTIFICATION_COALESCE_SECONDS of the last occurrence bumps the occurrence count of
+# the recipient's unread notification instead of adding a new row.
+
+ALERT_ROLES = ['admin', 'manager']
+ALERT_TYPES = ['warning', 'critical']
+
+
+def role_recipients(roles=ALERT_ROLES):
+    """Returns the ids of all users having one of `roles`."""
+    roles = sorted(roles)
+    return set(cached('recipients.roles', ['User'], lambda: [
+        user_id for (user_id,) in db.session.query(User.id).filter(User.role.in_(roles)).order_by(User.id)
+    ], *roles))
+
+
+def employee_user_id(employee_id):
+    """Returns the id of the user account sharing the employee's email, or None."""
+    mapping = cached('recipients.employee_users', ['User', 'Employee'], lambda: {
+        str(emp_id): user_id for emp_id, user_id in
+        db.session.query(Employee.id, User.id).join(User, User.email == Employee.email)
+    })
+    return mapping.get(str(employee_id))
+
+
+def coalesce_window():
+    seconds = current_app.config.get('NOTIFICATION_COALESCE_SECONDS', 900) if has_app_context() else 0
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def _coalesce(events, now, window):
+    """Folds coalescable events into matching unread notifications.
+
+    Returns {event index: set of user ids already covered}.
+    """
+    candidates = [(i, event) for i, event in enumerate(events)
+                  if event.get('coalesce') and event.get('related_greenhouse') is not None]
+    if not candidates or window is None:
+        return {}
+
+    cutoff = now - window
+    user_ids = {user_id for _, event in candidates for user_id in event['user_ids']}
+    matches = {}
+    # One query for every recipient, greenhouse and type involved in this dispatch
+    for notification_id, user_id, greenhouse_id, notification_type in db.session.query(
+            Notification.id, Notification.user_id, Notification.related_greenhouse, Notification.notification_type).filter(
+            Notification.user_id.in_(user_ids),
+            Notification.is_read.is_(False),
+            Notification.related_greenhouse.in_({event['related_greenhouse'] for _, event in candidates}),
+            Notification.notification_type.in_({event.get('notification_type', 'info') for _, event in candidates}),
+            db.or_(Notification.last_occurred_at >= cutoff,
+                   db.and_(Notification.last_occurred_at.is_(None), Notification.created_at >= cutoff))
+    ).order_by(Notification.id):
+        matches[(user_id, greenhouse_id, notification_type)] = notification_id # Newest wins
+
+    covered = {}
+    for i, event in candidates:
+        ids = {}
+        for user_id in event['user_ids']:
+            notification_id = matches.get((user_id, event['related_greenhouse'], event.get('notification_type', 'info')))
+            if notification_id is not None:
+                ids[user_id] = notification_id
+        if ids:
+            db.session.execute(
+                db.update(Notification).
+                where(Notification.id.in_(list(ids.values()))).
+                values(occurrence_count=Notification.occurrence_count + 1,
+                       last_occurred_at=now,
+                       message=event['message']).
+                execution_options(synchronize_session=False)
+            )
+            covered[i] = set(ids)
+    return covered
+
+
+def notify_many(events):
+    """Writes the notifications of several events with a single bulk insert.
+
+    Each event is a dict with `user_ids` and the Notification fields `title`,
+    `message` and optionally `notification_type` and `related_greenhouse`. Events
+    with `coalesce=True` are merged into matching recent unread notifications.
+    Returns the number of new rows written. The caller commits the session.
+    """
+    events = list(events)
+    now = datetime.utcnow()
+    covered = _coalesce(events, now, coalesce_window())
+    touched = set()
+    rows = []
+    for i, event in enumerate(events):
+        recipients = {user_id for user_id in event['user_ids'] if user_id is not None}
+        touched |= recipients
+        for user_id in sorted(recipients - covered.get(i, set())):
+            rows.append({
+                'user_id': user_id,
+                'title': event['title'],
+                'message': event['message'],
+                'notification_type': event.get('notification_type', 'info'),
+                'related_greenhouse': event.get('related_greenhouse'),
+                'is_read': False,
+                'created_at': now,
+                'occurrence_count': 1,
+                'first_occurred_at': now,
+                'last_occurred_at': now
+            })
+
+    if rows:
+        db.session.execute(db.insert(Notification), rows)
+    # Bulk statements bypass the flush hooks, so report the affected users explicitly
+    deltas = {}
+    for row in rows:
+        deltas[row['user_id']] = deltas.get(row['user_id'], 0) + 1
+    adjust_unread_counts(db.session, deltas)
+    touch_notification_users(db.session, touched)
+    return len(rows)
+
+
+def notify(user_ids, title, message, notification_type='info', related_greenhouse=None, coalesce=False):
+    """Writes one notification per recipient for a single event."""
+    return notify_many([{
+        'user_ids': user_ids,
+        'title': title,
+        'message': message,
+        'notification_type': notification_type,
+        'related_greenhouse': related_greenhouse,
+        'coalesce': coalesce
+    }])
+
+
+def send_digests(since, now=None, fold=False):
+    """Writes one digest notification per user summarizing their unread alerts since `since`.
+
+    With fold=True the summarized alerts are marked read, so the digest replaces them
+    in the unread count. Returns the number of digests written. Commits the session.
+    """
+    now = now or datetime.utcnow()
+    occurred = db.func.coalesce(Notification.last_occurred_at, Notification.created_at)
+    alerts = db.and_(
+        Notification.user_id.isnot(None),
+        Notification.is_read.is_(False),
+        Notification.notification_type.in_(ALERT_TYPES),
+        occurred >= since,
+        occurred < now
+    )
+    summary = {}
+    for user_id, notification_type, occurrences in db.session.query(
+            Notification.user_id, Notification.notification_type, db.func.sum(Notification.occurrence_count)).\
+            filter(alerts).group_by(Notification.user_id, Notification.notification_type):
+        summary.setdefault(user_id, {'critical': 0, 'warning': 0})[notification_type] = int(occurrences or 0)
+    greenhouses = dict(db.session.query(Notification.user_id, db.func.count(db.distinct(Notification.related_greenhouse))).
+                       filter(alerts).group_by(Notification.user_id).all()) if summary else {}
+
+    events = [{
+        'user_ids': [user_id],
+        'title': 'Alert Digest',
+        'message': f"{entry['critical'] + entry['warning']} alerts since {since.strftime('%d-%b %H:%M')} "
+                   f"(critical: {entry['critical']}, warning: {entry['warning']}) across {greenhouses.get(user_id, 0)} greenhouse(s)",
+        'notification_type': 'info'
+    } for user_id, entry in summary.items()]
+
+    if fold and summary:
+        folded = {}
+        for user_id, count in db.session.query(Notification.user_id, db.func.count(Notification.id)).filter(alerts).group_by(Notification.user_id):
+            folded[user_id] = -count
+        db.session.execute(db.update(Notification).where(alerts).values(is_read=True).execution_options(synchronize_session=False))
+        adjust_unread_counts(db.session, folded)
+    written = notify_many(events)
+    db.session.commit()
+    return written
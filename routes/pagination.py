@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from models import db
+
+# Keyset ("seek") pagination over (timestamp, id), newest first.
+# Each page continues strictly after the last row of the previous page, so the cost
+# of a page does not depend on how deep into the history it is, unlike OFFSET.
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp, row_id):
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (timestamp, id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_page_size(value, default=20):
+    """Parses a page size query parameter. Raises ValueError if it is out of range."""
+    if value in [None, '']:
+        return default
+    try:
+        limit = int(value)
+    except ValueError as e:
+        raise ValueError('limit must be an integer') from e
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=20):
+    """Returns (rows, next_cursor) for the page of `query` after `cursor`, newest first.
+
+    `next_cursor` is None on the last page.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # Written as a range on the leading column so the composite index can seek to it
+        query = query.filter(
+            timestamp_column <= timestamp,
+            db.or_(timestamp_column < timestamp, id_column < row_id)
+        )
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,171 @@
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models import db, Issue, IssueResolutionStats # Import necessary models
+from routes.history import track_previous_values, history_value
+
+# Incrementally maintained resolution-time rollups backing the reports page.
+# Every resolved issue is counted in a (resolution day, greenhouse, type, bucket) cell
+# holding the number of issues and their total resolution time. Buckets are log-scale
+# (each BUCKET_GROWTH times wider than the previous), so the median and p90 of any date
+# range are read from the bucket histogram to within one bucket width, while the
+# average is exact. Cells are adjusted in the same transaction as the Issue changes
+# through a session after_flush hook, like the daily issue counters.
+
+BUCKET_GROWTH = 1.1
+REPORT_DEFAULT_DAYS = 90
+
+
+def resolution_bucket(seconds):
+    return 0 if seconds < 1 else int(math.log(seconds, BUCKET_GROWTH)) + 1
+
+
+def _contribution(created_at, resolved_at, status, greenhouse_id, issue_type):
+    """The cell a resolved issue is counted in and its resolution time, or None."""
+    if status != 'resolved' or created_at is None or resolved_at is None:
+        return None
+    seconds = max((resolved_at - created_at).total_seconds(), 0.0)
+    return (resolved_at.date(), greenhouse_id, issue_type, resolution_bucket(seconds)), seconds
+
+
+def _state(issue, index):
+    return tuple(history_value(issue, name, index) for name in ['created_at', 'resolved_at', 'status', 'greenhouse_id', 'issue_type'])
+
+
+def _bump(connection, deltas):
+    rows = [{'day': day, 'greenhouse_id': greenhouse_id, 'issue_type': issue_type, 'bucket': bucket,
+             'resolved': count, 'total_seconds': seconds}
+            for (day, greenhouse_id, issue_type, bucket), (count, seconds) in deltas.items() if count != 0]
+    if not rows:
+        return
+    table = IssueResolutionStats.__table__
+    upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(connection.dialect.name)
+    if upsert is not None:
+        # One executemany upsert for every touched cell
+        statement = upsert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.greenhouse_id, table.c.issue_type, table.c.bucket],
+            set_={'resolved': table.c.resolved + statement.excluded.resolved,
+                  'total_seconds': table.c.total_seconds + statement.excluded.total_seconds}
+        ), rows)
+        return
+    for row in rows:
+        key = [table.c[name] == row[name] for name in ['day', 'greenhouse_id', 'issue_type', 'bucket']]
+        updated = connection.execute(db.update(table).where(*key).values(
+            resolved=table.c.resolved + row['resolved'],
+            total_seconds=table.c.total_seconds + row['total_seconds'])).rowcount
+        if not updated:
+            connection.execute(db.insert(table).values(**row))
+
+
+# Load the previous value when these attributes are set on an expired Issue, so the
+# cell it was counted in can be decremented
+track_previous_values(Issue.greenhouse_id, Issue.issue_type, Issue.created_at, Issue.status, Issue.resolved_at)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_resolutions(session, flush_context):
+    deltas = {}
+
+    def add(contribution, sign):
+        if contribution is not None:
+            cell, seconds = contribution
+            count, total = deltas.get(cell, (0, 0.0))
+            deltas[cell] = (count + sign, total + sign * seconds)
+
+    for obj in session.new:
+        if isinstance(obj, Issue):
+            add(_contribution(*_state(obj, 1)), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Issue) and session.is_modified(obj):
+            add(_contribution(*_state(obj, 0)), -1)
+            add(_contribution(*_state(obj, 1)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Issue):
+            add(_contribution(*_state(obj, 0)), -1)
+
+    if deltas:
+        _bump(session.connection(), deltas)
+
+
+def rebuild_report_stats():
+    """Recomputes every resolution rollup in one streamed pass over the resolved issues."""
+    cells = {}
+    query = db.session.query(Issue.created_at, Issue.resolved_at, Issue.status, Issue.greenhouse_id, Issue.issue_type).\
+        filter(Issue.status == 'resolved', Issue.resolved_at.isnot(None), Issue.created_at.isnot(None))
+    for row in query.yield_per(10000):
+        cell, seconds = _contribution(*row)
+        count, total = cells.get(cell, (0, 0.0))
+        cells[cell] = (count + 1, total + seconds)
+
+    db.session.execute(db.delete(IssueResolutionStats))
+    if cells:
+        db.session.execute(db.insert(IssueResolutionStats), [{
+            'day': day, 'greenhouse_id': greenhouse_id, 'issue_type': issue_type, 'bucket': bucket,
+            'resolved': count, 'total_seconds': total
+        } for (day, greenhouse_id, issue_type, bucket), (count, total) in cells.items()])
+    db.session.commit()
+    return len(cells)
+
+
+def ensure_report_stats():
+    """Builds the resolution rollups once for databases created before they existed."""
+    if IssueResolutionStats.query.first() is None and Issue.query.filter(Issue.status == 'resolved').first() is not None:
+        rebuild_report_stats()
+
+
+def default_report_range(today=None):
+    """Returns the default [start, end) day range: the last REPORT_DEFAULT_DAYS days including today."""
+    today = today or datetime.utcnow().date()
+    return today - timedelta(days=REPORT_DEFAULT_DAYS - 1), today + timedelta(days=1)
+
+
+def _summary(histogram):
+    # histogram: {bucket: [count, seconds]}
+    count = sum(cell[0] for cell in histogram.values())
+    if count <= 0:
+        return {'resolved': 0, 'avg_hours': 0, 'median_hours': 0, 'p90_hours': 0}
+
+    def quantile(q):
+        rank = max(math.ceil(q * count), 1)
+        seen = 0
+        for bucket in sorted(histogram):
+            bucket_count, seconds = histogram[bucket]
+            seen += bucket_count
+            if seen >= rank and bucket_count > 0:
+                return seconds / bucket_count # Mean of the bucket holding the rank
+        return 0.0
+
+    total_seconds = sum(cell[1] for cell in histogram.values())
+    return {
+        'resolved': count,
+        'avg_hours': round(total_seconds / count / 3600, 2),
+        'median_hours': round(quantile(0.5) / 3600, 2),
+        'p90_hours': round(quantile(0.9) / 3600, 2)
+    }
+
+
+def resolution_report(start, end):
+    """Resolution time summary for issues resolved on days in [start, end), in one grouped query.
+
+    Returns the overall summary plus per-type and per-greenhouse breakdowns, each with
+    the resolved count and the average, median and p90 resolution time in hours.
+    """
+    overall, by_type, by_greenhouse = {}, {}, {}
+    for issue_type, greenhouse_id, bucket, count, seconds in db.session.query(
+            IssueResolutionStats.issue_type, IssueResolutionStats.greenhouse_id, IssueResolutionStats.bucket,
+            db.func.sum(IssueResolutionStats.resolved), db.func.sum(IssueResolutionStats.total_seconds)).filter(
+            IssueResolutionStats.day >= start, IssueResolutionStats.day < end).group_by(
+            IssueResolutionStats.issue_type, IssueResolutionStats.greenhouse_id, IssueResolutionStats.bucket):
+        for histogram in [overall, by_type.setdefault(issue_type, {}), by_greenhouse.setdefault(greenhouse_id, {})]:
+            cell = histogram.setdefault(bucket, [0, 0.0])
+            cell[0] += count or 0
+            cell[1] += seconds or 0.0
+    return {
+        'overall': _summary(overall),
+        'by_type': {issue_type: _summary(histogram) for issue_type, histogram in sorted(by_type.items())},
+        'by_greenhouse': {str(greenhouse_id): _summary(histogram) for greenhouse_id, histogram in by_greenhouse.items()}
+    }
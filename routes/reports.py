@@ -1,44 +1,73 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, redirect, url_for, session, flash, request
 from models import db, Greenhouse, Issue # Import necessary models
-from datetime import datetime
+from datetime import datetime, timedelta
+from routes.cache import cached
+from routes.report_stats import default_report_range, resolution_report
+from routes.loading import load_profile
 
 reports_bp = Blueprint('reports', __name__, template_folder='../templates')
 
+
+def report_range(args):
+    """Returns the [start, end) day range of ?from= and ?to= (inclusive dates). Raises ValueError."""
+    start, end = default_report_range()
+    if args.get('from'):
+        start = datetime.strptime(args['from'], '%Y-%m-%d').date()
+    if args.get('to'):
+        end = datetime.strptime(args['to'], '%Y-%m-%d').date() + timedelta(days=1)
+    if start >= end:
+        raise ValueError('from must not be after to')
+    return start, end
+
+
+def _build_report(start, end):
+    # Counts of issues created in the range use ix_issue_created; resolution times come from the rollups
+    range_start, range_end = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    created = db.and_(Issue.created_at >= range_start, Issue.created_at < range_end)
+    greenhouse_names = {str(gh_id): name for gh_id, name in db.session.query(Greenhouse.id, Greenhouse.name)}
+    resolution = resolution_report(start, end)
+    return {
+        'total_greenhouses': len(greenhouse_names),
+        'current_issues': Issue.query.filter(Issue.status != 'resolved').count(),
+        'issue_types': dict(db.session.query(Issue.issue_type, db.func.count(Issue.id)).filter(created).group_by(Issue.issue_type).all()),
+        'issue_statuses': dict(db.session.query(Issue.status, db.func.count(Issue.id)).filter(created).group_by(Issue.status).all()),
+        'resolution': resolution,
+        'resolution_by_greenhouse': sorted(
+            [dict(summary, name=greenhouse_names.get(gh_id, f'Greenhouse {gh_id}')) for gh_id, summary in resolution['by_greenhouse'].items()],
+            key=lambda summary: summary['name'])
+    }
+
+
+def report_snapshot(start, end):
+    # Snapshots are cached per period until issues or greenhouses change
+    return cached('reports.page', ['Greenhouse', 'Issue', 'IssueResolutionStats'],
+                  lambda: _build_report(start, end), start.isoformat(), end.isoformat())
+
+
 @reports_bp.route('/reports')
 def show_reports(): # Renamed function
     if 'user_id' not in session:
         flash('Please log in to access this page.', 'warning')
         return redirect(url_for('auth.login'))
-    
-    # Calculate various report statistics
-    total_greenhouses = Greenhouse.query.count()
-    current_issues = Issue.query.filter(Issue.status != 'resolved').count()
-    
-    # Issues by type
-    issue_types = db.session.query(Issue.issue_type, db.func.count(Issue.id)).\
-        group_by(Issue.issue_type).all()
-    issue_types_dict = {t[0]: t[1] for t in issue_types}
-    
-    # Issues by status
-    issue_statuses = db.session.query(Issue.status, db.func.count(Issue.id)).\
-        group_by(Issue.status).all()
-    issue_statuses_dict = {s[0]: s[1] for s in issue_statuses}
-    
-    # Average resolution time
-    resolved_issues = Issue.query.filter(Issue.status == 'resolved', Issue.resolved_at != None).all()
-    
-    avg_resolution_time = 0
-    if resolved_issues:
-        total_resolution_time_seconds = sum([(issue.resolved_at - issue.created_at).total_seconds() for issue in resolved_issues])
-        avg_resolution_time = total_resolution_time_seconds / len(resolved_issues) / 3600  # in hours
-    
-    # Recent issues (last 10)
-    recent_issues = Issue.query.order_by(Issue.created_at.desc()).limit(10).all()
-    
-    return render_template('reports.html', 
-                          total_greenhouses=total_greenhouses,
-                          current_issues=current_issues,
-                          issue_types=issue_types_dict,
-                          issue_statuses=issue_statuses_dict,
-                          avg_resolution_time=round(avg_resolution_time, 2),
+
+    try:
+        start, end = report_range(request.args)
+    except ValueError:
+        flash('Invalid report date range; showing the default period.', 'warning')
+        start, end = default_report_range()
+    report = report_snapshot(start, end)
+
+    # Recent issues (last 10), with their greenhouse and employee joined in
+    recent_issues = Issue.query.options(*load_profile('issue_list')).order_by(Issue.created_at.desc()).limit(10).all()
+
+    return render_template('reports.html',
+                          total_greenhouses=report['total_greenhouses'],
+                          current_issues=report['current_issues'],
+                          issue_types=report['issue_types'],
+                          issue_statuses=report['issue_statuses'],
+                          avg_resolution_time=report['resolution']['overall']['avg_hours'],
+                          resolution=report['resolution'],
+                          resolution_by_greenhouse=report['resolution_by_greenhouse'],
+                          range_from=start.isoformat(),
+                          range_to=(end - timedelta(days=1)).isoformat(),
                           recent_issues=recent_issues)
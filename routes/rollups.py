@@ -0,0 +1,270 @@
+import math
+from datetime import timedelta
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Reading, ReadingRollup # Import necessary models
+
+# Time-series rollups (min/max/mean/count per greenhouse at minute, hour and day resolution)
+
+ROLLUP_METRICS = ['temperature', 'humidity', 'light_level']
+
+# Resolutions from finest to coarsest with their bucket width
+RESOLUTIONS = [
+    ('minute', timedelta(minutes=1)),
+    ('hour', timedelta(hours=1)),
+    ('day', timedelta(days=1)),
+]
+
+# SQLite strftime formats producing the same text SQLAlchemy stores for DateTime values
+_SQLITE_BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M:00.000000',
+    'hour': '%Y-%m-%d %H:00:00.000000',
+    'day': '%Y-%m-%d 00:00:00.000000',
+}
+
+
+def bucket_start(timestamp, resolution):
+    if resolution == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _new_bucket():
+    return dict({'count': 0}, **{f'{metric}_{agg}': None for metric in ROLLUP_METRICS for agg in ['min', 'max', 'sum']})
+
+
+def _add_to_bucket(bucket, row):
+    bucket['count'] += 1
+    for metric in ROLLUP_METRICS:
+        _merge_value(bucket, metric, row.get(metric))
+
+
+def _merge_value(bucket, metric, value):
+    if value is None:
+        return
+    low, high = bucket[f'{metric}_min'], bucket[f'{metric}_max']
+    bucket[f'{metric}_min'] = value if low is None else min(low, value)
+    bucket[f'{metric}_max'] = value if high is None else max(high, value)
+    bucket[f'{metric}_sum'] = (bucket[f'{metric}_sum'] or 0) + value
+
+
+def update_rollups(rows):
+    """Folds newly stored reading rows into the rollup tables.
+
+    Rows are first aggregated in memory per (greenhouse, resolution, bucket), then
+    merged into the stored rollups. On SQLite and PostgreSQL this is one atomic
+    INSERT ... ON CONFLICT DO UPDATE per resolution that adds the counts and sums and
+    widens min/max in the database, so the web workers, the gateway and the
+    write-behind flusher can fold readings into the same buckets concurrently without
+    colliding on new buckets or losing increments. Changes are part of the current
+    session's transaction and committed together with the readings.
+    """
+    pending = {}
+    for row in rows:
+        for resolution, _ in RESOLUTIONS:
+            key = (row['greenhouse_id'], resolution, bucket_start(row['timestamp'], resolution))
+            bucket = pending.get(key)
+            if bucket is None:
+                bucket = pending[key] = _new_bucket()
+            _add_to_bucket(bucket, row)
+    if not pending:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(dialect)
+    if upsert is not None:
+        # SQLite's two-argument min()/max() are scalar; PostgreSQL spells them least()/greatest()
+        combine = {'min': db.func.min, 'max': db.func.max} if dialect == 'sqlite' else {'min': db.func.least, 'max': db.func.greatest}
+        for resolution, _ in RESOLUTIONS:
+            rows = [dict(pending[key], greenhouse_id=key[0], resolution=key[1], bucket_start=key[2])
+                    for key in sorted(key for key in pending if key[1] == resolution)]
+            statement = upsert(ReadingRollup)
+            excluded = statement.excluded
+            set_ = {'count': ReadingRollup.count + excluded['count']}
+            for metric in ROLLUP_METRICS:
+                for agg in ['min', 'max']:
+                    column, new = getattr(ReadingRollup, f'{metric}_{agg}'), excluded[f'{metric}_{agg}']
+                    # A NULL on either side (no samples of the metric) keeps the other value
+                    set_[f'{metric}_{agg}'] = combine[agg](db.func.coalesce(column, new), db.func.coalesce(new, column))
+                column = getattr(ReadingRollup, f'{metric}_sum')
+                set_[f'{metric}_sum'] = db.func.coalesce(column, 0) + db.func.coalesce(excluded[f'{metric}_sum'], 0)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[ReadingRollup.greenhouse_id, ReadingRollup.resolution, ReadingRollup.bucket_start],
+                set_=set_
+            ), rows)
+        return
+
+    # Other databases: read-modify-write with one lookup query per resolution
+    for resolution, _ in RESOLUTIONS:
+        keys = [key for key in pending if key[1] == resolution]
+        existing = {(r.greenhouse_id, r.resolution, r.bucket_start): r for r in ReadingRollup.query.filter(
+            ReadingRollup.resolution == resolution,
+            ReadingRollup.greenhouse_id.in_({key[0] for key in keys}),
+            ReadingRollup.bucket_start.in_({key[2] for key in keys})
+        )}
+        for key in keys:
+            bucket = pending[key]
+            rollup = existing.get(key)
+            if rollup is None:
+                db.session.add(ReadingRollup(greenhouse_id=key[0], resolution=key[1], bucket_start=key[2], **bucket))
+                continue
+            rollup.count += bucket['count']
+            for metric in ROLLUP_METRICS:
+                for agg, combine in [('min', min), ('max', max)]:
+                    name = f'{metric}_{agg}'
+                    current, new = getattr(rollup, name), bucket[name]
+                    if new is not None:
+                        setattr(rollup, name, new if current is None else combine(current, new))
+                name = f'{metric}_sum'
+                setattr(rollup, name, (getattr(rollup, name) or 0) + (bucket[name] or 0))
+
+
+def _bucket_expression(resolution):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return db.func.strftime(_SQLITE_BUCKET_FORMATS[resolution], Reading.timestamp)
+    if dialect == 'postgresql':
+        return db.func.date_trunc(resolution, Reading.timestamp)
+    return None # No bucketing function; rebuild_rollups falls back to _rebuild_in_python
+
+
+def _rebuild_in_python(greenhouse_id=None, chunk_size=1000):
+    """Generic rebuild for other dialects: buckets readings in Python.
+
+    Readings are read in keyset pages ordered by (greenhouse, timestamp, id), which
+    ix_reading_greenhouse_timestamp serves, so each bucket is complete as soon as the
+    next reading falls outside it and can be written out; memory stays bounded by
+    chunk_size. Returns the number of rollup rows written.
+    """
+    columns = [Reading.greenhouse_id, Reading.timestamp, Reading.id] + [getattr(Reading, metric) for metric in ROLLUP_METRICS]
+    base = db.select(*columns).where(Reading.timestamp.isnot(None)).\
+        order_by(Reading.greenhouse_id, Reading.timestamp, Reading.id).limit(chunk_size)
+    if greenhouse_id is not None:
+        base = base.where(Reading.greenhouse_id == greenhouse_id)
+
+    current = {} # resolution -> (key, bucket) of the bucket being filled
+    completed = []
+    written = 0
+    last = None
+    while True:
+        query = base
+        if last is not None:
+            query = query.where(db.or_(
+                Reading.greenhouse_id > last['greenhouse_id'],
+                db.and_(Reading.greenhouse_id == last['greenhouse_id'], Reading.timestamp > last['timestamp']),
+                db.and_(Reading.greenhouse_id == last['greenhouse_id'], Reading.timestamp == last['timestamp'],
+                        Reading.id > last['id'])
+            ))
+        rows = db.session.execute(query).mappings().all()
+        for row in rows:
+            for resolution, _ in RESOLUTIONS:
+                key = (row['greenhouse_id'], resolution, bucket_start(row['timestamp'], resolution))
+                entry = current.get(resolution)
+                if entry is None or entry[0] != key:
+                    if entry is not None:
+                        completed.append(entry)
+                    entry = current[resolution] = (key, _new_bucket())
+                _add_to_bucket(entry[1], row)
+        if len(rows) < chunk_size:
+            completed.extend(current.values())
+        if completed:
+            db.session.execute(db.insert(ReadingRollup), [
+                dict(bucket, greenhouse_id=key[0], resolution=key[1], bucket_start=key[2]) for key, bucket in completed])
+            written += len(completed)
+            completed.clear()
+        if len(rows) < chunk_size:
+            return written
+        last = rows[-1]
+
+
+def rebuild_rollups(greenhouse_id=None):
+    """Recomputes rollups from the raw reading table with one INSERT ... SELECT per resolution.
+
+    Returns the number of rollup rows written.
+    """
+    delete = db.delete(ReadingRollup)
+    if greenhouse_id is not None:
+        delete = delete.where(ReadingRollup.greenhouse_id == greenhouse_id)
+    db.session.execute(delete)
+
+    if _bucket_expression(RESOLUTIONS[0][0]) is None:
+        written = _rebuild_in_python(greenhouse_id)
+        db.session.commit()
+        return written
+
+    written = 0
+    for resolution, _ in RESOLUTIONS:
+        bucket = _bucket_expression(resolution)
+        aggregates = []
+        for metric in ROLLUP_METRICS:
+            column = getattr(Reading, metric)
+            aggregates += [db.func.min(column), db.func.max(column), db.func.coalesce(db.func.sum(column), 0)]
+        select = db.select(Reading.greenhouse_id, db.literal(resolution), bucket, db.func.count(Reading.id), *aggregates).\
+            where(Reading.timestamp.isnot(None)).\
+            group_by(Reading.greenhouse_id, bucket)
+        if greenhouse_id is not None:
+            select = select.where(Reading.greenhouse_id == greenhouse_id)
+        columns = ['greenhouse_id', 'resolution', 'bucket_start', 'count'] + [
+            f'{metric}_{agg}' for metric in ROLLUP_METRICS for agg in ['min', 'max', 'sum']]
+        result = db.session.execute(db.insert(ReadingRollup).from_select(columns, select))
+        written += result.rowcount
+    db.session.commit()
+    return written
+
+
+def ensure_rollups():
+    """Builds the rollup tables once for databases created before they existed."""
+    if ReadingRollup.query.first() is None and Reading.query.first() is not None:
+        rebuild_rollups()
+
+
+def bucket_count(start, end, resolution):
+    """Upper bound on the number of `resolution` buckets in [start, end)."""
+    return math.ceil((end - start) / dict(RESOLUTIONS)[resolution]) + 1
+
+
+def choose_resolution(start, end, points, max_buckets=None):
+    """Picks the coarsest resolution that still yields at least `points` buckets in [start, end).
+
+    With `max_buckets`, a coarser resolution is used while the chosen one would exceed it.
+    """
+    span = end - start
+    chosen = RESOLUTIONS[0][0]
+    for resolution, width in reversed(RESOLUTIONS):
+        if span / width >= points:
+            chosen = resolution
+            break
+    if max_buckets is not None:
+        names = [name for name, _ in RESOLUTIONS]
+        index = names.index(chosen)
+        while index < len(names) - 1 and bucket_count(start, end, names[index]) > max_buckets:
+            index += 1
+        chosen = names[index]
+    return chosen
+
+
+def query_rollups(greenhouse_id, start, end, points=None, resolution=None, max_buckets=None):
+    """Returns (resolution, rollups) for a greenhouse over the half-open range [start, end)."""
+    if resolution is None:
+        resolution = choose_resolution(start, end, points or 1, max_buckets)
+    rollups = ReadingRollup.query.filter(
+        ReadingRollup.greenhouse_id == greenhouse_id,
+        ReadingRollup.resolution == resolution,
+        ReadingRollup.bucket_start >= bucket_start(start, resolution),
+        ReadingRollup.bucket_start < end
+    ).order_by(ReadingRollup.bucket_start).all()
+    return resolution, rollups
+
+
+def serialize_rollup(rollup):
+    result = {'bucket_start': rollup.bucket_start.isoformat(), 'count': rollup.count}
+    for metric in ROLLUP_METRICS:
+        total = getattr(rollup, f'{metric}_sum')
+        result[metric] = {
+            'min': getattr(rollup, f'{metric}_min'),
+            'max': getattr(rollup, f'{metric}_max'),
+            'mean': round(total / rollup.count, 2) if rollup.count and total is not None else None
+        }
+    return result
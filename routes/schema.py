@@ -0,0 +1,54 @@
+from models import db
+
+# Schema upkeep for databases created by an older version of the models.
+# db.create_all() creates missing tables but never touches existing ones, so columns
+# and indexes added to existing models are created here.
+
+# Indexes superseded by a wider index on the models; dropped when still present
+RETIRED_INDEXES = {
+    'issue': ['ix_issue_employee_status'], # Replaced by ix_issue_employee_status_priority
+}
+
+
+def ensure_columns():
+    """Adds columns declared on the models that are missing from existing tables.
+
+    New columns must be nullable or have a server default so existing rows stay valid.
+    """
+    inspector = db.inspect(db.engine)
+    added = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}'
+                if column.server_default is not None:
+                    ddl += f' NOT NULL DEFAULT {column.server_default.arg}' if not column.nullable else f' DEFAULT {column.server_default.arg}'
+                connection.execute(db.text(ddl))
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def ensure_indexes():
+    """Creates every index declared on the models that is missing from the database.
+
+    Indexes listed in RETIRED_INDEXES are dropped first.
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        retired = [name for name in RETIRED_INDEXES.get(table.name, []) if name in existing]
+        if retired:
+            # Reflected into a throwaway MetaData so the models' tables are left untouched
+            reflected = db.Table(table.name, db.MetaData(), autoload_with=db.engine)
+            for index in reflected.indexes:
+                if index.name in retired:
+                    index.drop(bind=db.engine)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
@@ -0,0 +1,150 @@
+import html
+import re
+from datetime import datetime
+from flask import current_app
+from models import db
+
+# Full-text search over issue descriptions/notes and notification titles/messages.
+# Each table has an SQLite FTS5 index in external-content mode (the text is read back
+# from the table itself, only the inverted index is stored). The indexes are kept in
+# sync by SQL triggers rather than ORM events, so the bulk INSERT/UPDATE statements used
+# for notifications are indexed too. Other databases have no search index.
+
+_INDEXES = {
+    'issue': ('issue_fts', ['description', 'notes']),
+    'notification': ('notification_fts', ['title', 'message'])
+}
+KINDS = list(_INDEXES)
+_MARK_START, _MARK_END = '\x02', '\x03' # Escaped before being turned into <mark> tags
+
+
+def max_search_offset():
+    return current_app.config.get('SEARCH_MAX_OFFSET', 200)
+
+
+def min_prefix_length():
+    return current_app.config.get('SEARCH_MIN_PREFIX_LENGTH', 3)
+
+
+def search_available():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _trigger_ddl(table, index, columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    remove = f"INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    add = f'INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new});'
+    return {
+        f'{index}_insert': f'CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN {add} END',
+        f'{index}_delete': f'CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN {remove} END',
+        f'{index}_update': f'CREATE TRIGGER {index}_update AFTER UPDATE OF {names} ON {table} BEGIN {remove} {add} END'
+    }
+
+
+def ensure_search_index():
+    """Creates missing full-text indexes and triggers; returns the tables whose index was rebuilt.
+
+    An index is rebuilt when it is new or one of its triggers was missing (e.g. the table
+    was recreated), since it cannot be trusted to match the table then.
+    """
+    if not search_available():
+        return []
+    rebuilt = []
+    with db.engine.begin() as connection:
+        existing = {name for (name,) in connection.execute(db.text(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+        for table, (index, columns) in _INDEXES.items():
+            stale = index not in existing
+            if stale:
+                connection.execute(db.text(
+                    f"CREATE VIRTUAL TABLE {index} USING fts5({', '.join(columns)}, content='{table}', "
+                    f"content_rowid='id', tokenize='porter unicode61')"))
+            for name, ddl in _trigger_ddl(table, index, columns).items():
+                if name not in existing:
+                    connection.execute(db.text(ddl))
+                    stale = True
+            if stale:
+                connection.execute(db.text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+                rebuilt.append(table)
+    return rebuilt
+
+
+def rebuild_search_index():
+    """Re-indexes every issue and notification; returns {table: rows indexed}."""
+    ensure_search_index()
+    counts = {}
+    with db.engine.begin() as connection:
+        for table, (index, _) in _INDEXES.items():
+            connection.execute(db.text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+            counts[table] = connection.execute(db.text(f'SELECT count(*) FROM {table}')).scalar()
+    return counts
+
+
+def match_expression(text, min_prefix=3):
+    """Turns free text into an FTS5 query: every word must match, as a prefix.
+
+    Words shorter than `min_prefix` must match a whole word, since a one or two letter
+    prefix matches most of the index. Raises ValueError if the text has no searchable words.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    return ' '.join(f'"{term}"*' if len(term) >= min_prefix else f'"{term}"' for term in terms)
+
+
+def _iso(value):
+    # Raw SQL returns SQLite timestamps as text
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.isoformat() if value else None
+
+
+def _highlight(snippet):
+    return html.escape(snippet or '').replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search(text, user_id, kinds=None, limit=20, offset=0):
+    """Ranked matches across issues and the user's own notifications, best first.
+
+    Returns (results, has_more). Raises ValueError for an empty query or an offset
+    beyond max_search_offset(): ranking is not incremental, so every page ranks the
+    whole match set and deep pages cost as much as the first.
+    """
+    if offset > max_search_offset():
+        raise ValueError(f'offset must be at most {max_search_offset()}; refine the query instead')
+    parameters = {'query': match_expression(text, min_prefix_length()), 'user_id': user_id,
+                  'window': offset + limit + 1, 'limit': limit + 1, 'offset': offset}
+    snippet = f"snippet({{index}}, -1, '{_MARK_START}', '{_MARK_END}', '…', 16)"
+    # Each index is cut to the rows the page can reach before the UNION, so the final
+    # sort only sees a page's worth of rows per index
+    selects = []
+    if 'issue' in (kinds or KINDS):
+        selects.append(
+            f"SELECT * FROM (SELECT 'issue' AS kind, issue.id AS id, bm25(issue_fts) AS score, issue.issue_type AS title, "
+            f"{snippet.format(index='issue_fts')} AS snippet, issue.greenhouse_id AS greenhouse_id, issue.created_at AS created_at "
+            f"FROM issue_fts JOIN issue ON issue.id = issue_fts.rowid WHERE issue_fts MATCH :query "
+            f"ORDER BY score, id LIMIT :window)")
+    if 'notification' in (kinds or KINDS):
+        selects.append(
+            f"SELECT * FROM (SELECT 'notification' AS kind, notification.id AS id, bm25(notification_fts) AS score, "
+            f"notification.title AS title, {snippet.format(index='notification_fts')} AS snippet, "
+            f"notification.related_greenhouse AS greenhouse_id, notification.created_at AS created_at "
+            f"FROM notification_fts JOIN notification ON notification.id = notification_fts.rowid "
+            f"WHERE notification_fts MATCH :query AND notification.user_id = :user_id ORDER BY score, id LIMIT :window)")
+    if not selects:
+        return [], False
+
+    rows = db.session.execute(db.text(
+        ' UNION ALL '.join(selects) + ' ORDER BY score, kind, id LIMIT :limit OFFSET :offset'), parameters).mappings().all()
+    results = [{
+        'kind': row['kind'],
+        'id': row['id'],
+        'score': round(-row['score'], 4), # bm25() is lower for better matches
+        'title': row['title'],
+        'snippet': _highlight(row['snippet']),
+        'greenhouse_id': row['greenhouse_id'],
+        'created_at': _iso(row['created_at'])
+    } for row in rows[:limit]]
+    return results, len(rows) > limit and offset + limit <= max_search_offset()
@@ -0,0 +1,79 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Greenhouse, GreenhouseSnapshot, Reading # Import necessary models
+
+# Helpers for the materialized latest-reading snapshot (one GreenhouseSnapshot row per greenhouse)
+
+SNAPSHOT_FIELDS = ['temperature', 'humidity', 'air_quality', 'soil_moisture', 'light_level', 'timestamp']
+
+
+def update_snapshots(latest_rows):
+    """Moves snapshots forward to the given newest rows (greenhouse id -> reading row).
+
+    Rows older than the stored snapshot are ignored, so out-of-order backfills never
+    replace newer values. On SQLite and PostgreSQL this is one atomic
+    INSERT ... ON CONFLICT DO UPDATE WHERE newer, so concurrent writers neither collide
+    on the first insert nor let an older sample win. Changes are part of the current
+    session's transaction and committed together with the readings by the caller.
+    """
+    if not latest_rows:
+        return
+    rows = [dict({field: row.get(field) for field in SNAPSHOT_FIELDS}, greenhouse_id=gh_id)
+            for gh_id, row in sorted(latest_rows.items())]
+    upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(db.session.get_bind().dialect.name)
+    if upsert is not None:
+        statement = upsert(GreenhouseSnapshot)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[GreenhouseSnapshot.greenhouse_id],
+            set_={field: statement.excluded[field] for field in SNAPSHOT_FIELDS},
+            where=db.or_(GreenhouseSnapshot.timestamp.is_(None), statement.excluded.timestamp >= GreenhouseSnapshot.timestamp)
+        ), rows)
+        return
+    # Other databases: conditional update, then insert the greenhouses that had no snapshot
+    existing = {gh_id for (gh_id,) in db.session.query(GreenhouseSnapshot.greenhouse_id).filter(
+        GreenhouseSnapshot.greenhouse_id.in_(list(latest_rows)))}
+    for row in rows:
+        if row['greenhouse_id'] in existing:
+            db.session.execute(db.update(GreenhouseSnapshot).where(
+                GreenhouseSnapshot.greenhouse_id == row['greenhouse_id'],
+                db.or_(GreenhouseSnapshot.timestamp.is_(None), GreenhouseSnapshot.timestamp <= row['timestamp'])
+            ).values(**{field: row[field] for field in SNAPSHOT_FIELDS}).execution_options(synchronize_session=False))
+        else:
+            db.session.execute(db.insert(GreenhouseSnapshot).values(**row))
+
+
+def rebuild_snapshots():
+    """Recomputes every snapshot from the raw reading table. Returns the number of rows written."""
+    ranked = db.select(
+        Reading.greenhouse_id,
+        *[getattr(Reading, field) for field in SNAPSHOT_FIELDS],
+        db.func.row_number().over(
+            partition_by=Reading.greenhouse_id,
+            order_by=(Reading.timestamp.desc(), Reading.id.desc())
+        ).label('rn')
+    ).subquery()
+    columns = ['greenhouse_id'] + SNAPSHOT_FIELDS
+    db.session.execute(db.delete(GreenhouseSnapshot))
+    result = db.session.execute(db.insert(GreenhouseSnapshot).from_select(
+        columns,
+        db.select(*[ranked.c[column] for column in columns]).where(ranked.c.rn == 1)
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def ensure_snapshots():
+    """Builds the snapshot table once for databases created before it existed."""
+    if GreenhouseSnapshot.query.first() is None and Reading.query.first() is not None:
+        rebuild_snapshots()
+
+
+def greenhouses_with_snapshots():
+    """Returns (greenhouse, snapshot or None) pairs for every greenhouse in one query."""
+    return db.session.query(Greenhouse, GreenhouseSnapshot).\
+        outerjoin(GreenhouseSnapshot, GreenhouseSnapshot.greenhouse_id == Greenhouse.id).\
+        order_by(Greenhouse.id).all()
+
+
+def get_snapshot(greenhouse_id):
+    return db.session.get(GreenhouseSnapshot, greenhouse_id)
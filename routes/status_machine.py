@@ -0,0 +1,131 @@
+import threading
+from datetime import timedelta
+from models import db, Greenhouse, Reading # Import necessary models
+from routes.thresholds import STATUSES, classify_reading
+
+# Per-greenhouse status state machine.
+# A greenhouse only becomes less severe once its readings clear the thresholds by the
+# configured hysteresis band, and (optionally) a different status must be observed for
+# STATUS_CONFIRM_SAMPLES consecutive evaluations spanning STATUS_MIN_DWELL_SECONDS
+# before the transition is applied. Escalations to critical are never delayed.
+# The persisted Greenhouse.status stays authoritative; the machine only keeps the
+# pending transition of each greenhouse in memory.
+
+SEVERITY = {status: code for code, status in enumerate(STATUSES)}
+
+
+class StatusMachine:
+    """Applies hysteresis and debounce to per-reading status evaluations."""
+
+    def __init__(self, temp_band=0.0, humidity_band=0.0, confirm_samples=1, min_dwell_seconds=0):
+        self.temp_band = temp_band
+        self.humidity_band = humidity_band
+        self.confirm_samples = max(confirm_samples, 1)
+        self.min_dwell = timedelta(seconds=min_dwell_seconds)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            'evaluations': 0,
+            'transitions': 0,
+            'held_by_hysteresis': 0,
+            'held_by_debounce': 0
+        }
+
+    @property
+    def debounced(self):
+        return self.confirm_samples > 1 or self.min_dwell > timedelta(0)
+
+    def _target(self, greenhouse, current, row, raw):
+        raw = raw or classify_reading(row, greenhouse)['status']
+        if SEVERITY[raw] >= SEVERITY[current]:
+            return raw, False
+        # De-escalation: the reading must also clear the thresholds by the hysteresis band
+        strict = classify_reading(row, greenhouse, temp_margin=self.temp_band, humidity_margin=self.humidity_band)['status']
+        if SEVERITY[strict] >= SEVERITY[current]:
+            return current, True
+        return strict, False
+
+    def step(self, greenhouse, current, row, raw=None):
+        """Feeds one reading row and returns the status the greenhouse should now have.
+
+        `greenhouse` is a Greenhouse (or its id, which uses the default thresholds) and
+        `raw` the already classified status of `row`, if known.
+        """
+        greenhouse_id = getattr(greenhouse, 'id', greenhouse)
+        current = current if current in SEVERITY else 'normal'
+        target, held = self._target(greenhouse, current, row, raw)
+        with self._lock:
+            self.counters['evaluations'] += 1
+            if held:
+                self.counters['held_by_hysteresis'] += 1
+            if target == current:
+                self._pending.pop(greenhouse_id, None)
+                return current
+            if target == 'critical' or not self.debounced:
+                self._pending.pop(greenhouse_id, None)
+                self.counters['transitions'] += 1
+                return target
+
+            pending = self._pending.get(greenhouse_id)
+            if pending is None or pending['from'] != current or pending['to'] != target:
+                pending = {'from': current, 'to': target, 'samples': 0, 'since': row['timestamp']}
+                self._pending[greenhouse_id] = pending
+            pending['samples'] += 1
+            if pending['samples'] >= self.confirm_samples and row['timestamp'] - pending['since'] >= self.min_dwell:
+                del self._pending[greenhouse_id]
+                self.counters['transitions'] += 1
+                return target
+            self.counters['held_by_debounce'] += 1
+            return current
+
+    def rehydrate(self):
+        """Rebuilds pending transitions by replaying the latest readings of every greenhouse."""
+        with self._lock:
+            self._pending.clear()
+        if not self.debounced:
+            return 0
+        # One LIMIT query per greenhouse walks the tail of ix_reading_greenhouse_timestamp,
+        # so startup cost follows the number of greenhouses rather than the reading history
+        columns = (Reading.temperature, Reading.humidity, Reading.air_quality, Reading.soil_moisture, Reading.timestamp)
+        counters = dict(self.counters)
+        for greenhouse in Greenhouse.query.order_by(Greenhouse.id):
+            rows = db.session.execute(
+                db.select(*columns).where(Reading.greenhouse_id == greenhouse.id).
+                order_by(Reading.timestamp.desc(), Reading.id.desc()).limit(self.confirm_samples)
+            ).mappings().all()
+            for row in reversed(rows): # Replay oldest first
+                self.step(greenhouse, greenhouse.status, row)
+        with self._lock:
+            self.counters = counters # Replays are not counted as live evaluations
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['pending'] = len(self._pending)
+        stats['suppressed'] = stats['held_by_hysteresis'] + stats['held_by_debounce']
+        stats.update({
+            'temperature_band': self.temp_band,
+            'humidity_band': self.humidity_band,
+            'confirm_samples': self.confirm_samples,
+            'min_dwell_seconds': self.min_dwell.total_seconds()
+        })
+        return stats
+
+
+def init_status_machine(app):
+    """Creates the status state machine and rehydrates it from the database."""
+    machine = StatusMachine(
+        temp_band=app.config.get('STATUS_HYSTERESIS_TEMPERATURE', 0.0),
+        humidity_band=app.config.get('STATUS_HYSTERESIS_HUMIDITY', 0.0),
+        confirm_samples=app.config.get('STATUS_CONFIRM_SAMPLES', 1),
+        min_dwell_seconds=app.config.get('STATUS_MIN_DWELL_SECONDS', 0)
+    )
+    with app.app_context():
+        machine.rehydrate()
+    app.extensions['status_machine'] = machine
+    return machine
+
+
+def get_status_machine(app):
+    return app.extensions.get('status_machine')
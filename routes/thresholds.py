@@ -0,0 +1,196 @@
+import threading
+import time
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, ThresholdProfile # Import necessary models
+from routes.cache import get_response_cache
+
+# Threshold rule engine shared by the ingest path, status machine and views.
+# Threshold profiles are loaded from the database and compiled once into NumPy
+# tables; the compiled rule set is cached per process until a commit touches
+# ThresholdProfile (commits made by other processes are picked up within
+# THRESHOLD_RULES_TTL). A greenhouse uses its assigned profile, else the profile of its
+# crop, else the default profile (or the built-in thresholds when none is stored).
+
+STATUSES = ['normal', 'warning', 'critical'] # Index == severity code
+NUMERIC_METRICS = ['temperature', 'humidity']
+CATEGORICAL_METRICS = ['air_quality', 'soil_moisture']
+METRICS = NUMERIC_METRICS + CATEGORICAL_METRICS
+_BOUNDS = ['critical_low', 'warning_low', 'warning_high', 'critical_high']
+
+DEFAULT_THRESHOLDS = {
+    'temperature_critical_low': 10,
+    'temperature_warning_low': 15,
+    'temperature_warning_high': 30,
+    'temperature_critical_high': 35,
+    'humidity_critical_low': 30,
+    'humidity_warning_low': 40,
+    'humidity_warning_high': 85,
+    'humidity_critical_high': 90,
+    'air_quality_critical': 'Poor',
+    'air_quality_warning': 'Fair',
+    'soil_moisture_critical': '',
+    'soil_moisture_warning': 'Low,Very Low'
+}
+
+
+def _split(values):
+    return {value.strip() for value in (values or '').split(',') if value.strip()}
+
+
+class RuleSet:
+    """Compiled threshold profiles.
+
+    Numeric bounds are stored as a (profiles, metrics, 4) array so a batch of readings
+    belonging to different profiles is classified with a handful of array operations.
+    """
+
+    def __init__(self, profiles):
+        # profiles: list of (id, name, crop, is_default, thresholds dict); index 0 is the built-in default
+        self.names = ['built-in'] + [name for _, name, _, _, _ in profiles]
+        thresholds = [DEFAULT_THRESHOLDS] + [values for _, _, _, _, values in profiles]
+        self.bounds = np.array([[[float(values[f'{metric}_{bound}']) for bound in _BOUNDS] for metric in NUMERIC_METRICS]
+                                for values in thresholds], dtype=np.float64)
+        self.categories = [{metric: (_split(values[f'{metric}_critical']), _split(values[f'{metric}_warning']))
+                            for metric in CATEGORICAL_METRICS} for values in thresholds]
+        self.by_id = {profile_id: i + 1 for i, (profile_id, _, _, _, _) in enumerate(profiles)}
+        self.by_crop = {crop: i + 1 for i, (_, _, crop, _, _) in enumerate(profiles) if crop}
+        self.default = next((i + 1 for i, (_, _, _, is_default, _) in enumerate(profiles) if is_default), 0)
+
+    @classmethod
+    def load(cls):
+        columns = list(DEFAULT_THRESHOLDS)
+        profiles = []
+        for profile in ThresholdProfile.query.order_by(ThresholdProfile.id):
+            values = {}
+            for column in columns:
+                value = getattr(profile, column)
+                values[column] = DEFAULT_THRESHOLDS[column] if value is None else value
+            profiles.append((profile.id, profile.name, profile.crop, profile.is_default, values))
+        return cls(profiles)
+
+    def profile_index(self, greenhouse=None):
+        """Index of the profile that applies to `greenhouse` (an object with crop/threshold_profile_id)."""
+        if greenhouse is not None:
+            profile_id = getattr(greenhouse, 'threshold_profile_id', None)
+            if profile_id in self.by_id:
+                return self.by_id[profile_id]
+            crop = getattr(greenhouse, 'crop', None)
+            if crop in self.by_crop:
+                return self.by_crop[crop]
+        return self.default
+
+    def classify_batch(self, columns, profile_indexes=None, temp_margin=0.0, humidity_margin=0.0):
+        """Classifies a batch of readings in one vectorized pass.
+
+        `columns` maps metric names to equal-length sequences (NumPy arrays or lists).
+        `profile_indexes` gives each row's profile index (default profile if None).
+        Margins move the numeric thresholds towards the safe range (hysteresis).
+        Returns a dict of int8 severity-code arrays per metric plus 'status', the
+        worst metric of each row.
+        """
+        n = len(next(iter(columns.values())))
+        indexes = np.full(n, self.default, dtype=np.int64) if profile_indexes is None else np.asarray(profile_indexes, dtype=np.int64)
+        severities = {}
+        for m, (metric, margin) in enumerate(zip(NUMERIC_METRICS, [temp_margin, humidity_margin])):
+            values = np.asarray(columns.get(metric, np.full(n, np.nan)), dtype=np.float64)
+            bounds = self.bounds[indexes, m] # (n, 4) bounds of every row's profile
+            critical = (values < bounds[:, 0] + margin) | (values > bounds[:, 3] - margin)
+            warning = (values < bounds[:, 1] + margin) | (values > bounds[:, 2] - margin)
+            severities[metric] = np.where(critical, 2, np.where(warning, 1, 0)).astype(np.int8)
+        for metric in CATEGORICAL_METRICS:
+            values = np.asarray(columns.get(metric, [''] * n), dtype=object).astype(str)
+            categories, inverse = np.unique(values, return_inverse=True)
+            # (profiles, categories) severity table, indexed per row
+            table = np.zeros((len(self.categories), len(categories)), dtype=np.int8)
+            for p, profile in enumerate(self.categories):
+                critical, warning = profile[metric]
+                for c, category in enumerate(categories):
+                    table[p, c] = 2 if category in critical else 1 if category in warning else 0
+            severities[metric] = table[indexes, inverse.reshape(-1)]
+        severities['status'] = np.max(np.stack([severities[metric] for metric in METRICS]), axis=0) if n else np.zeros(0, dtype=np.int8)
+        return severities
+
+    def classify(self, reading, greenhouse=None, temp_margin=0.0, humidity_margin=0.0):
+        """Classifies one reading (a dict or an object with metric attributes).
+
+        Returns a dict of status names per metric plus the overall 'status'.
+        """
+        return classify_many([(greenhouse, reading)], self, temp_margin, humidity_margin)[0]
+
+
+_compiled = {'key': None, 'rules': None, 'compiled_at': 0.0}
+_compiled_lock = threading.Lock()
+_generation = [0] # Bumped when a commit of this process touched ThresholdProfile
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_profile_changes(session, flush_context):
+    if any(isinstance(obj, ThresholdProfile) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['threshold_profiles_touched'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_generation(session):
+    if session.info.pop('threshold_profiles_touched', False):
+        with _compiled_lock:
+            _generation[0] += 1
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_profile_changes(session):
+    session.info.pop('threshold_profiles_touched', None)
+
+
+def _rules_ttl():
+    return current_app.config.get('THRESHOLD_RULES_TTL', 30) if has_app_context() else 30
+
+
+def get_rules():
+    """Returns the compiled rule set, recompiling only after ThresholdProfile changed.
+
+    Commits made by this process are seen at once; commits made elsewhere through the
+    shared response cache's generations, when one is configured, and otherwise once
+    THRESHOLD_RULES_TTL seconds have passed.
+    """
+    cache = get_response_cache()
+    shared = tuple(cache.backend.generations(['ThresholdProfile'])) if cache is not None else None
+    ttl = _rules_ttl()
+    now = time.monotonic()
+    with _compiled_lock:
+        key = (_generation[0], shared)
+        if _compiled['rules'] is not None and _compiled['key'] == key and (ttl is None or now - _compiled['compiled_at'] <= ttl):
+            return _compiled['rules']
+    rules = RuleSet.load()
+    with _compiled_lock:
+        _compiled.update(key=key, rules=rules, compiled_at=now)
+    return rules
+
+
+def _value(reading, metric):
+    if reading is None:
+        return None
+    return reading.get(metric) if isinstance(reading, dict) else getattr(reading, metric, None)
+
+
+def classify_many(pairs, rules=None, temp_margin=0.0, humidity_margin=0.0):
+    """Classifies (greenhouse, reading) pairs in one batch; returns one status dict per pair.
+
+    Pairs without a reading are reported as normal.
+    """
+    rules = rules or get_rules()
+    pairs = list(pairs)
+    columns = {}
+    for metric in NUMERIC_METRICS:
+        columns[metric] = [np.nan if _value(reading, metric) is None else _value(reading, metric) for _, reading in pairs]
+    for metric in CATEGORICAL_METRICS:
+        columns[metric] = ['' if _value(reading, metric) is None else _value(reading, metric) for _, reading in pairs]
+    severities = rules.classify_batch(columns, [rules.profile_index(greenhouse) for greenhouse, _ in pairs],
+                                      temp_margin, humidity_margin)
+    return [{name: STATUSES[int(codes[i])] for name, codes in severities.items()} for i in range(len(pairs))]
+
+
+def classify_reading(reading, greenhouse=None, temp_margin=0.0, humidity_margin=0.0):
+    return get_rules().classify(reading, greenhouse, temp_margin, humidity_margin)
@@ -0,0 +1,160 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models import db, Notification, UnreadNotificationCount # Import necessary models
+from routes.history import track_previous_values, previous_value
+
+# Maintained unread-notification counter per user.
+# The counter is adjusted in the same transaction as the notification changes through a
+# session after_flush hook; bulk statements report their changes with adjust_unread_counts.
+# Reads for page renders go through a small per-process cache that is dropped for the
+# affected users when their counters change in this process.
+
+_CACHE_MAX_ENTRIES = 4096
+
+
+class _UnreadCountCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, user_id, count, ttl):
+        with self._lock:
+            if len(self._entries) >= _CACHE_MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + ttl, count)
+
+    def invalidate(self, user_ids=None):
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            for user_id in user_ids or ():
+                self._entries.pop(user_id, None)
+
+
+unread_cache = _UnreadCountCache()
+
+
+def _bump(connection, deltas):
+    rows = [{'user_id': user_id, 'unread': delta} for user_id, delta in sorted(deltas.items()) if delta != 0]
+    if not rows:
+        return
+    table = UnreadNotificationCount.__table__
+    upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(connection.dialect.name)
+    if upsert is not None:
+        # Atomic, so two transactions creating a user's first counter row cannot collide
+        statement = upsert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={'unread': table.c.unread + statement.excluded.unread}
+        ), rows)
+        return
+    for row in rows:
+        user_id, delta = row['user_id'], row['unread']
+        updated = connection.execute(
+            db.update(UnreadNotificationCount).
+            where(UnreadNotificationCount.user_id == user_id).
+            values(unread=UnreadNotificationCount.unread + delta)
+        ).rowcount
+        if not updated:
+            connection.execute(db.insert(UnreadNotificationCount).values(user_id=user_id, unread=delta))
+
+
+def adjust_unread_counts(session, deltas):
+    """Applies {user_id: delta} for notifications changed by bulk statements in this transaction."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id is not None and delta}
+    if deltas:
+        _bump(session.connection(), deltas)
+        session.info.setdefault('unread_count_users', set()).update(deltas)
+
+
+def _contribution(user_id, is_read):
+    return {user_id: 1} if user_id is not None and not is_read else {}
+
+
+# Load the previous value when these attributes are set on an expired Notification
+track_previous_values(Notification.user_id, Notification.is_read)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_notification_changes(session, flush_context):
+    deltas = {}
+
+    def add(cells, sign):
+        for user_id, count in cells.items():
+            deltas[user_id] = deltas.get(user_id, 0) + sign * count
+
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            add(_contribution(obj.user_id, obj.is_read), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Notification) and session.is_modified(obj):
+            add(_contribution(previous_value(obj, 'user_id'), previous_value(obj, 'is_read')), -1)
+            add(_contribution(obj.user_id, obj.is_read), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            add(_contribution(previous_value(obj, 'user_id'), previous_value(obj, 'is_read')), -1)
+
+    adjust_unread_counts(session, deltas)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cached_counts(session):
+    user_ids = session.info.pop('unread_count_users', None)
+    if user_ids:
+        unread_cache.invalidate(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_counted_users(session):
+    session.info.pop('unread_count_users', None)
+
+
+def unread_count(user_id):
+    """Reads the maintained counter of a user (a primary-key lookup)."""
+    count = db.session.query(UnreadNotificationCount.unread).filter(UnreadNotificationCount.user_id == user_id).scalar()
+    return max(count or 0, 0)
+
+
+def cached_unread_count(user_id, ttl):
+    count = unread_cache.get(user_id)
+    if count is None:
+        count = unread_count(user_id)
+        unread_cache.set(user_id, count, ttl)
+    return count
+
+
+def reconcile_unread_counts():
+    """Recomputes every counter from the Notification table.
+
+    Returns the number of users whose stored counter was wrong.
+    """
+    actual = dict(db.session.query(Notification.user_id, db.func.count(Notification.id)).filter(
+        Notification.user_id.isnot(None),
+        db.or_(Notification.is_read.is_(False), Notification.is_read.is_(None))
+    ).group_by(Notification.user_id).all())
+    stored = dict(db.session.query(UnreadNotificationCount.user_id, UnreadNotificationCount.unread).all())
+    drifted = sum(1 for user_id in set(actual) | set(stored) if actual.get(user_id, 0) != stored.get(user_id, 0))
+
+    db.session.execute(db.delete(UnreadNotificationCount))
+    if actual:
+        db.session.execute(db.insert(UnreadNotificationCount), [{'user_id': user_id, 'unread': count} for user_id, count in actual.items()])
+    db.session.commit()
+    unread_cache.invalidate()
+    return drifted
+
+
+def ensure_unread_counts():
+    """Builds the counters once for databases created before they existed."""
+    if UnreadNotificationCount.query.first() is None and Notification.query.first() is not None:
+        reconcile_unread_counts()
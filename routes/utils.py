@@ -1,12 +1,27 @@
 from flask import session, current_app
 from datetime import datetime, timezone
-from models import db, Notification # Import db and Notification from models
+from routes.unread_counts import unread_count, cached_unread_count
+
+# Parse an ISO 8601 timestamp into the naive UTC datetimes stored in the database
+def parse_utc_datetime(value):
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00')) # Raises ValueError if malformed
+    if parsed.tzinfo is not None:
+        try:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        except OverflowError as e: # e.g. 0001-01-01T00:00:00+01:00 falls before datetime.min in UTC
+            raise ValueError(f'Timestamp out of range: {value}') from e
+    return parsed
+
+# Helper function to count a user's unread notifications
+def count_unread_notifications(user_id):
+    # Read the maintained per-user counter instead of counting notification rows
+    return unread_count(user_id)
 
 # Helper function to get unread count
 def get_unread_notification_count():
     if 'user_id' in session:
-        # Use the db object from the models module
-        return Notification.query.filter_by(user_id=session['user_id'], is_read=False).count()
+        # Rendered on every page, so served from the small per-process cache
+        return cached_unread_count(session['user_id'], current_app.config.get('UNREAD_COUNT_CACHE_SECONDS', 5))
     return 0
 
 # Inject unread count and current year into all templates
@@ -0,0 +1,65 @@
+from models import db, Employee, Issue # Import necessary models
+
+# Employee workload computed with one grouped Issue query for any number of employees
+
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+
+
+def _empty_workload():
+    return {'active_issues': 0, 'resolved_issues': 0, 'open_by_priority': {priority: 0 for priority in PRIORITIES}}
+
+
+def employee_workload(employee_ids=None):
+    """Returns {employee id: workload} for the given employees (all employees if None).
+
+    active_issues counts assigned issues, resolved_issues resolved ones and
+    open_by_priority every unresolved issue by priority.
+    """
+    query = db.session.query(Issue.employee_id, Issue.status, Issue.priority, db.func.count(Issue.id)).\
+        filter(Issue.employee_id.isnot(None))
+    if employee_ids is not None:
+        if not employee_ids:
+            return {}
+        query = query.filter(Issue.employee_id.in_(list(employee_ids)))
+
+    workload = {}
+    for employee_id, status, priority, count in query.group_by(Issue.employee_id, Issue.status, Issue.priority):
+        entry = workload.setdefault(employee_id, _empty_workload())
+        if status == 'assigned':
+            entry['active_issues'] += count
+        elif status == 'resolved':
+            entry['resolved_issues'] += count
+        if status != 'resolved':
+            by_priority = entry['open_by_priority']
+            by_priority[priority] = by_priority.get(priority, 0) + count
+    return workload
+
+
+def serialize_employee(employee, workload):
+    data = {
+        'id': employee.id,
+        'name': employee.name,
+        'email': employee.email,
+        'phone': employee.phone,
+        'status': employee.status
+    }
+    data.update(workload.get(employee.id) or _empty_workload())
+    return data
+
+
+def search_employees(q=None, status=None, after_id=None, limit=20):
+    """Returns (employees, has_more) for one roster page ordered by id.
+
+    `q` matches name or email (case-insensitive) and `status` filters by availability.
+    Pages continue after `after_id`.
+    """
+    query = Employee.query
+    if q:
+        pattern = f'%{q.lower()}%'
+        query = query.filter(db.or_(db.func.lower(Employee.name).like(pattern), db.func.lower(Employee.email).like(pattern)))
+    if status:
+        query = query.filter(Employee.status == status)
+    if after_id is not None:
+        query = query.filter(Employee.id > after_id)
+    employees = query.order_by(Employee.id).limit(limit + 1).all()
+    return employees[:limit], len(employees) > limit
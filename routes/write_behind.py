@@ -0,0 +1,188 @@
+import atexit
+import queue
+import threading
+import time
+from models import db, Greenhouse # Import necessary models
+from routes.ingest import store_rows, apply_status_changes
+
+# Optional write-behind buffer for /api/readings/add.
+# Validated readings are queued in process and acknowledged immediately; a background
+# flusher thread drains the queue in batches and commits each batch once, so many
+# sensor samples share a single transaction (and a single fsync on SQLite).
+
+DURABILITY_ACK = 'ack' # Acknowledge as soon as the reading is queued
+DURABILITY_COMMIT = 'commit' # Acknowledge once the batch containing the reading is committed
+
+
+class _Ack:
+    """Completion handle used when the client waits for its reading to be committed."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.committed = False
+        self.result = None # store_rows result of the reading, once its batch was flushed
+
+    def wait(self, timeout):
+        return self.event.wait(timeout) and self.committed
+
+
+class ReadingBuffer:
+    """Bounded in-process reading queue with a background flusher thread."""
+
+    def __init__(self, app, max_size=10000, batch_size=500, flush_interval=1.0, durability=DURABILITY_ACK):
+        if durability not in [DURABILITY_ACK, DURABILITY_COMMIT]:
+            raise ValueError(f'Unknown write-behind durability: {durability}')
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = {
+            'enqueued': 0,
+            'rejected': 0,
+            'flushed': 0,
+            'failed': 0,
+            'flushes': 0,
+            'max_depth': 0
+        }
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='reading-flusher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=30):
+        """Stops accepting readings and drains everything still queued."""
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None) # Wake the flusher so it drains without waiting out the interval
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, row, notify_user_id=None):
+        """Queues a validated reading row.
+
+        Returns an _Ack when durability is 'commit', True when queued under 'ack'
+        durability and False if the buffer is full or stopped.
+        """
+        if self._stop.is_set():
+            return False
+        ack = _Ack() if self.durability == DURABILITY_COMMIT else None
+        try:
+            self._queue.put_nowait((row, notify_user_id, ack))
+        except queue.Full:
+            self._count('rejected')
+            return False
+        with self._lock:
+            self.counters['enqueued'] += 1
+            self.counters['max_depth'] = max(self.counters['max_depth'], self._queue.qsize())
+        return ack or True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats.update({
+            'depth': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'durability': self.durability,
+            'running': self._thread is not None and self._thread.is_alive()
+        })
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self):
+        # Flush when the batch is full or flush_interval has passed since its first reading
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout) if not self._stop.is_set() else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _flush(self, batch):
+        with self.app.app_context():
+            try:
+                results, _ = store_rows([row for row, _, _ in batch], evaluate=False)
+                # Evaluate each greenhouse once, on its newest reading in the whole batch, and
+                # notify the user who submitted that reading as the synchronous path would
+                latest = {}
+                for (row, notify_user_id, _), result in zip(batch, results):
+                    current = latest.get(row['greenhouse_id'])
+                    if result['success'] and (current is None or row['timestamp'] >= current[0]['timestamp']):
+                        latest[row['greenhouse_id']] = (row, notify_user_id)
+                if latest:
+                    greenhouses = {gh.id: gh for gh in Greenhouse.query.filter(Greenhouse.id.in_(list(latest)))}
+                    by_user = {}
+                    for gh_id, (row, notify_user_id) in latest.items():
+                        by_user.setdefault(notify_user_id, {})[gh_id] = row
+                    for notify_user_id, latest_rows in by_user.items():
+                        apply_status_changes(latest_rows, greenhouses, notify_user_id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Write-behind flush of %d readings failed', len(batch))
+                self._count('failed', len(batch))
+                self._release(batch, None)
+                return
+            finally:
+                db.session.remove()
+
+        stored = sum(1 for result in results if result['success'])
+        self._count('flushes')
+        self._count('flushed', stored)
+        self._count('failed', len(batch) - stored)
+        self._release(batch, results)
+
+    def _release(self, batch, results):
+        # `results` is None when the batch was rolled back
+        for index, (_, _, ack) in enumerate(batch):
+            if ack is not None:
+                ack.result = results[index] if results is not None else None
+                ack.committed = ack.result is not None and ack.result['success']
+                ack.event.set()
+
+
+def init_write_behind(app):
+    """Starts the reading buffer when READING_WRITE_BEHIND is enabled."""
+    if not app.config.get('READING_WRITE_BEHIND'):
+        return None
+    buffer = ReadingBuffer(
+        app,
+        max_size=app.config.get('READING_BUFFER_MAX_SIZE', 10000),
+        batch_size=app.config.get('READING_BUFFER_BATCH_SIZE', 500),
+        flush_interval=app.config.get('READING_BUFFER_FLUSH_INTERVAL', 1.0),
+        durability=app.config.get('READING_WRITE_BEHIND_DURABILITY', DURABILITY_ACK)
+    ).start()
+    app.extensions['reading_buffer'] = buffer
+    atexit.register(buffer.stop) # Drain queued readings on interpreter shutdown
+    return buffer
+
+
+def get_reading_buffer(app):
+    return app.extensions.get('reading_buffer')
@@ -10,6 +10,8 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from app import app, db # Now app and db should be importable
+from routes.cache import init_cache
+from routes.unread_counts import unread_cache
 from models import User, Greenhouse, Employee, Issue, Reading # Import all necessary models
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
@@ -27,6 +29,9 @@ class BaseTestCase(unittest.TestCase):
         self.app_context.push() # Push an application context
         
         db.create_all()
+        app.config['RESPONSE_CACHE'] = 'memory' # The shared sqlite file would outlive the recreated tables
+        init_cache(app) # Start every test with an empty response cache
+        unread_cache.invalidate() # Tables are recreated, so cached unread counts are stale
         self.client = app.test_client() # Use self.client consistently
 
         # Common test data can be created here if needed by many test classes
@@ -0,0 +1,76 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase, app
+from models import db, Notification # Import all necessary models
+from routes.notifications import send_digests
+from routes.unread_counts import unread_count
+
+class TestAlertCoalescing(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = self._create_test_user(email='admin_coalesce@example.com', role='admin', name='Coalesce Admin')
+        self._login_user_session(user_id=self.admin_user.id, user_role='admin')
+        self.greenhouse = self._create_test_greenhouse(name='Flapping GH')
+        self._saved_window = app.config.get('NOTIFICATION_COALESCE_SECONDS')
+        app.config['NOTIFICATION_COALESCE_SECONDS'] = 900
+
+    def tearDown(self):
+        app.config['NOTIFICATION_COALESCE_SECONDS'] = self._saved_window
+        super().tearDown()
+
+    def _post(self, temperature):
+        response = self.client.post('/api/readings/add', data=json.dumps({
+            'greenhouse_id': self.greenhouse.id,
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'light_level': 700
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+
+    def _alerts(self):
+        return Notification.query.filter_by(user_id=self.admin_user.id, related_greenhouse=self.greenhouse.id,
+                                            notification_type='critical').all()
+
+    def test_flapping_sensor_bumps_one_notification(self):
+        for temperature in [40, 25, 40, 25, 40]: # critical -> normal -> critical ...
+            self._post(temperature)
+
+        alerts = self._alerts()
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].occurrence_count, 3)
+        self.assertGreaterEqual(alerts[0].last_occurred_at, alerts[0].first_occurred_at)
+        self.assertEqual(unread_count(self.admin_user.id), 1)
+
+    def test_read_alert_is_not_reused(self):
+        self._post(40)
+        self._alerts()[0].is_read = True
+        db.session.commit()
+        self._post(25)
+        self._post(40)
+        self.assertEqual(len(self._alerts()), 2)
+
+    def test_disabled_window_writes_every_alert(self):
+        app.config['NOTIFICATION_COALESCE_SECONDS'] = 0
+        for temperature in [40, 25, 40]:
+            self._post(temperature)
+        self.assertEqual(len(self._alerts()), 2)
+
+    def test_digest_folds_alerts(self):
+        for temperature in [40, 25, 40]:
+            self._post(temperature)
+        written = send_digests(datetime.utcnow() - timedelta(hours=1), now=datetime.utcnow() + timedelta(seconds=1), fold=True)
+        self.assertGreaterEqual(written, 1)
+
+        digest = Notification.query.filter_by(user_id=self.admin_user.id, title='Alert Digest').one()
+        self.assertIn('2 alerts', digest.message)
+        self.assertIn('critical: 2', digest.message)
+        self.assertTrue(all(alert.is_read for alert in self._alerts()))
+        self.assertEqual(unread_count(self.admin_user.id), 1) # Only the digest remains unread
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,17 @@ class TestApiEndpoints(BaseTestCase):
         found_emp = any(emp['name'] == self.emp1.name for emp in data)
         self.assertTrue(found_emp, "Test employee not found in API response.")
 
+    def test_search_employees_api(self):
+        response = self.client.get('/api/employees/search?q=api test emp&status=available&limit=1')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([emp['id'] for emp in data['employees']], [self.emp1.id])
+        self.assertEqual(data['employees'][0]['active_issues'], 0)
+        self.assertIn('open_by_priority', data['employees'][0])
+
+        response = self.client.get('/api/employees/search?after=abc')
+        self.assertEqual(response.status_code, 400)
+
     def test_get_greenhouse_detail_api(self):
         # Test getting a specific greenhouse
         response = self.client.get(f'/api/greenhouses/{self.gh1.id}')
@@ -0,0 +1,102 @@
+import unittest
+import json
+from datetime import datetime
+from ..base_test import BaseTestCase
+from models import db, Greenhouse, Reading, Issue, Notification # Import all necessary models
+
+class TestBatchIngest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = self._create_test_user(email='admin_batch@example.com', role='admin', name='Batch Admin')
+        self._login_user_session(user_id=self.admin_user.id, user_role='admin')
+        self.gh1 = self._create_test_greenhouse(name='Batch GH 1')
+        self.gh2 = self._create_test_greenhouse(name='Batch GH 2')
+
+    def _reading(self, gh_id, temperature, timestamp=None):
+        reading = {
+            'greenhouse_id': gh_id,
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'light_level': 700
+        }
+        if timestamp:
+            reading['timestamp'] = timestamp
+        return reading
+
+    def test_batch_inserts_and_evaluates_newest_sample(self):
+        readings = [
+            self._reading(self.gh1.id, 40, '2024-01-01T10:00:00'),
+            self._reading(self.gh1.id, 25, '2024-01-01T10:01:00'), # Newest sample for gh1 is normal
+            self._reading(self.gh2.id, 40, '2024-01-01T10:00:00'),
+        ]
+        response = self.client.post('/api/readings/batch',
+                                 data=json.dumps({'readings': readings}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        data = json.loads(response.data)
+        self.assertEqual(data['inserted'], 3)
+        self.assertEqual(data['failed'], 0)
+        self.assertEqual(data['statuses'][str(self.gh1.id)], 'normal')
+        self.assertEqual(data['statuses'][str(self.gh2.id)], 'critical')
+
+        self.assertEqual(Reading.query.filter(Reading.greenhouse_id.in_([self.gh1.id, self.gh2.id])).count(), 3)
+        self.assertEqual(db.session.get(Greenhouse, self.gh2.id).status, 'critical')
+        self.assertEqual(Issue.query.filter_by(greenhouse_id=self.gh2.id, priority='critical').count(), 1)
+        self.assertEqual(Issue.query.filter_by(greenhouse_id=self.gh1.id).count(), 0)
+        self.assertEqual(Notification.query.filter_by(user_id=self.admin_user.id, related_greenhouse=self.gh2.id).count(), 1)
+
+    def test_batch_converts_offset_timestamps_to_utc(self):
+        readings = [
+            self._reading(self.gh1.id, 40, '2024-01-01T10:00:00+05:00'), # 05:00 UTC
+            self._reading(self.gh1.id, 25, '2024-01-01T06:00:00Z'), # Newest sample, normal
+        ]
+        response = self.client.post('/api/readings/batch',
+                                 data=json.dumps({'readings': readings}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        self.assertEqual(json.loads(response.data)['statuses'][str(self.gh1.id)], 'normal')
+        stored = [r.timestamp for r in Reading.query.filter_by(greenhouse_id=self.gh1.id).order_by(Reading.timestamp)]
+        self.assertEqual(stored, [datetime(2024, 1, 1, 5, 0), datetime(2024, 1, 1, 6, 0)])
+
+    def test_batch_rejects_offset_timestamps_outside_utc_range(self):
+        readings = [
+            self._reading(self.gh1.id, 25, '0001-01-01T00:00:00+01:00'), # Before datetime.min in UTC
+            self._reading(self.gh1.id, 25, '9999-12-31T23:59:59-01:00'), # After datetime.max in UTC
+            self._reading(self.gh1.id, 25, '2024-01-01T06:00:00Z'),
+        ]
+        response = self.client.post('/api/readings/batch',
+                                 data=json.dumps(readings),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        data = json.loads(response.data)
+        self.assertEqual([r['success'] for r in data['results']], [False, False, True])
+        self.assertEqual(data['results'][0]['message'], 'Invalid timestamp format')
+
+    def test_batch_reports_per_item_errors(self):
+        readings = [
+            self._reading(self.gh1.id, 25),
+            self._reading(99999, 25), # Unknown greenhouse
+            {'greenhouse_id': self.gh1.id, 'temperature': 'hot'}, # Malformed
+        ]
+        response = self.client.post('/api/readings/batch',
+                                 data=json.dumps(readings),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['inserted'], 1)
+        self.assertEqual([r['success'] for r in data['results']], [True, False, False])
+        self.assertEqual(data['results'][1]['message'], 'Greenhouse not found')
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.gh1.id).count(), 1)
+
+    def test_batch_rejects_empty_payload(self):
+        response = self.client.post('/api/readings/batch',
+                                 data=json.dumps({'readings': []}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Greenhouse, Employee, Issue, Notification
+
+class TestBulkIssueActions(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = self._create_test_user(email='admin_bulk@example.com', role='admin', name='Bulk Admin')
+        self._login_user_session(user_id=self.admin_user.id, user_role='admin')
+        self.greenhouses = [self._create_test_greenhouse(name=f'Bulk GH {i}', status='critical') for i in range(4)]
+        self.employees = [self._create_test_employee(name=f'Bulk Emp {i}', email=f'bulk_emp{i}@example.com') for i in range(2)]
+        self.gh_ids = [gh.id for gh in self.greenhouses]
+        self.emp_ids = [emp.id for emp in self.employees]
+
+    def _post(self, url, payload):
+        response = self.client.post(url, data=json.dumps(payload), content_type='application/json')
+        return response, json.loads(response.data)
+
+    def test_bulk_assign_reports_per_item_results(self):
+        response, data = self._post('/api/issues/bulk-assign', {'assignments': [
+            {'greenhouse_id': self.gh_ids[0], 'employee_id': self.emp_ids[0], 'priority': 'high'},
+            {'greenhouse_id': self.gh_ids[1], 'employee_id': self.emp_ids[1], 'priority': 'critical', 'notes': 'Vent stuck'},
+            {'greenhouse_id': self.gh_ids[1], 'employee_id': self.emp_ids[0], 'priority': 'high'},
+            {'greenhouse_id': self.gh_ids[2], 'employee_id': 999999, 'priority': 'high'},
+            {'greenhouse_id': self.gh_ids[3], 'employee_id': self.emp_ids[0], 'priority': 'urgent'}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['assigned'], 2)
+        self.assertEqual([result['success'] for result in data['results']], [True, True, False, False, False])
+
+        issues = Issue.query.filter(Issue.greenhouse_id.in_(self.gh_ids)).all()
+        self.assertEqual(sorted((i.greenhouse_id, i.employee_id, i.status) for i in issues),
+                         [(self.gh_ids[0], self.emp_ids[0], 'assigned'), (self.gh_ids[1], self.emp_ids[1], 'assigned')])
+        self.assertEqual({db.session.get(Employee, emp_id).status for emp_id in self.emp_ids}, {'busy'})
+        self.assertEqual(Notification.query.filter_by(user_id=self.admin_user.id, title=f'Assignment - {self.greenhouses[0].name}').count(), 1)
+
+    def test_bulk_resolve_uses_set_based_queries(self):
+        self._post('/api/issues/bulk-assign', {'assignments': [
+            {'greenhouse_id': gh_id, 'employee_id': self.emp_ids[i % 2], 'priority': 'high'} for i, gh_id in enumerate(self.gh_ids)
+        ]})
+        extra = Issue(greenhouse_id=self.gh_ids[3], issue_type='pest', priority='low', status='open')
+        db.session.add(extra)
+        db.session.commit()
+        extra_id = extra.id
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response, data = self._post('/api/issues/bulk-resolve', {'greenhouse_ids': self.gh_ids[:3] + [999999], 'issue_ids': [extra_id]})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['resolved'], 4)
+        self.assertEqual([result['success'] for result in data['greenhouses']], [True, True, True, False])
+        self.assertTrue(data['issues'][0]['success'])
+        self.assertLess(len(statements), 20) # Independent of the number of greenhouses and issues
+
+        # Greenhouse 3 still has its assigned issue; employee 1 still holds it
+        statuses = {gh.id: gh.status for gh in Greenhouse.query.filter(Greenhouse.id.in_(self.gh_ids))}
+        self.assertEqual([statuses[gh_id] for gh_id in self.gh_ids], ['normal', 'normal', 'normal', 'critical'])
+        self.assertEqual(db.session.get(Employee, self.emp_ids[0]).status, 'available')
+        self.assertEqual(db.session.get(Employee, self.emp_ids[1]).status, 'busy')
+
+    def test_bulk_resolve_requires_ids(self):
+        response, data = self._post('/api/issues/bulk-resolve', {})
+        self.assertEqual(response.status_code, 400)
+        response, data = self._post('/api/issues/bulk-resolve', [self.gh_ids[0]])
+        self.assertEqual(response.status_code, 400)
+
+    def test_issue_resolved_with_its_greenhouse_reports_success(self):
+        issue = Issue(greenhouse_id=self.gh_ids[0], issue_type='pest', priority='low', status='open')
+        db.session.add(issue)
+        db.session.commit()
+
+        response, data = self._post('/api/issues/bulk-resolve', {'greenhouse_ids': [self.gh_ids[0]], 'issue_ids': [issue.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['issues'][0]['success'])
+        self.assertEqual(data['resolved'], 1) # Counted once
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import asyncio
+from ..base_test import BaseTestCase, app
+from models import db, Greenhouse, Reading # Import all necessary models
+from routes.write_behind import ReadingBuffer
+from gateway import parse_line, SensorGateway
+
+class TestGatewayProtocol(unittest.TestCase):
+
+    def test_parse_line(self):
+        row = parse_line(b'3 24.5 61 700 Good Very_Low 1700000000\n')
+        self.assertEqual(row['greenhouse_id'], 3)
+        self.assertEqual(row['temperature'], 24.5)
+        self.assertEqual(row['soil_moisture'], 'Very Low')
+        self.assertEqual(row['timestamp'].year, 2023)
+
+    def test_parse_line_rejects_malformed(self):
+        with self.assertRaises(ValueError):
+            parse_line('3 24.5 61')
+        with self.assertRaises(ValueError):
+            parse_line('3 hot 61 700 Good Good')
+        for line in ['1 20 50 800 Good Good inf', '1 20 50 800 Good Good 1e20', '1 nan 50 800 Good Good', '1 20 inf 800 Good Good']:
+            with self.assertRaises(ValueError, msg=line):
+                parse_line(line)
+
+
+class TestGatewayTcp(BaseTestCase):
+
+    def test_tcp_connection_persists_readings(self):
+        greenhouse = self._create_test_greenhouse(name='Gateway GH')
+        buffer = ReadingBuffer(app, batch_size=10, flush_interval=0.05).start()
+        gateway = SensorGateway(buffer)
+
+        async def run():
+            server = await asyncio.start_server(gateway.handle_tcp, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'{greenhouse.id} 24 60 700 Good Good\n'.encode())
+            writer.write(f'{greenhouse.id} 40 60 700 Good Good\n'.encode())
+            writer.write(b'garbage\n')
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readline(), 5)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return reply
+
+        reply = asyncio.run(run())
+        buffer.stop()
+
+        self.assertTrue(reply.startswith(b'ERR'))
+        self.assertEqual(gateway.counters['accepted'], 2)
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=greenhouse.id).count(), 2)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Greenhouse, greenhouse.id).status, 'critical')
+
+    def test_bad_line_gets_err_and_connection_stays_open(self):
+        greenhouse = self._create_test_greenhouse(name='Gateway Overflow GH')
+        buffer = ReadingBuffer(app, batch_size=10, flush_interval=0.05).start()
+        gateway = SensorGateway(buffer)
+
+        async def run():
+            server = await asyncio.start_server(gateway.handle_tcp, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            replies = []
+            for line in [f'{greenhouse.id} 20 50 800 Good Good inf', f'{greenhouse.id} nan 50 800 Good Good']:
+                writer.write(f'{line}\n'.encode())
+                await writer.drain()
+                replies.append(await asyncio.wait_for(reader.readline(), 5))
+            writer.write(f'{greenhouse.id} 24 60 700 Good Good\n'.encode())
+            await writer.drain()
+            await asyncio.sleep(0.1)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return replies
+
+        replies = asyncio.run(run())
+        buffer.stop()
+
+        self.assertTrue(all(reply.startswith(b'ERR') for reply in replies), replies)
+        self.assertEqual(gateway.counters['invalid'], 2)
+        self.assertEqual(gateway.counters['accepted'], 1)
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=greenhouse.id).count(), 1)
+
+    def test_udp_datagram_skips_only_the_bad_line(self):
+        buffer = ReadingBuffer(app) # Not started; readings stay queued
+        gateway = SensorGateway(buffer)
+        protocol = gateway.datagram_protocol()
+        protocol.datagram_received(b'1 20 50 800 Good Good inf\n1 21 50 800 Good Good\n', ('127.0.0.1', 9))
+        self.assertEqual(gateway.counters, {'accepted': 1, 'invalid': 1, 'rejected': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
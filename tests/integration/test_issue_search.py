@@ -0,0 +1,79 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Issue
+
+class TestIssueSearch(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = self._create_test_user(email='admin_issues@example.com', role='admin', name='Issues Admin')
+        self._login_user_session(user_id=self.admin_user.id, user_role='admin')
+        self.greenhouse = self._create_test_greenhouse(name='Search GH')
+        self.employee = self._create_test_employee(name='Search Emp', email='search_emp@example.com')
+        self.start = datetime(2024, 3, 1)
+        for i in range(7):
+            db.session.add(Issue(
+                greenhouse_id=self.greenhouse.id,
+                employee_id=self.employee.id if i % 2 else None,
+                issue_type='pest' if i % 3 == 0 else 'environmental',
+                priority='critical' if i < 3 else 'low',
+                status='resolved' if i % 2 else 'open',
+                created_at=self.start + timedelta(days=i),
+                resolved_at=self.start + timedelta(days=i, hours=5) if i % 2 else None
+            ))
+        db.session.commit()
+        self.greenhouse_id = self.greenhouse.id
+
+    def _get(self, query):
+        response = self.client.get(f'/api/issues?greenhouse_id={self.greenhouse_id}&{query}')
+        return response, json.loads(response.data)
+
+    def test_pages_follow_cursor_without_lazy_loads(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response, first = self._get('limit=4')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([s for s in statements if 'FROM issue' in s or 'FROM employee' in s or 'FROM greenhouse' in s]), 1)
+        self.assertEqual(first['issues'][0]['greenhouse_name'], 'Search GH')
+
+        response, second = self._get(f"limit=4&cursor={first['next_cursor']}")
+        self.assertIsNone(second['next_cursor'])
+        created = [issue['created_at'] for issue in first['issues'] + second['issues']]
+        self.assertEqual(created, sorted(created, reverse=True))
+        self.assertEqual(len(set(created)), 7)
+
+    def test_filters(self):
+        _, data = self._get('status=resolved&priority=critical')
+        self.assertEqual([issue['created_at'] for issue in data['issues']], [(self.start + timedelta(days=1)).isoformat()])
+        self.assertEqual(data['issues'][0]['employee_name'], 'Search Emp')
+
+        _, data = self._get('type=pest,environmental&priority=low,critical')
+        self.assertEqual(len(data['issues']), 7)
+        _, data = self._get('type=pest')
+        self.assertEqual(len(data['issues']), 3)
+        _, data = self._get(f'employee_id={self.employee.id}&resolved_from=2024-03-04&resolved_to=2024-03-07')
+        self.assertEqual(len(data['issues']), 2)
+        _, data = self._get('created_from=2024-03-02&created_to=2024-03-04')
+        self.assertEqual(len(data['issues']), 2)
+        # Offsets are converted to UTC: 03:00+05:00 on the 2nd is 22:00 UTC on the 1st
+        _, data = self._get('created_from=2024-03-02T03:00:00%2B05:00&created_to=2024-03-03T12:00:00Z')
+        self.assertEqual(len(data['issues']), 2)
+
+    def test_invalid_arguments(self):
+        for query in ['created_from=yesterday', 'employee_id=abc', 'cursor=bogus', 'limit=0']:
+            response, _ = self._get(query)
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Notification # Import all necessary models
+
+class TestNotificationHistory(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_test_user(email='history@example.com', role='admin', name='History User')
+        self.greenhouse = self._create_test_greenhouse(name='History GH')
+        self._login_user_session(user_id=self.user.id, user_role='admin')
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(25):
+            db.session.add(Notification(
+                user_id=self.user.id,
+                title=f'Alert {i}',
+                message='Check greenhouse',
+                notification_type='critical' if i % 5 == 0 else 'info',
+                is_read=i % 2 == 0,
+                related_greenhouse=self.greenhouse.id if i < 10 else None,
+                created_at=base + timedelta(minutes=i // 2) # Pairs share a timestamp to exercise the id tiebreak
+            ))
+        db.session.commit()
+
+    def _page(self, **params):
+        response = self.client.get('/api/notifications/history', query_string=params)
+        return response.status_code, json.loads(response.data)
+
+    def test_pages_cover_history_once_in_order(self):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 10}
+            if cursor:
+                params['cursor'] = cursor
+            status, data = self._page(**params)
+            self.assertEqual(status, 200)
+            seen += [n['id'] for n in data['notifications']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(pages, 3)
+        expected = [n.id for n in Notification.query.filter_by(user_id=self.user.id).
+                    order_by(Notification.created_at.desc(), Notification.id.desc())]
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        status, data = self._page(type='critical', limit=100)
+        self.assertEqual(len(data['notifications']), 5)
+        status, data = self._page(read='false', greenhouse_id=self.greenhouse.id, limit=100)
+        self.assertEqual(len(data['notifications']), 5)
+        self.assertTrue(all(not n['is_read'] for n in data['notifications']))
+        self.assertIsNone(data['next_cursor'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self._page(cursor='not-a-cursor')[0], 400)
+        self.assertEqual(self._page(limit=0)[0], 400)
+        self.assertEqual(self._page(read='maybe')[0], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
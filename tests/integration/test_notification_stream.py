@@ -0,0 +1,115 @@
+import unittest
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from ..base_test import BaseTestCase, app
+from models import db, Notification # Import all necessary models
+from routes.notification_stream import broker
+from routes.notifications import notify_many
+
+class TestNotificationStream(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_test_user(email='sse_user@example.com', role='admin', name='SSE User')
+        self._login_user_session(user_id=self.user.id, user_role='admin')
+        self._saved = {key: app.config.get(key) for key in ['NOTIFICATION_STREAM_POLL_SECONDS', 'NOTIFICATION_STREAM_MAX_SECONDS']}
+        app.config['NOTIFICATION_STREAM_POLL_SECONDS'] = 0.05
+        app.config['NOTIFICATION_STREAM_MAX_SECONDS'] = 0.2 # End the stream quickly so the body can be read
+
+    def tearDown(self):
+        app.config.update(self._saved)
+        super().tearDown()
+
+    def _events(self, body):
+        events = []
+        for frame in body.decode().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in frame.splitlines() if ': ' in line and not line.startswith(':'))
+            if 'event' in fields:
+                events.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+        return events
+
+    def test_resume_from_last_event_id(self):
+        first = Notification(user_id=self.user.id, title='First', message='One')
+        second = Notification(user_id=self.user.id, title='Second', message='Two')
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        response = self.client.get('/api/notifications/stream', headers={'Last-Event-ID': str(first.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = self._events(response.data)
+        self.assertEqual(events[0][:2], ('notification', f'{second.id}:{events[0][1].partition(":")[2]}'))
+        self.assertEqual(events[0][2]['title'], 'Second')
+        self.assertIn(('unread', None, {'count': 2}), events)
+
+    def test_coalesced_repeat_is_pushed_as_update(self):
+        greenhouse = self._create_test_greenhouse(name='SSE GH')
+        alert = {'user_ids': [self.user.id], 'title': 'Critical Alert - SSE GH', 'message': 'Too hot',
+                 'notification_type': 'critical', 'related_greenhouse': greenhouse.id, 'coalesce': True}
+        notify_many([alert])
+        db.session.commit()
+        notification = Notification.query.filter_by(user_id=self.user.id, related_greenhouse=greenhouse.id).one()
+        delivered = f'{notification.id}:{(notification.last_occurred_at - datetime(1970, 1, 1)) // timedelta(microseconds=1)}'
+
+        notify_many([dict(alert, message='Still too hot')]) # Updates the delivered row instead of inserting one
+        db.session.commit()
+        events = self._events(self.client.get('/api/notifications/stream', headers={'Last-Event-ID': delivered}).data)
+        updates = [event for event in events if event[0] == 'notification-updated']
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0][2]['id'], notification.id)
+        self.assertEqual(updates[0][2]['occurrence_count'], 2)
+        self.assertEqual(updates[0][2]['message'], 'Still too hot')
+        self.assertNotIn('notification', [event[0] for event in events])
+
+        # Resuming from the update's id does not repeat it
+        events = self._events(self.client.get('/api/notifications/stream', headers={'Last-Event-ID': updates[0][1]}).data)
+        self.assertNotIn('notification-updated', [event[0] for event in events])
+
+    def test_commit_wakes_subscribers(self):
+        wakeup = broker.subscribe(self.user.id)
+        try:
+            db.session.add(Notification(user_id=self.user.id, title='Live', message='Pushed'))
+            db.session.commit()
+            self.assertTrue(wakeup.is_set())
+        finally:
+            broker.unsubscribe(self.user.id, wakeup)
+
+    def test_idle_stream_does_not_poll(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if threading.get_ident() == test_thread:
+                statements.append(statement)
+
+        test_thread = threading.get_ident()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/api/notifications/stream').data
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        # Newest id, coalesced updates, new notifications and the unread count, once
+        self.assertEqual(len(statements), 4, statements)
+
+    def test_watcher_wakes_streams_for_other_processes(self):
+        wakeup = broker.subscribe(self.user.id)
+        try:
+            broker.watch(app, 0.05)
+            time.sleep(0.1) # Let the watcher take its first look
+            with db.engine.begin() as connection: # A commit the session hooks never see
+                connection.execute(db.insert(Notification).values(user_id=self.user.id, title='Elsewhere', message='Gateway'))
+            wakeup.clear()
+            self.assertTrue(wakeup.wait(2))
+        finally:
+            broker.unsubscribe(self.user.id, wakeup)
+
+    def test_stream_requires_login(self):
+        with self.client.session_transaction() as sess:
+            sess.clear()
+        self.assertEqual(self.client.get('/api/notifications/stream').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
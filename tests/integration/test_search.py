@@ -0,0 +1,94 @@
+import unittest
+import json
+from ..base_test import BaseTestCase
+from models import db, Issue, Notification
+from routes.notifications import notify
+from routes.search import ensure_search_index, rebuild_search_index
+
+class TestFullTextSearch(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ensure_search_index() # Tables were recreated, so triggers are reinstalled and the index rebuilt
+        self.user = self._create_test_user(email='search_user@example.com', name='Search User')
+        self.other = self._create_test_user(email='search_other@example.com', name='Other User')
+        self._login_user_session(user_id=self.user.id)
+        self.greenhouse = self._create_test_greenhouse(name='FTS GH')
+        self.leak = Issue(greenhouse_id=self.greenhouse.id, issue_type='irrigation',
+                          description='Irrigation pipe leaking near the <north> vents', notes='Replace valve')
+        self.pest = Issue(greenhouse_id=self.greenhouse.id, issue_type='pest', description='Aphids on the tomato plants')
+        db.session.add_all([self.leak, self.pest])
+        db.session.commit()
+        # Written with a bulk insert, which the triggers index as well
+        notify([self.user.id], 'Leak detected', 'Water leak reported in FTS GH')
+        notify([self.other.id], 'Leak detected', 'Private leak message')
+        db.session.commit()
+
+    def _search(self, query):
+        response = self.client.get(f'/api/search?{query}')
+        return response, json.loads(response.data)
+
+    def test_ranked_highlighted_results_for_own_notifications(self):
+        response, data = self._search('q=leak')
+        self.assertEqual(response.status_code, 200)
+        kinds = sorted((result['kind'], result['id']) for result in data['results'])
+        own = Notification.query.filter_by(user_id=self.user.id, title='Leak detected').one()
+        self.assertEqual(kinds, [('issue', self.leak.id), ('notification', own.id)])
+        issue = next(result for result in data['results'] if result['kind'] == 'issue')
+        self.assertIn('<mark>leaking</mark>', issue['snippet']) # Porter stemming and prefix match
+        self.assertIn('&lt;north&gt;', issue['snippet'])
+        scores = [result['score'] for result in data['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_updates_and_pagination(self):
+        self.pest.notes = 'Leak in the misting line too'
+        db.session.commit()
+        _, data = self._search('q=leak&type=issue&limit=1')
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['next_offset'], 1)
+        _, second = self._search('q=leak&type=issue&limit=1&offset=1')
+        self.assertIsNone(second['next_offset'])
+        self.assertEqual({data['results'][0]['id'], second['results'][0]['id']}, {self.leak.id, self.pest.id})
+
+        # Paging stops at SEARCH_MAX_OFFSET; deeper offsets are rejected
+        response, _ = self._search('q=leak&offset=100000')
+        self.assertEqual(response.status_code, 400)
+
+        db.session.delete(self.leak)
+        db.session.commit()
+        _, data = self._search('q=valve')
+        self.assertEqual(data['results'], [])
+
+    def test_short_words_match_whole_words_only(self):
+        _, data = self._search('q=le')
+        self.assertEqual(data['results'], []) # Not a prefix of "leak"
+        _, data = self._search('q=lea&type=issue')
+        self.assertEqual([result['id'] for result in data['results']], [self.leak.id])
+        _, data = self._search('q=on&type=issue')
+        self.assertEqual([result['id'] for result in data['results']], [self.pest.id])
+
+    def test_pages_follow_the_full_ranking(self):
+        for i in range(5):
+            db.session.add(Issue(greenhouse_id=self.greenhouse.id, issue_type='irrigation', description='leak ' * (i + 1)))
+            notify([self.user.id], 'Leak detected', 'leak ' * (i + 2))
+        db.session.commit()
+        _, everything = self._search('q=leak&limit=50')
+        paged = []
+        for offset in range(len(everything['results'])):
+            _, data = self._search(f'q=leak&limit=1&offset={offset}')
+            paged += data['results']
+        self.assertEqual(paged, everything['results'])
+        self.assertEqual(len(paged), 12)
+
+    def test_rebuild_and_invalid_queries(self):
+        counts = rebuild_search_index()
+        self.assertGreaterEqual(counts['issue'], 2)
+        _, data = self._search('q=aphid tomato')
+        self.assertEqual([result['id'] for result in data['results']], [self.pest.id])
+        for query in ['q=', 'q=%22%22', 'q=leak&type=reading']:
+            response, _ = self._search(query)
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import json
+from ..base_test import BaseTestCase, app
+from models import db, Greenhouse, Reading # Import all necessary models
+
+class TestStreamIngest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Stream GH')
+
+    def _line(self, temperature, timestamp):
+        return json.dumps({
+            'greenhouse_id': self.greenhouse.id,
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'light_level': 700,
+            'timestamp': timestamp
+        })
+
+    def test_stream_commits_in_chunks_and_reports_line_errors(self):
+        lines = [self._line(20 + i % 5, f'2024-01-01T00:{i:02d}:00') for i in range(7)]
+        lines.insert(3, '{not json')
+        lines.insert(5, '')
+        body = '\n'.join(lines) + '\n'
+
+        response = self.client.post('/api/readings/stream?chunk_size=3',
+                                 data=body,
+                                 content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        data = json.loads(response.data)
+        self.assertEqual(data['inserted'], 7)
+        self.assertEqual(data['failed'], 1)
+        self.assertEqual(data['chunks'], 3)
+        self.assertEqual(data['errors'], [{'line': 4, 'message': 'Invalid JSON'}])
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.greenhouse.id).count(), 7)
+
+    def test_stream_backfill_keeps_status_by_default(self):
+        body = self._line(45, '2023-06-01T00:00:00') + '\n'
+        response = self.client.post('/api/readings/stream',
+                                 data=body,
+                                 content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['inserted'], 1)
+        self.assertEqual(db.session.get(Greenhouse, self.greenhouse.id).status, 'normal')
+
+        self.client.post('/api/readings/stream?evaluate=true', data=body, content_type='application/x-ndjson')
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Greenhouse, self.greenhouse.id).status, 'critical')
+
+    def test_chunk_size_is_clamped_to_max_batch_size(self):
+        previous = app.config.get('READING_BATCH_MAX_SIZE')
+        app.config['READING_BATCH_MAX_SIZE'] = 2
+        try:
+            body = '\n'.join(self._line(20, f'2024-01-01T01:{i:02d}:00') for i in range(5)) + '\n'
+            response = self.client.post('/api/readings/stream?chunk_size=100000',
+                                     data=body,
+                                     content_type='application/x-ndjson')
+        finally:
+            app.config['READING_BATCH_MAX_SIZE'] = previous
+        self.assertEqual(json.loads(response.data)['chunks'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import json
+from unittest.mock import patch
+from datetime import datetime
+from ..base_test import BaseTestCase, app
+from models import db, Greenhouse, Reading # Import all necessary models
+from routes.write_behind import ReadingBuffer
+
+class TestWriteBehind(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Buffered GH')
+
+    def tearDown(self):
+        buffer = app.extensions.pop('reading_buffer', None)
+        if buffer is not None:
+            buffer.stop()
+        super().tearDown()
+
+    def _start_buffer(self, **kwargs):
+        buffer = ReadingBuffer(app, **kwargs).start()
+        app.extensions['reading_buffer'] = buffer
+        return buffer
+
+    def _post(self, temperature):
+        return self.client.post('/api/readings/add',
+                                data=json.dumps({
+                                    'greenhouse_id': self.greenhouse.id,
+                                    'temperature': temperature,
+                                    'humidity': 60,
+                                    'air_quality': 'Good',
+                                    'soil_moisture': 'Good',
+                                    'light_level': 700
+                                }),
+                                content_type='application/json')
+
+    def test_commit_durability_waits_for_flush(self):
+        buffer = self._start_buffer(batch_size=10, flush_interval=0.05, durability='commit')
+        response = self._post(40)
+        self.assertEqual(response.status_code, 201, response.data.decode())
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.greenhouse.id).count(), 1)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Greenhouse, self.greenhouse.id).status, 'critical')
+        self.assertEqual(buffer.stats()['flushed'], 1)
+
+    def test_commit_durability_reports_rolled_back_flush(self):
+        self._start_buffer(batch_size=10, flush_interval=0.05, durability='commit')
+        with patch('routes.write_behind.store_rows', side_effect=RuntimeError('disk full')):
+            response = self._post(25)
+        self.assertEqual(response.status_code, 500, response.data.decode())
+        self.assertFalse(json.loads(response.data)['success'])
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.greenhouse.id).count(), 0)
+
+    def _row(self, temperature, timestamp, greenhouse_id=None):
+        return {
+            'greenhouse_id': greenhouse_id or self.greenhouse.id,
+            'temperature': temperature,
+            'humidity': 60,
+            'light_level': 700,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'timestamp': timestamp
+        }
+
+    def test_greenhouse_evaluated_on_newest_row_across_users(self):
+        user = self._create_test_user(email='buffered@example.com')
+        buffer = ReadingBuffer(app, batch_size=10, durability='commit') # Not started; flushed by hand below
+        newer = buffer.submit(self._row(22, datetime(2024, 1, 1, 12)), user.id)
+        older = buffer.submit(self._row(40, datetime(2024, 1, 1, 11)), None)
+        buffer._flush(buffer._collect())
+
+        self.assertTrue(newer.wait(0) and older.wait(0))
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.greenhouse.id).count(), 2)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Greenhouse, self.greenhouse.id).status, 'normal') # The older critical sample does not win
+
+    def test_commit_durability_reports_rejected_rows(self):
+        buffer = ReadingBuffer(app, batch_size=10, durability='commit')
+        stored = buffer.submit(self._row(22, datetime(2024, 1, 1, 12)))
+        rejected = buffer.submit(self._row(22, datetime(2024, 1, 1, 12), greenhouse_id=999999))
+        buffer._flush(buffer._collect())
+
+        self.assertTrue(stored.wait(0))
+        self.assertFalse(rejected.wait(0))
+        self.assertEqual(rejected.result['message'], 'Greenhouse not found')
+        self.assertEqual(buffer.stats()['flushed'], 1)
+        self.assertEqual(buffer.stats()['failed'], 1)
+
+    def test_stop_drains_queue(self):
+        buffer = self._start_buffer(batch_size=100, flush_interval=5)
+        for _ in range(5):
+            self.assertEqual(self._post(25).status_code, 202)
+        buffer.stop()
+        self.assertEqual(Reading.query.filter_by(greenhouse_id=self.greenhouse.id).count(), 5)
+        stats = buffer.stats()
+        self.assertEqual(stats['enqueued'], 5)
+        self.assertEqual(stats['flushed'], 5)
+        self.assertEqual(stats['depth'], 0)
+
+    def test_full_buffer_rejects(self):
+        buffer = ReadingBuffer(app, max_size=1) # Not started, so nothing drains the queue
+        app.extensions['reading_buffer'] = buffer
+        self.assertEqual(self._post(25).status_code, 202)
+        self.assertEqual(self._post(25).status_code, 503)
+        self.assertEqual(buffer.stats()['rejected'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from app import app
+from models import db, Employee, Issue
+from routes.assignment import AutoAssigner
+
+class TestAutoAssignment(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sector_a = self._create_test_greenhouse(name='Assign GH A', location='Assign Sector A')
+        self.sector_b = self._create_test_greenhouse(name='Assign GH B', location='Assign Sector B')
+        self.employees = []
+        for i in range(3):
+            employee = Employee(name=f'Assign Worker {i}', email=f'assign{i}@example.com')
+            db.session.add(employee)
+            self.employees.append(employee)
+        db.session.commit()
+
+    def tearDown(self):
+        app.extensions.pop('auto_assigner', None)
+        super().tearDown()
+
+    def _start(self, **kwargs):
+        assigner = AutoAssigner(**kwargs)
+        assigner.rebuild()
+        # Leave out employees seeded outside this test
+        own = {e.id for e in self.employees}
+        assigner.apply([], removed=[e_id for (e_id,) in db.session.query(Employee.id) if e_id not in own])
+        app.extensions['auto_assigner'] = assigner
+        return assigner
+
+    def _issue(self, greenhouse, priority='critical', **kwargs):
+        issue = Issue(greenhouse_id=greenhouse if isinstance(greenhouse, int) else greenhouse.id, issue_type='environmental', priority=priority, **kwargs)
+        db.session.add(issue)
+        return issue
+
+    def test_assigns_least_loaded_and_leaves_rest_open(self):
+        busy = self.employees[0]
+        self._issue(self.sector_a, employee_id=busy.id, status='assigned')
+        db.session.commit()
+        assigner = self._start()
+
+        issues = [self._issue(self.sector_a) for _ in range(3)] + [self._issue(self.sector_a, priority='low')]
+        db.session.commit()
+
+        assigned = sorted(issue.employee_id for issue in issues[:3] if issue.employee_id)
+        self.assertEqual(assigned, sorted(e.id for e in self.employees[1:]))
+        self.assertEqual(sorted(issue.status for issue in issues), ['assigned', 'assigned', 'open', 'open'])
+        self.assertEqual({db.session.get(Employee, e.id).status for e in self.employees[1:]}, {'busy'})
+        self.assertEqual(assigner.stats()['available'], 0)
+
+    def test_prefers_sector_affinity_among_equally_loaded(self):
+        veteran = self.employees[2]
+        self._issue(self.sector_b, employee_id=veteran.id, status='resolved')
+        db.session.commit()
+        self._start()
+
+        issue = self._issue(self.sector_b)
+        db.session.commit()
+        self.assertEqual(issue.employee_id, veteran.id)
+
+    def test_rollback_releases_and_resolution_frees_load(self):
+        assigner = self._start()
+        issue = self._issue(self.sector_a)
+        db.session.flush()
+        self.assertEqual(assigner.load(issue.employee_id), 1)
+        employee_id = issue.employee_id
+        db.session.rollback()
+        self.assertEqual(assigner.load(employee_id), 0)
+
+        issue = self._issue(self.sector_a)
+        db.session.commit()
+        self.assertEqual(assigner.load(issue.employee_id), 1)
+        issue.status = 'resolved'
+        db.session.commit()
+        self.assertEqual(assigner.load(issue.employee_id), 0)
+
+    def test_picks_are_confirmed_against_other_processes(self):
+        assigner = self._start()
+        first, second, free = [e.id for e in self.employees]
+        # Another process assigns two of the employees; this process never sees the commit
+        with db.engine.begin() as connection:
+            connection.execute(db.insert(Issue), [
+                {'greenhouse_id': self.sector_a.id, 'issue_type': 'environmental', 'priority': 'low',
+                 'status': 'assigned', 'employee_id': employee_id} for employee_id in [first, second]])
+
+        issues = [self._issue(self.sector_a) for _ in range(2)]
+        db.session.commit()
+        self.assertEqual([issue.employee_id for issue in issues], [free, None])
+        self.assertEqual([issue.status for issue in issues], ['assigned', 'open'])
+        self.assertEqual([assigner.load(employee_id) for employee_id in [first, second, free]], [1, 1, 1])
+
+    def test_skips_employees_marked_busy_by_hand(self):
+        held = self.employees[0]
+        held.status = 'busy'
+        db.session.commit()
+        assigner = self._start()
+        self.assertEqual(assigner.stats()['available'], 2)
+
+        issues = [self._issue(self.sector_a) for _ in range(3)]
+        db.session.commit()
+        self.assertNotIn(held.id, [issue.employee_id for issue in issues])
+
+        db.session.get(Employee, held.id).status = 'available' # Released by hand in this process
+        db.session.commit()
+        issue = self._issue(self.sector_a)
+        db.session.commit()
+        self.assertEqual(issue.employee_id, held.id)
+
+    def test_periodic_rebuild_sees_loads_freed_elsewhere(self):
+        employee_ids = [e.id for e in self.employees]
+        assigner = self._start(rebuild_interval=3600)
+        issues = [self._issue(self.sector_a) for _ in range(3)]
+        db.session.commit()
+        self.assertEqual(assigner.stats()['available'], 0)
+
+        # Another process resolves every issue and frees the employees
+        with db.engine.begin() as connection:
+            connection.execute(db.update(Issue).where(Issue.id.in_([issue.id for issue in issues])).values(status='resolved'))
+            connection.execute(db.update(Employee).where(Employee.id.in_(employee_ids)).values(status='available'))
+        stale = self._issue(self.sector_a)
+        db.session.commit()
+        self.assertIsNone(stale.employee_id) # Not rebuilt yet
+
+        assigner.rebuild_interval = 0 # Due now
+        issue = self._issue(self.sector_b)
+        db.session.commit()
+        self.assertIsNotNone(issue.employee_id)
+        # The rebuild also brings back employees seeded outside this test
+        self.assertEqual(sum(assigner.load(employee_id) for employee_id in employee_ids), int(issue.employee_id in employee_ids))
+
+    def test_burst_does_not_query_per_issue(self):
+        self._start(max_load=100)
+        greenhouse_ids = [self.sector_a.id, self.sector_b.id]
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('SELECT'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            issues = [self._issue(greenhouse_ids[i % 2]) for i in range(150)]
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertTrue(all(issue.status == 'assigned' for issue in issues))
+        self.assertLessEqual(len(statements), 3) # Sector map, the grouped workload check and the picked employees
+        loads = sorted(sum(1 for issue in issues if issue.employee_id == e.id) for e in self.employees)
+        self.assertEqual(loads, [50, 50, 50])
+
+
+if __name__ == '__main__':
+    unittest.main()
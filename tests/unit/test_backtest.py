@@ -0,0 +1,96 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Reading
+from routes.backtest import candidate_rules, run_backtest
+
+class TestThresholdBacktest(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Backtest GH')
+        self.other = self._create_test_greenhouse(name='Backtest GH 2')
+        self.end = datetime(2024, 3, 1)
+        # Hourly readings: 25, 28, 25, 28, 32, 25 degrees
+        for i, temperature in enumerate([25, 28, 25, 28, 32, 25]):
+            for gh in [self.greenhouse, self.other]:
+                db.session.add(Reading(greenhouse_id=gh.id, temperature=temperature, humidity=60, air_quality='Good',
+                                       soil_moisture='Good', light_level=700,
+                                       timestamp=self.end - timedelta(hours=6 - i)))
+        db.session.commit()
+
+    def _run(self, **kwargs):
+        candidate = candidate_rules(overrides={'temperature_warning_high': 27})
+        return run_backtest(candidate, days=1, greenhouse_ids=[self.greenhouse.id, self.other.id], end=self.end,
+                            chunk_size=2, **kwargs)
+
+    def test_candidate_compared_with_current(self):
+        report = self._run()
+        gh = next(entry for entry in report['greenhouses'] if entry['greenhouse_id'] == self.greenhouse.id)
+        self.assertEqual(gh['readings'], 6)
+        # Candidate: normal, warning, normal, warning, warning, normal
+        self.assertEqual(gh['candidate']['transitions'], 4)
+        self.assertEqual(gh['candidate']['issues'], 2)
+        self.assertEqual(gh['candidate']['samples_in_status'], {'normal': 3, 'warning': 3, 'critical': 0})
+        self.assertEqual(gh['candidate']['seconds_in_status']['warning'], 3 * 3600)
+        # Current thresholds only warn on the 32 degree reading
+        self.assertEqual(gh['current']['transitions'], 2)
+        self.assertEqual(gh['current']['issues'], 1)
+        self.assertEqual(report['candidate']['issues'], 4)
+
+    def test_process_pool_matches_single_process(self):
+        single = self._run()
+        pooled = self._run(workers=2)
+        self.assertEqual(single['candidate'], pooled['candidate'])
+        self.assertEqual(single['current'], pooled['current'])
+
+    def test_api_rejects_unknown_threshold(self):
+        user = self._create_test_user(email='backtest@example.com', role='admin')
+        self._login_user_session(user_id=user.id, user_role='admin')
+        response = self.client.post('/api/thresholds/backtest', data=json.dumps({'thresholds': {'bogus': 1}}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/thresholds/backtest', data=json.dumps({'days': 7, 'thresholds': {'temperature_warning_high': 27}}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('candidate', json.loads(response.data))
+
+    def test_refuses_replays_above_reading_limit(self):
+        with self.assertRaisesRegex(ValueError, 'backtest-thresholds'):
+            self._run(max_readings=11)
+        self.assertEqual(self._run(max_readings=12)['readings'], 12)
+
+    def test_categories_and_missing_values_match_rule_engine(self):
+        db.session.add_all([
+            Reading(greenhouse_id=self.greenhouse.id, temperature=None, humidity=None, air_quality='Poor',
+                    soil_moisture='Good', light_level=700, timestamp=self.end - timedelta(minutes=30)),
+            Reading(greenhouse_id=self.greenhouse.id, temperature=25, humidity=60, air_quality=None,
+                    soil_moisture='Low', light_level=700, timestamp=self.end - timedelta(minutes=20))
+        ])
+        db.session.commit()
+        gh = next(entry for entry in self._run()['greenhouses'] if entry['greenhouse_id'] == self.greenhouse.id)
+        self.assertEqual(gh['readings'], 8)
+        # Current: normal x4, warning (32), normal, critical (Poor air), warning (Low soil)
+        self.assertEqual(gh['current']['samples_in_status'], {'normal': 5, 'warning': 2, 'critical': 1})
+
+    def test_api_restricted_to_admins_and_managers(self):
+        user = self._create_test_user(email='backtest_user@example.com', role='user')
+        self._login_user_session(user_id=user.id, user_role='user')
+        response = self.client.post('/api/thresholds/backtest', data=json.dumps({'days': 7}), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_api_validates_greenhouse_ids(self):
+        user = self._create_test_user(email='backtest_manager@example.com', role='manager')
+        self._login_user_session(user_id=user.id, user_role='manager')
+        for greenhouse_ids in ['1,2', [1, 'x'], {'id': 1}]:
+            response = self.client.post('/api/thresholds/backtest', data=json.dumps({'days': 7, 'greenhouse_ids': greenhouse_ids}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400, greenhouse_ids)
+        response = self.client.post('/api/thresholds/backtest', data=json.dumps({'days': 7, 'greenhouse_ids': [self.greenhouse.id]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
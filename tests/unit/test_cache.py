@@ -0,0 +1,74 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+from ..base_test import BaseTestCase, app
+from models import db, Greenhouse
+from routes.cache import ResponseCache, MemoryCacheBackend, SQLiteCacheBackend, get_response_cache
+
+class TestCacheBackends(unittest.TestCase):
+
+    def _exercise(self, backend):
+        cache = ResponseCache(backend)
+        calls = []
+        build = lambda: calls.append(1) or {'value': len(calls)}
+        self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 1})
+        self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 1})
+        backend.bump(['Greenhouse']) # Unrelated model does not invalidate
+        self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 1})
+        backend.bump(['Issue'])
+        self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 2})
+        report = cache.report()['endpoints']['x']
+        self.assertEqual((report['hits'], report['misses']), (2, 2))
+
+    def test_memory_backend(self):
+        self._exercise(MemoryCacheBackend())
+
+    def test_entries_expire_after_ttl(self):
+        # Commits made by other processes do not bump this process's generations
+        for backend in [MemoryCacheBackend(), SQLiteCacheBackend(os.path.join(tempfile.mkdtemp(), 'cache.db'))]:
+            cache = ResponseCache(backend, ttl=60)
+            calls = []
+            build = lambda: calls.append(1) or {'value': len(calls)}
+            self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 1})
+            self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 1})
+            cache.ttl = 0
+            time.sleep(0.01)
+            self.assertEqual(cache.get_or_compute('x', ['Issue'], build), {'value': 2})
+
+    def test_sqlite_backend_is_shared(self):
+        path = os.path.join(tempfile.mkdtemp(), 'cache.db')
+        self._exercise(SQLiteCacheBackend(path))
+        # A second backend on the same file (another worker) sees the same generations
+        self.assertEqual(SQLiteCacheBackend(path).generations(['Issue']), [1])
+
+
+class TestCommitInvalidation(BaseTestCase):
+
+    def test_commit_bumps_generation_and_refreshes_endpoint(self):
+        admin = self._create_test_user(email='cache_admin@example.com', role='admin')
+        self._login_user_session(user_id=admin.id, user_role='admin')
+        self._create_test_greenhouse(name='Cached GH 1')
+
+        first = json.loads(self.client.get('/api/greenhouses').data)
+        self.assertEqual(json.loads(self.client.get('/api/greenhouses').data), first)
+
+        self._create_test_greenhouse(name='Cached GH 2')
+        second = json.loads(self.client.get('/api/greenhouses').data)
+        self.assertEqual(len(second), len(first) + 1)
+
+        stats = get_response_cache().report()['endpoints']['api.greenhouses']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_rollback_does_not_bump(self):
+        cache = get_response_cache()
+        before = cache.backend.generations(['Greenhouse'])
+        db.session.add(Greenhouse(name='Rolled back'))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(cache.backend.generations(['Greenhouse']), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import calendar
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Reading
+from routes.downsampling import lttb_indices, downsample, history_resolution
+
+class TestDownsamplingAlgorithms(unittest.TestCase):
+
+    def test_lttb_keeps_endpoints_and_peak(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[437] = 50 # A single spike must survive downsampling
+        indices = lttb_indices(x, y, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertIn(437, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_downsample_shares_timestamps(self):
+        timestamps = np.arange(5000, dtype=np.int64) * 60000
+        series = {'temperature': np.sin(np.arange(5000) / 100.0), 'humidity': np.cos(np.arange(5000) / 50.0)}
+        for algorithm in ['lttb', 'minmax']:
+            ts, values = downsample(timestamps, series, 200, algorithm)
+            self.assertLessEqual(len(ts), 200)
+            self.assertEqual(len(values['temperature']), len(ts))
+            self.assertEqual(len(values['humidity']), len(ts))
+            self.assertAlmostEqual(values['temperature'].max(), 1.0, places=2)
+
+    def test_downsample_fills_budget_and_keeps_last_point(self):
+        timestamps = np.arange(8760, dtype=np.int64) * 3600000
+        series = {'temperature': np.sin(np.arange(8760) / 24.0), 'humidity': np.sin(np.arange(8760) / 24.0 + 0.1),
+                  'light_level': np.cos(np.arange(8760) / 12.0)}
+        for algorithm in ['lttb', 'minmax']:
+            ts, _ = downsample(timestamps, series, 1000, algorithm)
+            self.assertLessEqual(len(ts), 1000)
+            if algorithm == 'lttb':
+                self.assertGreater(len(ts), 900) # Overlapping per-metric picks are topped up
+            self.assertEqual(ts[-1], timestamps[-1])
+            self.assertEqual(ts[0], timestamps[0])
+
+    def test_history_resolution_bounds_loaded_rows(self):
+        start = datetime(2023, 1, 1)
+        self.assertEqual(history_resolution(start, start + timedelta(hours=5), 100), 'raw')
+        # Long ranges never read raw readings, and never more than 10 buckets per requested point
+        self.assertEqual(history_resolution(start, start + timedelta(days=3), 10000), 'minute')
+        self.assertEqual(history_resolution(start, start + timedelta(days=365), 10000), 'hour')
+        self.assertEqual(history_resolution(start, start + timedelta(days=365), 1000), 'hour')
+        self.assertEqual(history_resolution(start, start + timedelta(days=3650), 3), 'day')
+
+
+class TestReadingHistoryApi(BaseTestCase):
+
+    def test_columnar_history(self):
+        admin = self._create_test_user(email='history_admin@example.com', role='admin')
+        self._login_user_session(user_id=admin.id, user_role='admin')
+        gh = self._create_test_greenhouse(name='History GH')
+        base = datetime(2024, 5, 1)
+        db.session.add_all([
+            Reading(greenhouse_id=gh.id, temperature=20 + i % 7, humidity=50, light_level=700, timestamp=base + timedelta(minutes=i))
+            for i in range(300)
+        ])
+        db.session.commit()
+
+        response = self.client.get(f'/api/greenhouses/{gh.id}/readings?from=2024-05-01T00:00:00&to=2024-05-02T00:00:00&max_points=100')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['source'], 'raw')
+        self.assertEqual(data['total_points'], 300)
+        self.assertLessEqual(len(data['timestamps']), 100)
+        self.assertEqual(len(data['temperature']), len(data['timestamps']))
+        self.assertEqual(data['timestamps'][0], calendar.timegm(base.timetuple()) * 1000)
+
+        # Offset bounds are converted to UTC instead of failing against naive values
+        response = self.client.get(f'/api/greenhouses/{gh.id}/readings?from=2024-05-01T02:00:00%2B02:00&to=2024-05-01T12:00:00Z&max_points=100')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        data = json.loads(response.data)
+        self.assertEqual(data['from'], '2024-05-01T00:00:00')
+        self.assertEqual(data['total_points'], 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from ..base_test import BaseTestCase
+from models import db, Issue
+from routes.history import track_previous_values, previous_value, history_value
+
+class TestAttributeHistory(BaseTestCase):
+
+    def test_attribute_registered_once(self):
+        # Issue.status is tracked by the issue counters, the resolution rollups and the auto-assigner
+        track_previous_values(Issue.status)
+        listeners = Issue.status.dispatch.set
+        self.assertEqual(len(listeners), 1)
+
+    def test_previous_value_of_expired_instance(self):
+        greenhouse = self._create_test_greenhouse(name='History GH')
+        issue = Issue(greenhouse_id=greenhouse.id, issue_type='environmental', priority='high',
+                      description='History', status='open')
+        db.session.add(issue)
+        db.session.commit() # Expires the instance
+
+        issue.status = 'resolved'
+        self.assertEqual(previous_value(issue, 'status'), 'open')
+        self.assertEqual(history_value(issue, 'status', 1), 'resolved')
+        self.assertEqual(previous_value(issue, 'priority'), 'high') # Unchanged attributes report their value
+        db.session.rollback()
+
+
+if __name__ == '__main__':
+    unittest.main()
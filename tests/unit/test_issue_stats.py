@@ -0,0 +1,80 @@
+import unittest
+import json
+from sqlalchemy import event
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Issue, DailyIssueStats
+from routes.issue_stats import rebuild_issue_stats, issue_trend
+
+class TestDailyIssueStats(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.execute(db.delete(DailyIssueStats))
+        db.session.commit()
+        self.greenhouse = self._create_test_greenhouse(name='Stats GH')
+
+    def _counters(self, day):
+        row = db.session.get(DailyIssueStats, day)
+        return (row.critical, row.warning, row.resolved) if row else (0, 0, 0)
+
+    def test_counters_follow_issue_lifecycle(self):
+        today = datetime.utcnow().date()
+        issue = Issue(greenhouse_id=self.greenhouse.id, issue_type='environmental', priority='critical', status='open')
+        db.session.add(issue)
+        db.session.add(Issue(greenhouse_id=self.greenhouse.id, issue_type='environmental', priority='high', status='open'))
+        db.session.commit()
+        self.assertEqual(self._counters(today), (1, 1, 0))
+
+        # Changing priority on an expired instance moves the count between buckets
+        issue.priority = 'medium'
+        db.session.commit()
+        self.assertEqual(self._counters(today), (0, 2, 0))
+
+        issue.status = 'resolved'
+        issue.resolved_at = datetime.utcnow()
+        db.session.commit()
+        self.assertEqual(self._counters(today), (0, 2, 1))
+
+    def test_counters_are_bumped_with_one_upsert(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            for priority in ['critical', 'high']: # The first write of the day creates the row
+                db.session.add(Issue(greenhouse_id=self.greenhouse.id, issue_type='environmental', priority=priority, status='open'))
+                db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        counters = [statement for statement in statements if 'daily_issue_stats' in statement]
+        self.assertEqual(len(counters), 2)
+        self.assertTrue(all(statement.startswith('INSERT') and 'ON CONFLICT' in statement for statement in counters))
+        self.assertEqual(self._counters(datetime.utcnow().date()), (1, 1, 0))
+
+    def test_rebuild_and_trend(self):
+        two_days_ago = datetime.utcnow() - timedelta(days=2)
+        db.session.add(Issue(greenhouse_id=self.greenhouse.id, issue_type='environmental', priority='critical',
+                             status='resolved', created_at=two_days_ago, resolved_at=datetime.utcnow()))
+        db.session.commit()
+        incremental = self._counters(two_days_ago.date())
+
+        rebuild_issue_stats()
+        self.assertEqual(self._counters(two_days_ago.date()), incremental)
+        trend = issue_trend(7)
+        self.assertEqual(len(trend), 7)
+        self.assertEqual(trend[-3]['critical'], 1)
+        self.assertEqual(trend[-1]['resolved'], 1)
+
+    def test_statistics_window(self):
+        response = self.client.get('/api/statistics?days=90')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)['trend_data']), 90)
+        self.assertEqual(self.client.get('/api/statistics?days=12').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from ..base_test import BaseTestCase
+from app import app
+from models import db, Issue, Reading
+from routes.loading import LazyLoadError, allow_lazy_loads, load_profile
+
+class TestLoadingProfiles(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_test_user(email='loading_user@example.com', name='Loading User')
+        self.greenhouse = self._create_test_greenhouse(name='Loading GH')
+        self.employee = self._create_test_employee(name='Loading Emp', email='loading_emp@example.com', status='busy')
+        db.session.add(Issue(greenhouse_id=self.greenhouse.id, employee_id=self.employee.id, issue_type='environmental',
+                             priority='high', status='assigned'))
+        db.session.commit()
+        self.greenhouse_id = self.greenhouse.id
+        self.user_id = self.user.id
+        db.session.expunge_all() # Related rows must come from the database, not the identity map
+
+    def _issue(self, *options):
+        return Issue.query.options(*options).filter_by(greenhouse_id=self.greenhouse_id).one()
+
+    def test_guard_raises_on_lazy_load_during_request(self):
+        with app.test_request_context('/'):
+            issue = self._issue()
+            with self.assertRaises(LazyLoadError):
+                issue.greenhouse
+            with allow_lazy_loads():
+                self.assertEqual(issue.assigned_employee.name, 'Loading Emp')
+
+        db.session.expunge_all()
+        with app.test_request_context('/'):
+            issue = self._issue(*load_profile('issue_list'))
+            self.assertEqual((issue.greenhouse.name, issue.assigned_employee.name), ('Loading GH', 'Loading Emp'))
+
+    def test_lazy_loads_allowed_outside_requests(self):
+        self.assertEqual(self._issue().greenhouse.name, 'Loading GH')
+
+    def test_readings_are_write_only(self):
+        greenhouse = self._issue(*load_profile('issue_list')).greenhouse
+        with self.assertRaises(TypeError):
+            list(greenhouse.readings)
+        greenhouse.readings.add(Reading(temperature=20, humidity=50, air_quality='Good', soil_moisture='Good', light_level=800))
+        db.session.commit()
+        self.assertEqual(len(db.session.scalars(greenhouse.readings.select().limit(5)).all()), 1)
+
+    def test_views_render_under_guard(self):
+        self._login_user_session(user_id=self.user_id)
+        self.assertEqual(self.client.get('/reports').status_code, 200)
+        self.assertEqual(self.client.get(f'/greenhouse/{self.greenhouse_id}').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
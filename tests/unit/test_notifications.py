@@ -0,0 +1,53 @@
+import unittest
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Employee, Notification
+from routes.notifications import role_recipients, employee_user_id, notify_many
+from routes.unread_counts import unread_count
+
+class TestNotificationDispatcher(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self._create_test_user(email='dispatch_admin@example.com', role='admin', name='Admin')
+        self.manager = self._create_test_user(email='dispatch_manager@example.com', role='manager', name='Manager')
+
+    def test_role_recipients_refresh_after_user_changes(self):
+        self.assertEqual(role_recipients(), {self.admin.id, self.manager.id})
+        extra = self._create_test_user(email='dispatch_admin2@example.com', role='admin', name='Admin 2')
+        self.assertEqual(role_recipients(), {self.admin.id, self.manager.id, extra.id})
+        self.assertEqual(role_recipients(['manager']), {self.manager.id})
+
+    def test_employee_user_mapping(self):
+        employee = Employee(name='Worker', email='dispatch_worker@example.com')
+        db.session.add(employee)
+        db.session.commit()
+        self.assertIsNone(employee_user_id(employee.id))
+        user = self._create_test_user(email='dispatch_worker@example.com', name='Worker')
+        self.assertEqual(employee_user_id(employee.id), user.id)
+
+    def test_fan_out_is_one_insert(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO notification'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            written = notify_many([
+                {'user_ids': role_recipients(), 'title': 'Critical Alert - A', 'message': 'Hot', 'notification_type': 'critical'},
+                {'user_ids': role_recipients(), 'title': 'Critical Alert - B', 'message': 'Hot', 'notification_type': 'critical'}
+            ])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(written, 4)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(Notification.query.filter_by(user_id=self.admin.id).count(), 2)
+        self.assertEqual(unread_count(self.manager.id), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Reading, Issue, Notification
+
+class TestQueryPlans(BaseTestCase):
+    """EXPLAIN QUERY PLAN checks that the hot queries are served by an index."""
+
+    def _plan(self, query):
+        statement = query.statement if hasattr(query, 'statement') else query
+        sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+        return ' | '.join(row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql)))
+
+    def assertUsesIndex(self, query, index_name):
+        plan = self._plan(query)
+        self.assertIn(f'INDEX {index_name}', plan, plan)
+
+    def test_reading_history(self):
+        now = datetime(2024, 1, 1)
+        self.assertUsesIndex(Reading.query.filter(
+            Reading.greenhouse_id == 1, Reading.timestamp >= now - timedelta(days=1), Reading.timestamp < now
+        ).order_by(Reading.timestamp), 'ix_reading_greenhouse_timestamp')
+
+    def test_latest_readings_of_greenhouse(self):
+        query = Reading.query.filter(Reading.greenhouse_id == 1).order_by(Reading.timestamp.desc(), Reading.id.desc()).limit(3)
+        self.assertUsesIndex(query, 'ix_reading_greenhouse_timestamp')
+        self.assertNotIn('TEMP B-TREE', self._plan(query)) # Walks the index tail instead of sorting
+
+    def test_active_issues_of_greenhouse(self):
+        self.assertUsesIndex(Issue.query.filter_by(greenhouse_id=1).filter(Issue.status.in_(['open', 'assigned'])),
+                             'ix_issue_greenhouse_status')
+
+    def test_employee_workload(self):
+        self.assertUsesIndex(Issue.query.filter_by(employee_id=1, status='assigned'), 'ix_issue_employee_status_priority')
+        # The grouped workload count is answered from the index alone
+        grouped = db.session.query(Issue.employee_id, Issue.status, Issue.priority, db.func.count(Issue.id)).\
+            filter(Issue.employee_id.in_([1, 2])).group_by(Issue.employee_id, Issue.status, Issue.priority)
+        self.assertIn('COVERING INDEX ix_issue_employee_status_priority', self._plan(grouped))
+
+    def test_resolved_today(self):
+        today_start = datetime(2024, 1, 1)
+        self.assertUsesIndex(Issue.query.filter(
+            Issue.status == 'resolved',
+            Issue.resolved_at >= today_start,
+            Issue.resolved_at < today_start + timedelta(days=1)
+        ), 'ix_issue_status_resolved')
+
+    def test_recent_issues(self):
+        self.assertUsesIndex(Issue.query.order_by(Issue.created_at.desc()).limit(10), 'ix_issue_created')
+
+    def test_issue_history_page(self):
+        cursor_time = datetime(2024, 1, 1)
+        for column, value, index_name in [(Issue.greenhouse_id, 1, 'ix_issue_greenhouse_created'),
+                                          (Issue.employee_id, 1, 'ix_issue_employee_created'),
+                                          (Issue.status, 'resolved', 'ix_issue_status_created')]:
+            self.assertUsesIndex(Issue.query.filter(
+                column == value,
+                Issue.created_at <= cursor_time,
+                db.or_(Issue.created_at < cursor_time, Issue.id < 100)
+            ).order_by(Issue.created_at.desc(), Issue.id.desc()).limit(21), index_name)
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(Notification.query.filter_by(user_id=1, is_read=False), 'ix_notification_user_read_created')
+
+    def test_notification_history_page(self):
+        cursor_time = datetime(2024, 1, 1)
+        self.assertUsesIndex(Notification.query.filter(
+            Notification.user_id == 1,
+            Notification.created_at <= cursor_time,
+            db.or_(Notification.created_at < cursor_time, Notification.id < 100)
+        ).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(21), 'ix_notification_user_created')
+
+
+if __name__ == '__main__':
+    unittest.main()
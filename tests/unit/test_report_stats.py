@@ -0,0 +1,94 @@
+import unittest
+import json
+from datetime import datetime, date, timedelta
+from ..base_test import BaseTestCase
+from models import db, Issue, IssueResolutionStats
+from routes.report_stats import rebuild_report_stats, resolution_report
+
+class TestResolutionReport(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.execute(db.delete(IssueResolutionStats))
+        db.session.commit()
+        self.greenhouse = self._create_test_greenhouse(name='Report GH')
+        self.other = self._create_test_greenhouse(name='Report GH 2')
+        self.day = datetime(2024, 6, 10)
+
+    def _resolved(self, hours, greenhouse=None, issue_type='environmental', day=None):
+        created = (day or self.day)
+        issue = Issue(greenhouse_id=(greenhouse or self.greenhouse).id, issue_type=issue_type, priority='high',
+                      status='resolved', created_at=created, resolved_at=created + timedelta(hours=hours))
+        db.session.add(issue)
+        return issue
+
+    def _report(self):
+        return resolution_report(date(2024, 6, 1), date(2024, 7, 1))
+
+    def test_summary_and_breakdowns(self):
+        for hours in [1, 2, 3, 4, 10]:
+            self._resolved(hours)
+        self._resolved(20, greenhouse=self.other, issue_type='pest')
+        db.session.commit()
+
+        report = self._report()
+        overall = report['overall']
+        self.assertEqual(overall['resolved'], 6)
+        self.assertEqual(overall['avg_hours'], 6.67)
+        self.assertAlmostEqual(overall['median_hours'], 3, delta=0.3) # Within one bucket width
+        self.assertAlmostEqual(overall['p90_hours'], 20, delta=2)
+        self.assertEqual(report['by_type']['pest']['resolved'], 1)
+        self.assertEqual(report['by_greenhouse'][str(self.greenhouse.id)]['avg_hours'], 4.0)
+
+    def test_rollups_follow_resolution_and_range(self):
+        issue = Issue(greenhouse_id=self.greenhouse.id, issue_type='environmental', priority='high',
+                      status='open', created_at=self.day)
+        db.session.add(issue)
+        db.session.commit()
+        self.assertEqual(self._report()['overall']['resolved'], 0)
+
+        issue.status = 'resolved'
+        issue.resolved_at = self.day + timedelta(hours=5)
+        db.session.commit()
+        self.assertEqual(self._report()['overall']['avg_hours'], 5.0)
+
+        # Reopening removes it again; issues resolved outside the range are not read
+        issue.status = 'assigned'
+        db.session.commit()
+        self._resolved(8, day=datetime(2024, 8, 1))
+        db.session.commit()
+        self.assertEqual(self._report()['overall']['resolved'], 0)
+
+    def test_rebuild_matches_incremental(self):
+        for hours in [0.5, 6, 48]:
+            self._resolved(hours)
+        db.session.commit()
+        incremental = self._report()
+        rebuild_report_stats()
+        self.assertEqual(self._report(), incremental)
+
+
+class TestReportsPage(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_test_user(email='reports_user@example.com', name='Reports User')
+        self._login_user_session(user_id=self.user.id)
+
+    def test_page_and_api_accept_date_range(self):
+        response = self.client.get('/reports?from=2024-06-01&to=2024-06-30')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Median Resolution Time', response.data)
+        self.assertIn(b'value="2024-06-30"', response.data)
+
+        response = self.client.get('/api/reports/resolution?from=2024-06-01&to=2024-06-30')
+        data = json.loads(response.data)
+        self.assertEqual((data['from'], data['to']), ('2024-06-01', '2024-06-30'))
+        self.assertIn('overall', data)
+
+        response = self.client.get('/api/reports/resolution?from=2024-07-01&to=2024-06-01')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Reading, ReadingRollup
+from routes.rollups import rebuild_rollups, choose_resolution, update_rollups, _rebuild_in_python
+
+class TestReadingRollups(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Rollup GH')
+
+    def _reading(self, temperature, timestamp):
+        return {
+            'greenhouse_id': self.greenhouse.id,
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'light_level': 700,
+            'timestamp': timestamp
+        }
+
+    def _rollup(self, resolution, bucket_start):
+        return ReadingRollup.query.filter_by(greenhouse_id=self.greenhouse.id, resolution=resolution, bucket_start=bucket_start).first()
+
+    def test_ingest_updates_rollups_incrementally(self):
+        self.client.post('/api/readings/batch', data=json.dumps([
+            self._reading(20, '2024-03-01T10:15:10'),
+            self._reading(24, '2024-03-01T10:15:40'),
+        ]), content_type='application/json')
+        self.client.post('/api/readings/batch', data=json.dumps([
+            self._reading(16, '2024-03-01T10:45:00'),
+        ]), content_type='application/json')
+
+        minute = self._rollup('minute', datetime(2024, 3, 1, 10, 15))
+        self.assertEqual(minute.count, 2)
+        self.assertEqual((minute.temperature_min, minute.temperature_max, minute.temperature_sum), (20, 24, 44))
+
+        hour = self._rollup('hour', datetime(2024, 3, 1, 10))
+        self.assertEqual(hour.count, 3)
+        self.assertEqual((hour.temperature_min, hour.temperature_max), (16, 24))
+        self.assertEqual(self._rollup('day', datetime(2024, 3, 1)).count, 3)
+
+    def test_update_is_one_upsert_per_resolution(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        rows = [{'greenhouse_id': self.greenhouse.id, 'temperature': 20, 'humidity': None, 'light_level': 600,
+                 'timestamp': datetime(2024, 3, 4, 10, 5)}]
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            update_rollups(rows)
+            update_rollups([dict(rows[0], temperature=18, humidity=55, timestamp=datetime(2024, 3, 4, 10, 40))])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        upserts = [statement for statement in statements if 'reading_rollup' in statement]
+        self.assertEqual(len(upserts), 6) # Three resolutions, twice; no lookups
+        self.assertTrue(all(statement.startswith('INSERT') and 'ON CONFLICT' in statement for statement in upserts))
+        hour = self._rollup('hour', datetime(2024, 3, 4, 10))
+        self.assertEqual(hour.count, 2)
+        self.assertEqual((hour.temperature_min, hour.temperature_max, hour.temperature_sum), (18, 20, 38))
+        self.assertEqual((hour.humidity_min, hour.humidity_max, hour.humidity_sum), (55, 55, 55)) # NULL keeps the other side
+
+    def test_rebuild_matches_incremental(self):
+        base = datetime(2024, 3, 2, 8, 30)
+        db.session.add_all([
+            Reading(greenhouse_id=self.greenhouse.id, temperature=20 + i, humidity=50, light_level=600, timestamp=base + timedelta(minutes=20 * i))
+            for i in range(6)
+        ])
+        db.session.commit()
+
+        rebuild_rollups(self.greenhouse.id)
+        hour = self._rollup('hour', datetime(2024, 3, 2, 9))
+        self.assertEqual(hour.count, 3)
+        self.assertEqual((hour.temperature_min, hour.temperature_max, hour.temperature_sum), (22, 24, 69))
+        self.assertEqual(self._rollup('day', datetime(2024, 3, 2)).count, 6)
+
+    def test_python_rebuild_matches_sql_rebuild(self):
+        # Dialects without a bucketing function fall back to bucketing in Python
+        base = datetime(2024, 3, 3, 8, 30)
+        db.session.add_all([
+            Reading(greenhouse_id=self.greenhouse.id, temperature=20 + i, humidity=50, light_level=600, timestamp=base + timedelta(minutes=7 * i))
+            for i in range(20)
+        ])
+        db.session.commit()
+
+        def snapshot():
+            return sorted((r.resolution, r.bucket_start, r.count, r.temperature_min, r.temperature_max, r.temperature_sum)
+                          for r in ReadingRollup.query.filter_by(greenhouse_id=self.greenhouse.id))
+
+        rebuild_rollups(self.greenhouse.id)
+        expected = snapshot()
+        db.session.execute(db.delete(ReadingRollup).where(ReadingRollup.greenhouse_id == self.greenhouse.id))
+        self.assertEqual(_rebuild_in_python(self.greenhouse.id, chunk_size=3), len(expected)) # Pages split buckets
+        db.session.commit()
+        self.assertEqual(snapshot(), expected)
+
+    def test_choose_resolution(self):
+        start = datetime(2024, 1, 1)
+        self.assertEqual(choose_resolution(start, start + timedelta(days=365), 200), 'day')
+        self.assertEqual(choose_resolution(start, start + timedelta(days=7), 100), 'hour')
+        self.assertEqual(choose_resolution(start, start + timedelta(hours=2), 100), 'minute')
+
+    def test_trends_api(self):
+        admin = self._create_test_user(email='rollup_admin@example.com', role='admin')
+        self._login_user_session(user_id=admin.id, user_role='admin')
+        self.client.post('/api/readings/batch', data=json.dumps([
+            self._reading(20, '2024-03-01T10:15:00'),
+            self._reading(30, '2024-03-01T11:15:00'),
+        ]), content_type='application/json')
+
+        response = self.client.get(f'/api/greenhouses/{self.greenhouse.id}/trends?from=2024-03-01T00:00:00&to=2024-03-02T00:00:00&points=10')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['resolution'], 'hour')
+        self.assertEqual([b['temperature']['mean'] for b in data['buckets']], [20, 30])
+
+        # Offset bounds are converted to UTC: 12:30+01:00 is 11:30 UTC, after the 11:00 bucket
+        response = self.client.get(f'/api/greenhouses/{self.greenhouse.id}/trends?from=2024-03-01T00:00:00Z&to=2024-03-01T12:30:00%2B01:00&points=10')
+        self.assertEqual(response.status_code, 200, response.data.decode())
+        data = json.loads(response.data)
+        self.assertEqual(data['to'], '2024-03-01T11:30:00')
+        self.assertEqual([b['temperature']['mean'] for b in data['buckets']], [20, 30])
+
+    def test_trends_api_bounds_bucket_count(self):
+        admin = self._create_test_user(email='rollup_bounds@example.com', role='admin')
+        self._login_user_session(user_id=admin.id, user_role='admin')
+        url = f'/api/greenhouses/{self.greenhouse.id}/trends?from=2023-01-01T00:00:00&to=2024-01-01T00:00:00'
+        self.assertEqual(self.client.get(f'{url}&points=1000000').status_code, 400)
+        self.assertEqual(self.client.get(f'{url}&resolution=minute').status_code, 400) # 525,600 buckets
+        self.assertEqual(self.client.get(f'{url}&resolution=day').status_code, 200)
+        # 9000 points would pick minute buckets; the range is coarsened to hours instead
+        response = self.client.get(f'{url}&points=9000')
+        self.assertEqual(json.loads(response.data)['resolution'], 'hour')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from ..base_test import BaseTestCase
+from models import db
+from routes.schema import ensure_columns, ensure_indexes
+
+class TestSchemaUpkeep(BaseTestCase):
+
+    def test_adds_missing_column_and_index(self):
+        # Simulate a database created before these were declared on the model
+        db.session.execute(db.text('DROP INDEX ix_notification_user_created'))
+        db.session.execute(db.text('DROP INDEX ix_notification_user_occurred')) # Covers the dropped column
+        db.session.execute(db.text('ALTER TABLE notification DROP COLUMN last_occurred_at'))
+        db.session.commit()
+        db.engine.dispose() # Pooled connections used by other threads may have the old schema cached
+
+        self.assertEqual(ensure_columns(), ['notification.last_occurred_at'])
+        self.assertEqual(sorted(ensure_indexes()), ['ix_notification_user_created', 'ix_notification_user_occurred'])
+        self.assertEqual(ensure_columns(), [])
+        self.assertEqual(ensure_indexes(), [])
+
+    def test_replaces_retired_index(self):
+        db.session.execute(db.text('DROP INDEX ix_issue_employee_status_priority'))
+        db.session.execute(db.text('CREATE INDEX ix_issue_employee_status ON issue (employee_id, status)'))
+        db.session.commit()
+
+        self.assertEqual(ensure_indexes(), ['ix_issue_employee_status_priority'])
+        names = {index['name'] for index in db.inspect(db.engine).get_indexes('issue')}
+        self.assertNotIn('ix_issue_employee_status', names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Reading, GreenhouseSnapshot
+from routes.snapshots import rebuild_snapshots, greenhouses_with_snapshots, update_snapshots
+
+class TestGreenhouseSnapshots(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Snapshot GH')
+
+    def _post_batch(self, readings):
+        return self.client.post('/api/readings/batch',
+                                data=json.dumps(readings),
+                                content_type='application/json')
+
+    def _reading(self, temperature, timestamp):
+        return {
+            'greenhouse_id': self.greenhouse.id,
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'light_level': 700,
+            'timestamp': timestamp
+        }
+
+    def test_ingest_keeps_snapshot_at_newest_reading(self):
+        self._post_batch([self._reading(21, '2024-01-01T10:00:00'), self._reading(22, '2024-01-01T11:00:00')])
+        snap = db.session.get(GreenhouseSnapshot, self.greenhouse.id)
+        self.assertEqual(snap.temperature, 22)
+
+        # An older (backfilled) reading must not replace the snapshot
+        self._post_batch([self._reading(99, '2023-12-31T00:00:00')])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(GreenhouseSnapshot, self.greenhouse.id).temperature, 22)
+
+    def test_update_is_one_conditional_upsert(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        newer = {'temperature': 25, 'humidity': 60, 'timestamp': datetime(2024, 1, 1, 12)}
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            update_snapshots({self.greenhouse.id: newer}) # First insert
+            update_snapshots({self.greenhouse.id: dict(newer, temperature=10, timestamp=datetime(2024, 1, 1, 11))})
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        upserts = [statement for statement in statements if 'greenhouse_snapshot' in statement]
+        self.assertEqual(len(upserts), 2)
+        self.assertTrue(all(statement.startswith('INSERT') and 'ON CONFLICT' in statement for statement in upserts))
+        self.assertEqual(db.session.get(GreenhouseSnapshot, self.greenhouse.id).temperature, 25) # The older sample does not win
+
+    def test_rebuild_from_raw_readings(self):
+        now = datetime.utcnow()
+        db.session.add_all([
+            Reading(greenhouse_id=self.greenhouse.id, temperature=18, humidity=50, timestamp=now - timedelta(hours=1)),
+            Reading(greenhouse_id=self.greenhouse.id, temperature=19, humidity=55, timestamp=now),
+        ])
+        db.session.commit()
+
+        rebuild_snapshots()
+        pairs = dict((gh.id, snap) for gh, snap in greenhouses_with_snapshots())
+        self.assertEqual(pairs[self.greenhouse.id].temperature, 19)
+        self.assertEqual(pairs[self.greenhouse.id].humidity, 55)
+
+
+if __name__ == '__main__':
+    unittest.main()
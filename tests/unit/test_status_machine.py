@@ -0,0 +1,65 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from ..base_test import BaseTestCase
+from models import db, Reading
+from routes.status_machine import StatusMachine
+
+class TestStatusMachine(BaseTestCase):
+
+    def _row(self, temperature, seconds=0):
+        return {
+            'temperature': temperature,
+            'humidity': 60,
+            'air_quality': 'Good',
+            'soil_moisture': 'Good',
+            'timestamp': datetime(2024, 1, 1, 12, 0, 0) + timedelta(seconds=seconds)
+        }
+
+    def test_hysteresis_holds_status_near_threshold(self):
+        machine = StatusMachine(temp_band=1.0)
+        self.assertEqual(machine.step(1, 'normal', self._row(30.5)), 'warning')
+        self.assertEqual(machine.step(1, 'warning', self._row(29.5)), 'warning') # Inside the band
+        self.assertEqual(machine.step(1, 'warning', self._row(28.9)), 'normal')
+        stats = machine.stats()
+        self.assertEqual(stats['transitions'], 2)
+        self.assertEqual(stats['held_by_hysteresis'], 1)
+
+    def test_consecutive_samples_and_dwell(self):
+        machine = StatusMachine(confirm_samples=3, min_dwell_seconds=60)
+        self.assertEqual(machine.step(1, 'normal', self._row(31, 0)), 'normal')
+        self.assertEqual(machine.step(1, 'normal', self._row(25, 10)), 'normal') # Back to normal resets the count
+        self.assertEqual(machine.step(1, 'normal', self._row(31, 20)), 'normal')
+        self.assertEqual(machine.step(1, 'normal', self._row(31, 30)), 'normal')
+        self.assertEqual(machine.step(1, 'normal', self._row(31, 40)), 'normal') # Three samples but only 20s
+        self.assertEqual(machine.step(1, 'normal', self._row(31, 80)), 'warning')
+        self.assertEqual(machine.stats()['held_by_debounce'], 4)
+
+    def test_escalation_to_critical_is_immediate(self):
+        machine = StatusMachine(confirm_samples=5, min_dwell_seconds=600)
+        self.assertEqual(machine.step(1, 'normal', self._row(40)), 'critical')
+
+    def test_rehydrate_restores_pending_transition(self):
+        greenhouse = self._create_test_greenhouse(name='Rehydrate GH')
+        for seconds in [0, 10]:
+            db.session.add(Reading(greenhouse_id=greenhouse.id, temperature=31, humidity=60, air_quality='Good',
+                                   soil_moisture='Good', light_level=700,
+                                   timestamp=datetime(2024, 1, 1, 12, 0, 0) + timedelta(seconds=seconds)))
+        db.session.commit()
+
+        machine = StatusMachine(confirm_samples=3)
+        self.assertGreaterEqual(machine.rehydrate(), 1)
+        self.assertEqual(machine.stats()['evaluations'], 0)
+        # Two samples were replayed, so the third one completes the transition
+        self.assertEqual(machine.step(greenhouse.id, 'normal', self._row(31, 20)), 'warning')
+
+    def test_stats_endpoint(self):
+        user = self._create_test_user(email='status_machine@example.com', role='admin')
+        self._login_user_session(user_id=user.id, user_role='admin')
+        data = json.loads(self.client.get('/api/status-machine').data)
+        self.assertTrue(data['enabled'])
+        self.assertIn('suppressed', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+import unittest
+from unittest.mock import patch
+import numpy as np
+from ..base_test import BaseTestCase, app
+from models import db, ThresholdProfile
+from routes.thresholds import RuleSet, get_rules, classify_reading, classify_many
+
+class TestThresholdRules(BaseTestCase):
+
+    def _reading(self, temperature=25, humidity=60, air_quality='Good', soil_moisture='Good'):
+        return {'temperature': temperature, 'humidity': humidity, 'air_quality': air_quality, 'soil_moisture': soil_moisture}
+
+    def test_default_thresholds(self):
+        self.assertEqual(classify_reading(self._reading())['status'], 'normal')
+        self.assertEqual(classify_reading(self._reading(temperature=31))['temperature'], 'warning')
+        self.assertEqual(classify_reading(self._reading(temperature=9))['status'], 'critical')
+        self.assertEqual(classify_reading(self._reading(humidity=88))['humidity'], 'warning')
+        self.assertEqual(classify_reading(self._reading(air_quality='Poor'))['status'], 'critical')
+        self.assertEqual(classify_reading(self._reading(soil_moisture='Very Low'))['status'], 'warning')
+        self.assertEqual(classify_reading(None)['status'], 'normal')
+        # Hysteresis margins rate readings near a threshold as the more severe status
+        self.assertEqual(classify_reading(self._reading(temperature=29.5), temp_margin=1.0)['status'], 'warning')
+
+    def test_greenhouse_and_crop_profiles(self):
+        tomato = ThresholdProfile(name='Tomato', crop='tomato', temperature_warning_high=27, temperature_critical_high=32)
+        orchid = ThresholdProfile(name='Orchid', humidity_warning_low=60)
+        db.session.add_all([tomato, orchid])
+        db.session.commit()
+        by_crop = self._create_test_greenhouse(name='Tomato GH')
+        by_crop.crop = 'tomato'
+        assigned = self._create_test_greenhouse(name='Orchid GH')
+        assigned.threshold_profile_id = orchid.id
+        db.session.commit()
+
+        statuses = classify_many([
+            (by_crop, self._reading(temperature=28)),
+            (assigned, self._reading(temperature=28, humidity=55)),
+            (None, self._reading(temperature=28, humidity=55))
+        ])
+        self.assertEqual([s['status'] for s in statuses], ['warning', 'warning', 'normal'])
+        self.assertEqual(statuses[1]['humidity'], 'warning')
+
+    def test_profile_changes_recompile_rules(self):
+        rules = get_rules()
+        self.assertIs(get_rules(), rules) # Cached until a profile changes
+        db.session.add(ThresholdProfile(name='Strict', is_default=True, temperature_warning_high=20))
+        db.session.commit()
+        self.assertIsNot(get_rules(), rules)
+        self.assertEqual(classify_reading(self._reading(temperature=22))['status'], 'warning')
+
+    def test_rules_are_cached_without_response_cache(self):
+        app.extensions.pop('response_cache', None) # RESPONSE_CACHE = 'none'
+        rules = get_rules()
+        with patch.object(RuleSet, 'load', wraps=RuleSet.load) as load:
+            self.assertIs(get_rules(), rules)
+            load.assert_not_called()
+            db.session.add(ThresholdProfile(name='Strict', is_default=True, temperature_warning_high=20))
+            db.session.commit()
+            self.assertIsNot(get_rules(), rules)
+            self.assertEqual(load.call_count, 1)
+            # Changes made by other processes are picked up once the TTL has passed
+            rules = get_rules()
+            app.config['THRESHOLD_RULES_TTL'] = 0
+            try:
+                with patch('routes.thresholds.time.monotonic', return_value=time.monotonic() + 1):
+                    self.assertIsNot(get_rules(), rules)
+            finally:
+                app.config['THRESHOLD_RULES_TTL'] = 30
+
+    def test_vectorized_batch(self):
+        rules = get_rules()
+        n = 100000
+        temperature = np.linspace(0, 45, n)
+        severities = rules.classify_batch({
+            'temperature': temperature,
+            'humidity': np.full(n, 60.0),
+            'air_quality': np.array(['Good'] * n, dtype=object),
+            'soil_moisture': np.array(['Good'] * n, dtype=object)
+        })
+        expected = np.where((temperature > 35) | (temperature < 10), 2, np.where((temperature > 30) | (temperature < 15), 1, 0))
+        np.testing.assert_array_equal(severities['status'], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import json
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Notification, UnreadNotificationCount
+from routes.unread_counts import unread_count, cached_unread_count, reconcile_unread_counts
+
+class TestUnreadNotificationCount(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self._create_test_user(email='unread@example.com', role='admin', name='Unread User')
+
+    def _notify(self, **kwargs):
+        notification = Notification(user_id=self.user.id, title='Alert', message='Check it', **kwargs)
+        db.session.add(notification)
+        return notification
+
+    def test_counter_follows_notification_changes(self):
+        first = self._notify()
+        self._notify()
+        self._notify(is_read=True)
+        db.session.commit()
+        self.assertEqual(unread_count(self.user.id), 2)
+
+        # Marking an expired instance as read decrements the counter
+        first.is_read = True
+        db.session.commit()
+        self.assertEqual(unread_count(self.user.id), 1)
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(unread_count(self.user.id), 1)
+
+    def test_counter_is_bumped_with_one_upsert(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self._notify() # First counter row for the user
+            db.session.commit()
+            self._notify()
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        counters = [statement for statement in statements if 'unread_notification_count' in statement]
+        self.assertEqual(len(counters), 2)
+        self.assertTrue(all(statement.startswith('INSERT') and 'ON CONFLICT' in statement for statement in counters))
+        self.assertEqual(unread_count(self.user.id), 2)
+
+    def test_mark_all_read_endpoint_resets_counter(self):
+        self._login_user_session(user_id=self.user.id, user_role='admin')
+        self._notify()
+        self._notify()
+        db.session.commit()
+        self.assertEqual(cached_unread_count(self.user.id, 60), 2)
+
+        response = self.client.post('/api/notifications/mark-read', data=json.dumps({}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # The commit drops the cached value for this user
+        self.assertEqual(cached_unread_count(self.user.id, 60), 0)
+
+    def test_reconcile_repairs_drift(self):
+        self._notify()
+        db.session.commit()
+        db.session.execute(db.update(UnreadNotificationCount).where(UnreadNotificationCount.user_id == self.user.id).values(unread=7))
+        db.session.commit()
+
+        self.assertGreaterEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(unread_count(self.user.id), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from sqlalchemy import event
+from ..base_test import BaseTestCase
+from models import db, Employee, Issue
+from routes.workload import employee_workload, search_employees
+
+class TestEmployeeWorkload(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.greenhouse = self._create_test_greenhouse(name='Workload GH')
+        self.employees = []
+        for i in range(3):
+            employee = Employee(name=f'Workload Worker {i}', email=f'workload{i}@example.com')
+            db.session.add(employee)
+            self.employees.append(employee)
+        db.session.commit()
+
+    def _issue(self, employee, status, priority='medium'):
+        db.session.add(Issue(greenhouse_id=self.greenhouse.id, employee_id=employee.id, issue_type='Pest',
+                             description='Test', status=status, priority=priority))
+
+    def test_counts_by_status_and_priority(self):
+        first, second, _ = self.employees
+        self._issue(first, 'assigned', 'high')
+        self._issue(first, 'assigned', 'critical')
+        self._issue(first, 'resolved')
+        self._issue(second, 'resolved')
+        db.session.commit()
+
+        workload = employee_workload([employee.id for employee in self.employees])
+        self.assertEqual(workload[first.id]['active_issues'], 2)
+        self.assertEqual(workload[first.id]['resolved_issues'], 1)
+        self.assertEqual(workload[first.id]['open_by_priority'], {'low': 0, 'medium': 0, 'high': 1, 'critical': 1})
+        self.assertEqual(workload[second.id]['active_issues'], 0)
+        self.assertNotIn(self.employees[2].id, workload)
+
+    def test_query_count_does_not_grow_with_headcount(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            employee_workload()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len(statements), 1)
+
+    def test_search_filters_and_pages(self):
+        employees, has_more = search_employees('WORKLOAD worker', limit=2)
+        self.assertEqual([e.id for e in employees], [e.id for e in self.employees[:2]])
+        self.assertTrue(has_more)
+        employees, has_more = search_employees('workload', after_id=employees[-1].id, limit=2)
+        self.assertEqual([e.id for e in employees], [self.employees[2].id])
+        self.assertFalse(has_more)
+        self.assertEqual(search_employees('workload1@', limit=5)[0], [self.employees[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()